@@ -0,0 +1,414 @@
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+"""Benchmarks for the tokeniser."""
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from importTimes import DEFERRED_IMPORTS, IMPORT_TIME_BUDGET, measureImports
+from test_tokenise import linkArticlesScalar, revertAnomaliesScalar
+from tokenise import ALGORITHM_VERSION, Tokeniser, getPassages, initialiseWorker, lemmaService, tokeniseChapterJob
+
+BENCHMARK_HISTORY_PATH = os.path.join(os.path.dirname(__file__), 'data', 'benchmark_history.json')
+
+# the chapters of the benchmark suite (these are also the fixtures of test_tokenise.py)
+SUITE_PASSAGES = ['GEN.1', 'JHN.1']
+
+# long verses to benchmark: (passage, first verse, number of verses to join into one)
+LONG_VERSES = [
+    ('EST.8', 9, 1), # the longest verse in the Bible
+    ('GEN.1', 1, 1),
+    ('GEN.1', 1, 5),
+    ('GEN.1', 1, 10),
+    ('GEN.1', 1, 20),
+]
+
+def makeLongVerse(tokeniser, translation, passage, firstVerse, verseCount):
+    """
+    Join consecutive verses (of both the scripture, and the Strong's data) into one long, synthetic verse.
+    """
+    scriptureChapter = tokeniser.loadChapter(translation, passage)
+    strongsChapter = tokeniser.loadChapter('strongs', passage)
+
+    scripture = []
+    strongs = {}
+    for verse in range(firstVerse, firstVerse + verseCount):
+        scripture += scriptureChapter[str(verse)]
+        for token in strongsChapter[str(verse)].values():
+            strongs[str(len(strongs))] = token
+    return scripture, strongs
+
+def benchmarkCandidatePairs(translation='NKJV', longVerses=None):
+    """
+    Compare the number of token pairs compared by the matching sweeps against comparing every token with every other.
+    """
+    tokeniser = Tokeniser()
+    results = []
+
+    print(f'{"verse":>16} {"words":>6} {"strongs":>7} {"exhaustive":>11} {"evaluated":>10} {"reduction":>9} {"phases run":>11} {"time (ms)":>10}')
+    for passage, firstVerse, verseCount in (longVerses or LONG_VERSES):
+        try:
+            scripture, strongs = makeLongVerse(tokeniser, translation, passage, firstVerse, verseCount)
+        except (FileNotFoundError, KeyError):
+            continue
+
+        job = tokeniser.newJob(translation)
+        startTime = time.perf_counter()
+        tokens = job.tokenise(scripture, strongs, includeNotes=False)
+        duration = time.perf_counter() - startTime
+
+        name = f'{passage}.{firstVerse}' + (f'-{firstVerse + verseCount - 1}' if (verseCount > 1) else '')
+        result = {
+            'verse': name,
+            'words': len(tokens),
+            'strongs': len(strongs),
+            'pairsExhaustive': job.pairsExhaustive,
+            'pairsEvaluated': job.pairsEvaluated,
+            'phasesRun': job.phasesRun,
+            'phasesSkipped': job.phasesSkipped,
+            'time': duration,
+        }
+        results.append(result)
+        phases = f'{job.phasesRun}/{job.phasesRun + job.phasesSkipped}'
+        print(f'{name:>16} {len(tokens):>6} {len(strongs):>7} {job.pairsExhaustive:>11} {job.pairsEvaluated:>10} {job.pairsExhaustive / max(job.pairsEvaluated, 1):>8.1f}x {phases:>11} {duration * 1000:>10.1f}')
+
+    return results
+
+def benchmarkPositionalBand(translation='NKJV', positionalBand=0.1, longVerses=None):
+    """
+    Compare searching the whole verse for candidates against searching within a positional band (see Tokeniser),
+    including how many of the links of the whole-verse search the banded search still makes.
+    """
+    fullTokeniser = Tokeniser()
+    bandedTokeniser = Tokeniser(positionalBand)
+    results = []
+
+    print(f'{"verse":>16} {"words":>6} {"evaluated":>10} {"banded":>10} {"time (ms)":>10} {"banded (ms)":>12} {"agreement":>10}')
+    for passage, firstVerse, verseCount in (longVerses or LONG_VERSES):
+        try:
+            scripture, strongs = makeLongVerse(fullTokeniser, translation, passage, firstVerse, verseCount)
+        except (FileNotFoundError, KeyError):
+            continue
+
+        runs = []
+        for tokeniser in [fullTokeniser, bandedTokeniser]:
+            job = tokeniser.newJob(translation)
+            startTime = time.perf_counter()
+            tokens = job.tokenise(scripture, strongs, includeNotes=False)
+            runs.append((job, tokens, time.perf_counter() - startTime))
+        (fullJob, fullTokens, fullTime), (bandedJob, bandedTokens, bandedTime) = runs
+
+        links = [token.get('token') for token in fullTokens]
+        agreement = sum(link == token.get('token') for link, token in zip(links, bandedTokens)) / max(len(links), 1)
+
+        name = f'{passage}.{firstVerse}' + (f'-{firstVerse + verseCount - 1}' if (verseCount > 1) else '')
+        results.append({
+            'verse': name,
+            'words': len(fullTokens),
+            'pairsEvaluated': fullJob.pairsEvaluated,
+            'bandedPairsEvaluated': bandedJob.pairsEvaluated,
+            'time': fullTime,
+            'bandedTime': bandedTime,
+            'agreement': agreement,
+        })
+        print(f'{name:>16} {len(fullTokens):>6} {fullJob.pairsEvaluated:>10} {bandedJob.pairsEvaluated:>10} {fullTime * 1000:>10.1f} {bandedTime * 1000:>12.1f} {agreement:>9.1%}')
+
+    return results
+
+def benchmarkSweeps(translation='NKJV', longVerses=None, repeats=20):
+    """
+    Compare the per-sweep cost of the token-by-token, and vectorised, anomaly checks and article linking (TokenisationJob.revertAnomalies and linkArticles),
+    on tokenised verses, with every token to be checked again (as after the first phase of a sweep), and every article to be linked again.
+    """
+    tokeniser = Tokeniser()
+    results = []
+
+    print(f'{"verse":>16} {"words":>6} {"revert (us)":>12} {"vectorised":>11} {"articles (us)":>14} {"vectorised":>11} {"same":>5}')
+    for passage, firstVerse, verseCount in (longVerses or LONG_VERSES):
+        try:
+            scripture, strongs = makeLongVerse(tokeniser, translation, passage, firstVerse, verseCount)
+        except (FileNotFoundError, KeyError):
+            continue
+
+        job = tokeniser.newJob(translation)
+        job.tokenise(scripture, strongs, includeNotes=False)
+        tokenisedLinks = job.links.copy()
+        counts = [counter.counts.copy() for counter in (job.tokenCounts, job.lemmaCounts, job.synonymCounts)]
+
+        def reset(unlinkArticles=False):
+            links = np.where(job.isArticle, -1, tokenisedLinks) if unlinkArticles else tokenisedLinks
+            for tokenIndex, link in enumerate(links.tolist()):
+                job.workingTokens[tokenIndex].token = None if (link < 0) else link
+            job.links[:] = links
+            job.unlinkedTokens = set(np.flatnonzero(links < 0).tolist())
+            job.changedTokens = set(range(len(job.workingTokens)))
+            for counter, counterCounts in zip((job.tokenCounts, job.lemmaCounts, job.synonymCounts), counts):
+                counter.counts[:] = counterCounts
+
+        timings = {}
+        outcomes = {}
+        for name, sweep in [('scalar', revertAnomaliesScalar), ('vectorised', lambda job: job.revertAnomalies())]:
+            duration = 0
+            for _ in range(repeats):
+                reset()
+                startTime = time.perf_counter()
+                sweep(job)
+                duration += time.perf_counter() - startTime
+            timings[name] = duration / repeats
+            outcomes[name] = (job.links.tolist(), job.unlinkedTokens, job.changedTokens)
+        reset()
+
+        for name, sweep in [('articlesScalar', linkArticlesScalar), ('articlesVectorised', lambda job, allowImplicitArticles: job.linkArticles(allowImplicitArticles))]:
+            duration = 0
+            for _ in range(repeats):
+                reset(unlinkArticles=True)
+                startTime = time.perf_counter()
+                sweep(job, allowImplicitArticles=True)
+                duration += time.perf_counter() - startTime
+            timings[name] = duration / repeats
+            outcomes[name] = (job.links.tolist(), [counter.counts.tolist() for counter in (job.tokenCounts, job.lemmaCounts, job.synonymCounts)])
+        reset()
+
+        same = (outcomes['scalar'] == outcomes['vectorised']) and (outcomes['articlesScalar'] == outcomes['articlesVectorised'])
+        name = f'{passage}.{firstVerse}' + (f'-{firstVerse + verseCount - 1}' if (verseCount > 1) else '')
+        results.append({ 'verse': name, 'words': len(job.workingTokens), **timings, 'same': same })
+        print(f'{name:>16} {len(job.workingTokens):>6} {timings["scalar"] * 1e6:>12.1f} {timings["vectorised"] * 1e6:>11.1f} {timings["articlesScalar"] * 1e6:>14.1f} {timings["articlesVectorised"] * 1e6:>11.1f} {str(same):>5}')
+
+    return results
+
+def loadSuiteCorpora(tokeniser, translation, longVerses=None):
+    """
+    Load the corpora of the benchmark suite: each chapter of SUITE_PASSAGES, and the synthetic long verses.
+    Returns { name: [(scripture, strongs)] }, and the time spent loading each corpus' files (with nothing cached).
+    """
+    corpora = {}
+    loadTimes = {}
+
+    for passage in SUITE_PASSAGES:
+        Tokeniser.DOCUMENT_CACHE.clear()
+        startTime = time.perf_counter()
+        try:
+            scriptureChapter = tokeniser.loadChapter(translation, passage)
+            strongsChapter = tokeniser.loadChapter('strongs', passage)
+        except FileNotFoundError:
+            continue
+        loadTimes[passage] = time.perf_counter() - startTime
+        corpora[passage] = [
+            (scripture, strongsChapter[str(verse)])
+            for verse, scripture in scriptureChapter.items()
+            if (scripture and strongsChapter.get(str(verse)))
+        ]
+
+    Tokeniser.DOCUMENT_CACHE.clear()
+    startTime = time.perf_counter()
+    longVerseCorpus = []
+    for passage, firstVerse, verseCount in (longVerses or LONG_VERSES):
+        try:
+            longVerseCorpus.append(makeLongVerse(tokeniser, translation, passage, firstVerse, verseCount))
+        except (FileNotFoundError, KeyError):
+            continue
+    if (longVerseCorpus):
+        corpora['long verses'] = longVerseCorpus
+        loadTimes['long verses'] = time.perf_counter() - startTime
+
+    return corpora, loadTimes
+
+def benchmarkSuite(translation='NKJV', repeats=3, longVerses=None):
+    """
+    Time the tokenisation of each corpus of the benchmark suite, split by section (see TokenisationJob.beginTiming).
+    Each corpus is tokenised `repeats` times, and the fastest run is kept.
+    Returns { corpus: { verses, time, versesPerSecond, sections: { section: seconds } } }.
+    """
+    tokeniser = Tokeniser()
+    corpora, loadTimes = loadSuiteCorpora(tokeniser, translation, longVerses)
+    results = {}
+
+    for name, verses in corpora.items():
+        best = None
+        for _ in range(repeats):
+            sections = { 'load': loadTimes[name] }
+            startTime = time.perf_counter()
+            for scripture, strongs in verses:
+                job = tokeniser.newJob(translation)
+                job.tokenise(scripture, strongs)
+                for section, duration in job.timings.items():
+                    sections[section] = sections.get(section, 0.0) + duration
+            duration = time.perf_counter() - startTime
+
+            if (best is None or duration < best['time']):
+                best = { 'verses': len(verses), 'time': duration, 'versesPerSecond': len(verses) / duration, 'sections': sections }
+        results[name] = best
+
+    return results
+
+def findRegressions(previous, current, tolerance=0.2, minimumTime=0.001):
+    """
+    Compare the corpora of two benchmark suite runs, finding the verses/second and section times that are more than `tolerance` worse.
+    Sections that take less than `minimumTime` (in seconds) are too noisy to compare.
+    """
+    regressions = []
+    for name, result in current.items():
+        if ((baseline := previous.get(name)) is None):
+            continue
+
+        if (result['versesPerSecond'] < baseline['versesPerSecond'] * (1 - tolerance)):
+            regressions.append(f'{name}: {result["versesPerSecond"]:.1f} verses/s, was {baseline["versesPerSecond"]:.1f}')
+
+        for section, duration in result['sections'].items():
+            baselineDuration = baseline['sections'].get(section)
+            if (baselineDuration is None or max(duration, baselineDuration) < minimumTime):
+                continue
+            if (duration > baselineDuration * (1 + tolerance)):
+                regressions.append(f'{name} ({section}): {duration * 1000:.1f}ms, was {baselineDuration * 1000:.1f}ms')
+
+    return regressions
+
+def runBenchmarkSuite(translation='NKJV', repeats=3, historyPath=BENCHMARK_HISTORY_PATH, tolerance=0.2):
+    """
+    Run the benchmark suite, printing its results, and flagging regressions against the previous run (on the same host, of the same translation).
+    The run is then added to the history. Returns the regressions.
+    """
+    results = benchmarkSuite(translation, repeats)
+
+    sections = []
+    for result in results.values():
+        sections += [section for section in result['sections'] if section not in sections]
+    print(f'{"corpus":>12} {"verses":>6} {"verses/s":>9} ' + ' '.join(f'{section:>{max(len(section), 8)}}' for section in sections) + '   (ms)')
+    for name, result in results.items():
+        print(f'{name:>12} {result["verses"]:>6} {result["versesPerSecond"]:>9.1f} ' + ' '.join(f'{result["sections"].get(section, 0.0) * 1000:>{max(len(section), 8)}.1f}' for section in sections))
+
+    history = []
+    if (os.path.exists(historyPath)):
+        with open(historyPath, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+
+    run = {
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'translation': translation,
+        'algorithmVersion': ALGORITHM_VERSION,
+        'corpora': results,
+    }
+
+    regressions = []
+    previousRuns = [entry for entry in history if (entry['host'], entry['translation']) == (run['host'], run['translation'])]
+    if (previousRuns):
+        regressions = findRegressions(previousRuns[-1]['corpora'], results, tolerance)
+        print(f'\ncompared with {previousRuns[-1]["date"]}: ' + (f'{len(regressions)} regressions' if regressions else 'no regressions'))
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+
+    history.append(run)
+    os.makedirs(os.path.dirname(historyPath), exist_ok=True)
+    with open(historyPath, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2)
+
+    return regressions
+
+def benchmarkImports(module='tokenise', repeats=5, budget=IMPORT_TIME_BUDGET, deferredImports=None):
+    """
+    Benchmark the time taken to import a module (the fastest of `repeats`), reporting its slowest direct imports,
+    and check that it is within the budget, and that none of the deferred modules are imported with it.
+    Returns a description of each problem found.
+    """
+    deferredImports = DEFERRED_IMPORTS if (deferredImports is None) else deferredImports
+
+    runs = [measureImports(module) for _ in range(repeats)]
+    imports = min(runs, key=lambda run: run[-1][3])
+    total = imports[-1][3]
+    names = {name for name, *_ in imports}
+
+    print(f'import {module}: {total * 1000:.1f}ms (budget {budget * 1000:.0f}ms, fastest of {repeats})')
+    print(f'{"module":<20}{"self":>10}{"cumulative":>12}')
+    for name, _, selfTime, cumulative in sorted((entry for entry in imports if entry[1] == 1), key=lambda entry: -entry[3])[:10]:
+        print(f'{name:<20}{selfTime * 1000:>8.1f}ms{cumulative * 1000:>10.1f}ms')
+
+    problems = []
+    if (total > budget):
+        problems.append(f'import {module} took {total * 1000:.1f}ms, over the budget of {budget * 1000:.0f}ms')
+    for deferred in deferredImports:
+        if (deferred in names):
+            problems.append(f'import {module} imported {deferred}, which should only be imported when it is first used')
+    for problem in problems:
+        print(f'REGRESSION: {problem}')
+    return problems
+
+def getProcessMemory(pid):
+    """
+    Get the resident (RSS), proportional (PSS, which divides shared pages between the processes sharing them), and private memory of a process, in bytes.
+    Returns None if this cannot be measured (it is read from /proc, so only on Linux).
+    """
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', 'r', encoding='utf-8') as f:
+            fields = { name: int(value.split()[0]) * 1024 for name, _, value in (line.partition(':') for line in f) if value.strip().endswith('kB') }
+    except OSError:
+        return None
+    return { 'rss': fields['Rss'], 'pss': fields['Pss'], 'private': fields['Private_Clean'] + fields['Private_Dirty'] }
+
+def benchmarkWorkerMemory(translation='NKJV', start='GEN', end=None, workerCounts=(1, 4, 16)):
+    """
+    Tokenise a range with pools of each number of workers, with and without shared lexical resources (see Tokeniser.shareResources),
+    reporting the memory of the workers once the range is done.
+    Workers are spawned (not forked), as they are on Windows and macOS, so that each starts as a new process, rather than with a copy of this one.
+    """
+    passages = getPassages(start, end)
+    context = multiprocessing.get_context('spawn')
+
+    print(f'{"workers":>8}{"shared":>8}{"RSS (MB)":>10}{"PSS (MB)":>10}{"private (MB)":>14}{"total PSS (MB)":>16}')
+    for sharedResources in [False, True]:
+        for workers in workerCounts:
+            tokeniser = Tokeniser(sharedResources=sharedResources)
+            jobs = [job for passage in passages if (job := tokeniser.newChapterJob([translation], passage)) is not None]
+            with context.Pool(workers, initializer=initialiseWorker, initargs=tokeniser.getWorkerSettings(pooled=True)) as pool:
+                for completedJob in pool.imap_unordered(tokeniseChapterJob, jobs, chunksize=1):
+                    tokeniser.mergeChapterJob(completedJob, True)
+                memory = [getProcessMemory(process.pid) for process in multiprocessing.active_children()]
+
+            if (None in memory):
+                print('the memory of workers can only be measured on Linux')
+                return
+            megabytes = { field: np.array([usage[field] for usage in memory]) / 2**20 for field in ['rss', 'pss', 'private'] }
+            print(f'{workers:>8}{"yes" if sharedResources else "no":>8}{megabytes["rss"].mean():>10.1f}{megabytes["pss"].mean():>10.1f}{megabytes["private"].mean():>14.1f}{megabytes["pss"].sum():>16.1f}')
+
+    lemmaService.save()
+
+def main(args):
+    """
+    Run the tokeniser benchmarks: `python benchmarkTokenise.py [translation] [positionalBand]`
+    or the benchmark suite, recording it in the history: `python benchmarkTokenise.py suite [translation] [repeats]`
+    or the time taken to import the tokeniser, exiting with an error if it is over the budget: `python benchmarkTokenise.py imports [budget]`
+    or the memory of pools of 1, 4, and 16 workers, with and without shared resources: `python benchmarkTokenise.py memory [translation] [start] [end]`
+    """
+    if (len(args) > 1 and args[1] == 'suite'):
+        translation = args[2] if len(args) > 2 else 'NKJV'
+        repeats = int(args[3]) if len(args) > 3 else 3
+        runBenchmarkSuite(translation, repeats)
+        return
+    if (len(args) > 1 and args[1] == 'memory'):
+        translation = args[2] if len(args) > 2 else 'NKJV'
+        start = args[3] if len(args) > 3 else 'GEN'
+        end = args[4] if len(args) > 4 else None
+        benchmarkWorkerMemory(translation, start, end)
+        return
+    if (len(args) > 1 and args[1] == 'imports'):
+        budget = float(args[2]) if len(args) > 2 else IMPORT_TIME_BUDGET
+        if (benchmarkImports(budget=budget)):
+            sys.exit(1)
+        return
+
+    translation = args[1] if len(args) > 1 else 'NKJV'
+    positionalBand = float(args[2]) if len(args) > 2 else 0.1
+    benchmarkCandidatePairs(translation)
+    print()
+    benchmarkPositionalBand(translation, positionalBand)
+    print()
+    benchmarkSweeps(translation)
+
+if (__name__ == '__main__'):
+    main(sys.argv)
@@ -0,0 +1,112 @@
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+"""A load test of the tokeniser service (see tokeniseServer.py): the latency of its requests, at a fixed concurrency."""
+import asyncio
+import json
+import random
+import sys
+import time
+
+import numpy as np
+
+from tokenise import Tokeniser
+from tokeniseServer import DEFAULT_HOST, DEFAULT_PORT
+
+# the chapters whose verses are requested (these are also the fixtures of test_tokenise.py)
+LOAD_TEST_PASSAGES = ['GEN.1', 'JHN.1']
+
+async def connect(host=DEFAULT_HOST, port=DEFAULT_PORT, socketPath=None):
+    """
+    Open a connection to the service, on a TCP port, or a Unix socket (if socketPath is given).
+    """
+    if (socketPath is not None):
+        return await asyncio.open_unix_connection(socketPath)
+    return await asyncio.open_connection(host, port)
+
+async def fetch(reader, writer, target):
+    """
+    Make a GET request over an open (kept alive) connection, returning its status, and (JSON) body.
+    """
+    writer.write(f'GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode('latin-1'))
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while ((line := await reader.readline()) not in [b'\r\n', b'\n', b'']):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers['content-length']))
+    return status, json.loads(body)
+
+def getRequests(translation, count, passages=None, seed=0):
+    """
+    Choose `count` verses to request, at random (with repeats, so that some are requested concurrently).
+    """
+    tokeniser = Tokeniser()
+    verses = [
+        (passage, verse)
+        for passage in (passages or LOAD_TEST_PASSAGES)
+        for verse, scripture in tokeniser.loadChapter(translation, passage).items() if scripture
+    ]
+    generator = random.Random(seed)
+    return [
+        f'/tokenise?translation={translation}&passage={passage}&verse={verse}'
+        for passage, verse in (generator.choice(verses) for _ in range(count))
+    ]
+
+async def loadTest(requests, concurrency=8, host=DEFAULT_HOST, port=DEFAULT_PORT, socketPath=None):
+    """
+    Make the requests with `concurrency` clients, each with its own connection, taking the next request as soon as it has its last response.
+    Returns the latency (in seconds) and status of each request, the total time taken, and the statistics of the service after.
+    """
+    queue = iter(requests)
+    latencies = []
+    statuses = []
+
+    async def client():
+        reader, writer = await connect(host, port, socketPath)
+        try:
+            for target in queue:
+                start = time.perf_counter()
+                status, _ = await fetch(reader, writer, target)
+                latencies.append(time.perf_counter() - start)
+                statuses.append(status)
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    duration = time.perf_counter() - start
+
+    reader, writer = await connect(host, port, socketPath)
+    _, stats = await fetch(reader, writer, '/stats')
+    writer.close()
+    return latencies, statuses, duration, stats
+
+def main(args):
+    """
+    Load test a running tokeniser service: `python benchmarkTokeniseServer.py [translation] [concurrency] [requests] [--port=<port>] [--socket=<path>]`
+    """
+    port = DEFAULT_PORT
+    for arg in [arg for arg in args if arg.startswith('--port=')]:
+        port = int(arg.split('=', 1)[1])
+        args.remove(arg)
+    socketPath = None
+    for arg in [arg for arg in args if arg.startswith('--socket=')]:
+        socketPath = arg.split('=', 1)[1]
+        args.remove(arg)
+
+    translation = args[1] if len(args) > 1 else 'NKJV'
+    concurrency = int(args[2]) if len(args) > 2 else 8
+    count = int(args[3]) if len(args) > 3 else 200
+
+    requests = getRequests(translation, count)
+    latencies, statuses, duration, stats = asyncio.run(loadTest(requests, concurrency, port=port, socketPath=socketPath))
+
+    latencies = np.array(latencies) * 1000
+    failures = sum(status != 200 for status in statuses)
+    print(f'{len(requests)} requests at a concurrency of {concurrency}: {len(requests) / duration:.1f} requests/s, {failures} failed')
+    print(f'latency (ms): p50 {np.percentile(latencies, 50):.1f}, p90 {np.percentile(latencies, 90):.1f}, p99 {np.percentile(latencies, 99):.1f}, max {latencies.max():.1f}')
+    print(f'service: {stats["requests"]} requests, {stats["coalesced"]} coalesced, {stats["tokenised"]} tokenised, {stats["errors"]} failed')
+
+if (__name__ == '__main__'):
+    main(sys.argv)
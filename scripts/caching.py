@@ -0,0 +1,197 @@
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+"""Caches shared by the tokenisation scripts."""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+MISSING = object() # sentinel, so that None can be cached
+
+RESULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'results_cache')
+
+class LRUCache:
+    """A size-bounded cache, which evicts the least-recently-used entry, and keeps count of its hits and misses."""
+
+    def __init__(self, maxSize=128):
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """
+        Get an entry from the cache, marking it as recently used.
+        """
+        value = self.entries.get(key, MISSING)
+        if (value is MISSING):
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """
+        Add an entry to the cache, evicting the least-recently-used entry if the cache is full.
+        """
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if (self.maxSize is not None):
+            while (len(self.entries) > self.maxSize):
+                self.entries.popitem(last=False)
+
+    def getOrLoad(self, key, loader):
+        """
+        Get an entry from the cache, calling loader() to create it on a miss.
+        """
+        value = self.get(key, MISSING)
+        if (value is MISSING):
+            value = loader()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """
+        Empty the cache, and reset its statistics.
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """
+        Get the hit/miss statistics of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': (self.hits / lookups) if lookups else 0.0,
+            'size': len(self.entries),
+            'maxSize': self.maxSize,
+        }
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+class ResultCache:
+    """
+    A content-addressed cache of results on disk, which persists between runs.
+    Each result is saved in its own file, named by the hash of everything that went into computing it (see getKey),
+    so a result is only ever reused for identical inputs, and changed inputs simply miss.
+    When the files exceed maxBytes, the least-recently-used are evicted (see evict).
+    """
+
+    def __init__(self, path=RESULT_CACHE_PATH, maxBytes=256 * 1024 * 1024):
+        self.path = path
+        self.maxBytes = maxBytes
+        self.hits = 0 # results reused
+        self.misses = 0 # results recomputed
+        self.evicted = 0
+
+    @staticmethod
+    def getKey(inputs):
+        """
+        Get the key of some (JSON-serialisable) inputs: the hash of their canonical JSON.
+        """
+        encoded = json.dumps(inputs, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def getPath(self, key):
+        """
+        Get the path of the file of a key. Files are spread across subdirectories, by the first two characters of their keys.
+        """
+        return os.path.join(self.path, key[:2], f'{key}.json')
+
+    def get(self, key, default=None):
+        """
+        Get a result from the cache, marking it as recently used.
+        """
+        path = self.getPath(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            os.utime(path) # the modification time is used as the time of last use
+        except (OSError, ValueError): # missing, being evicted, or corrupt
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Save a result to the cache.
+        The file is written to a temporary path and then moved into place, so that other processes never read a partial result.
+        """
+        path = self.getPath(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tempPath = f'{path}.{os.getpid()}.tmp'
+        with open(tempPath, 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tempPath, path)
+
+    def evict(self):
+        """
+        Delete the least-recently-used results, until the cache is no larger than maxBytes.
+        Returns the number of results deleted.
+        """
+        entries = [] # (lastUsed, size, path)
+        for directory, _, files in os.walk(self.path):
+            for file in files:
+                if (not file.endswith('.json')):
+                    continue
+                path = os.path.join(directory, file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(entrySize for _, entrySize, _ in entries)
+        evicted = 0
+        for _, entrySize, path in sorted(entries):
+            if (size <= self.maxBytes):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= entrySize
+            evicted += 1
+
+        self.evicted += evicted
+        return evicted
+
+    def drainStats(self):
+        """
+        Take the (hits, misses) counted since the last call, so that they can be merged into another process' cache.
+        """
+        counts = (self.hits, self.misses)
+        self.hits, self.misses = 0, 0
+        return counts
+
+    def merge(self, counts):
+        """
+        Add the (hits, misses) counted by another process.
+        """
+        self.hits += counts[0]
+        self.misses += counts[1]
+
+    def stats(self):
+        """
+        Get the hit (reused) / miss (recomputed) statistics of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': (self.hits / lookups) if lookups else 0.0,
+            'evicted': self.evicted,
+            'maxBytes': self.maxBytes,
+        }
@@ -0,0 +1,94 @@
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+"""A read-only, memory-mapped lookup table of string keys to JSON values."""
+import json
+import mmap
+import os
+import struct
+
+# FILE LAYOUT
+# header:   MAGIC, entry count (uint32)
+# index:    one (keyOffset, keyLength, valueOffset, valueLength) record (4x uint32) per entry, sorted by key (UTF-8 bytes)
+# data:     keys and JSON-encoded values, addressed relative to the start of the data section
+MAGIC = b'BACTBL01'
+HEADER = struct.Struct('<8sI')
+RECORD = struct.Struct('<IIII')
+
+class CompiledTable:
+    """A lookup table compiled to disk. The file is memory-mapped, so is only paged in as entries are looked up."""
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.count = HEADER.unpack_from(self.buffer, 0)
+        if (magic != MAGIC):
+            raise ValueError(f'{path} is not a compiled table')
+        self.dataStart = HEADER.size + (self.count * RECORD.size)
+
+    @staticmethod
+    def compile(entries, path):
+        """
+        Write a dictionary of { key: value } to a compiled table.
+        The file is written to a temporary path and then moved into place, so readers never see a partial table.
+        """
+        keys = sorted((key.encode('utf-8'), key) for key in entries)
+
+        index = bytearray()
+        data = bytearray()
+        for encodedKey, key in keys:
+            encodedValue = json.dumps(entries[key], ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            index += RECORD.pack(len(data), len(encodedKey), len(data) + len(encodedKey), len(encodedValue))
+            data += encodedKey
+            data += encodedValue
+
+        tempPath = f'{path}.{os.getpid()}.tmp'
+        with open(tempPath, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(keys)))
+            f.write(index)
+            f.write(data)
+        os.replace(tempPath, path)
+
+    def find(self, key):
+        """
+        Binary search the index for a key, returning its position (or -1 if it is not present).
+        """
+        target = key.encode('utf-8')
+        low, high = 0, self.count - 1
+        while (low <= high):
+            middle = (low + high) // 2
+            keyOffset, keyLength, _, _ = RECORD.unpack_from(self.buffer, HEADER.size + (middle * RECORD.size))
+            start = self.dataStart + keyOffset
+            candidate = self.buffer[start:start + keyLength]
+
+            if (candidate == target):
+                return middle
+            if (candidate < target):
+                low = middle + 1
+            else:
+                high = middle - 1
+        return -1
+
+    def get(self, key, default=None):
+        """
+        Look up, and decode, the value of a key.
+        """
+        if ((position := self.find(key)) < 0):
+            return default
+
+        _, _, valueOffset, valueLength = RECORD.unpack_from(self.buffer, HEADER.size + (position * RECORD.size))
+        start = self.dataStart + valueOffset
+        return json.loads(self.buffer[start:start + valueLength])
+
+    def close(self):
+        """
+        Unmap the table.
+        """
+        self.buffer.close()
+
+    def __contains__(self, key):
+        return self.find(key) >= 0
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,70 @@
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+"""Occurrence counts of the terms (words, lemmas, synonyms) of a verse."""
+import numpy as np
+
+SCRIPTURE = 0
+STRONGS = 1
+
+class OccurrenceCounter:
+    """
+    The number of occurrences of each term in the scripture, and in the strongs, of a verse.
+    Terms are interned as ids into a 2-column integer array of (scriptureCount, strongsCount).
+    """
+
+    def __init__(self, scriptureTerms, strongsTerms):
+        self.ids = {}
+        scriptureIds = [self.ids.setdefault(term, len(self.ids)) for term in scriptureTerms]
+        strongsIds = [self.ids.setdefault(term, len(self.ids)) for term in strongsTerms]
+
+        self.counts = np.zeros((len(self.ids), 2), dtype=np.int32)
+        self.counts[:, SCRIPTURE] = np.bincount(scriptureIds, minlength=len(self.ids))
+        self.counts[:, STRONGS] = np.bincount(strongsIds, minlength=len(self.ids))
+
+    def count(self, term, column):
+        """
+        Get the number of occurrences of a term in the scripture (SCRIPTURE) or strongs (STRONGS).
+        """
+        if ((termId := self.ids.get(term)) is None):
+            return 0
+        return int(self.counts[termId, column])
+
+    def isUnique(self, term):
+        """
+        Does the term occur exactly once in both the scripture and the strongs?
+        """
+        if ((termId := self.ids.get(term)) is None):
+            return False
+        scriptureCount, strongsCount = self.counts[termId]
+        return (scriptureCount == 1 and strongsCount == 1)
+
+    def allUnique(self, terms):
+        """
+        Do all of the terms occur exactly once in both the scripture and the strongs?
+        """
+        termIds = [self.ids.get(term) for term in terms]
+        if (None in termIds):
+            return False
+        return bool(np.all(self.counts[termIds] == 1))
+
+    def decrement(self, term, column):
+        """
+        Remove an occurrence of a term (which must have been counted), once it has been linked.
+        """
+        self.counts[self.ids[term], column] -= 1
+
+    def get(self, term, default=None):
+        """
+        Get the (scriptureCount, strongsCount) of a term.
+        """
+        if ((termId := self.ids.get(term)) is None):
+            return default
+        return tuple(int(count) for count in self.counts[termId])
+
+    def __getitem__(self, term):
+        return tuple(int(count) for count in self.counts[self.ids[term]])
+
+    def __contains__(self, term):
+        return term in self.ids
+
+    def __len__(self):
+        return len(self.ids)
@@ -0,0 +1,152 @@
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+"""Evaluate the accuracy, and speed, of the tokeniser against the gold tokenisation of goldAlignments.py."""
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from goldAlignments import GOLD_PASSAGES
+from tokenise import Tokeniser
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+def getGoldVerses(passages=None):
+    """
+    Get the gold verses (that have been checked) of the given passages (or of all of them), as [(passage, verse, translation, expectedTokens)].
+    """
+    return [
+        (passage, verse, translation, expectedTokens)
+        for passage, verses in GOLD_PASSAGES.items() if (passages is None or passage in passages)
+        for verse, translation, expectedTokens in verses if expectedTokens
+    ]
+
+def getPeakMemory():
+    """
+    Get the peak resident memory of this process, in bytes (or None, if this cannot be measured).
+    """
+    if (resource is None):
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if (sys.platform == 'darwin') else (peak * 1024) # macOS reports bytes, Linux reports KiB
+
+def scoreVerse(tokens, expectedTokens):
+    """
+    Compare the tokens of a verse with their expected strongs tokens.
+    Returns the counts of (correct links, links made, expected links, scripture tokens), or None if the verse was split into a different number of tokens.
+    """
+    if (tokens is None or len(tokens) != len(expectedTokens)):
+        return None
+
+    correct, predicted, expected = 0, 0, 0
+    for token, expectedToken in zip(tokens, expectedTokens):
+        link = token.get('token')
+        if (expectedToken is not None):
+            expected += 1
+        if (link is None):
+            continue
+        predicted += 1
+
+        acceptable = expectedToken if isinstance(expectedToken, list) else [expectedToken]
+        if (str(link) in [str(strongsToken) for strongsToken in acceptable if strongsToken is not None]):
+            correct += 1
+    return (correct, predicted, expected, len(tokens))
+
+# POOL WORKERS
+# these must be module-level, so that they can be pickled into the worker processes
+workerTokeniser = None
+
+def initialiseWorker():
+    """
+    Create the tokeniser used by this worker process.
+    """
+    global workerTokeniser # pylint: disable=global-statement
+    workerTokeniser = Tokeniser()
+
+def evaluateVerse(goldVerse):
+    """
+    Tokenise, and score, a gold verse. Returns (passage, verse, scores, seconds, error, peak memory).
+    """
+    passage, verse, translation, expectedTokens = goldVerse
+    workerTokeniser.loadChapter(translation, passage) # files are loaded before timing, so that only tokenisation is timed
+    workerTokeniser.loadChapter('strongs', passage)
+
+    startTime = time.perf_counter()
+    try:
+        tokens = workerTokeniser.tokenisePassage(passage, verse, translation, includeNotes=False)
+        error = None
+    except Exception as e: # pylint: disable=broad-exception-caught
+        tokens = None
+        error = f'{type(e).__name__}: {e}'
+    duration = time.perf_counter() - startTime
+
+    return (passage, verse, scoreVerse(tokens, expectedTokens), duration, error, getPeakMemory())
+
+def evaluate(passages=None, processes=1):
+    """
+    Tokenise every gold verse (optionally across a pool of processes), and measure the accuracy and speed of the tokeniser.
+    Precision is the fraction of links made that are correct, recall the fraction of expected links that are made (correctly),
+    and coverage the fraction of scripture tokens that are linked at all.
+    """
+    goldVerses = getGoldVerses(passages)
+
+    startTime = time.perf_counter()
+    if (processes == 1):
+        initialiseWorker()
+        results = list(map(evaluateVerse, goldVerses))
+    else:
+        with Pool(processes, initializer=initialiseWorker) as pool:
+            results = list(pool.imap_unordered(evaluateVerse, goldVerses))
+    duration = time.perf_counter() - startTime
+
+    report = { 'passages': {}, 'failures': [] }
+    totals = {}
+    for passage, verse, scores, _, error, _ in sorted(results, key=lambda result: (result[0], int(result[1]))):
+        if (scores is None):
+            report['failures'].append(f'{passage}.{verse}: ' + (error or 'wrong number of tokens'))
+            continue
+        for key in [passage, 'total']:
+            totals[key] = [total + score for total, score in zip(totals.get(key, [0, 0, 0, 0]), scores)]
+
+    for key in sorted(totals, key=lambda key: key == 'total'): # the total comes last
+        correct, predicted, expected, tokenCount = totals[key]
+        report['passages'][key] = {
+            'precision': correct / predicted if predicted else 0.0,
+            'recall': correct / expected if expected else 0.0,
+            'coverage': predicted / tokenCount if tokenCount else 0.0,
+        }
+
+    latencies = [result[3] for result in results]
+    peakMemory = [result[5] for result in results if result[5] is not None]
+    report.update({
+        'verses': len(results),
+        'versesPerSecond': len(results) / duration if duration else 0.0,
+        'latency': { f'p{percentile}': float(np.percentile(latencies, percentile)) if latencies else 0.0 for percentile in [50, 95, 99] },
+        'peakMemory': max(peakMemory) if peakMemory else None, # of the largest process
+    })
+    return report
+
+def main(args):
+    """
+    Evaluate the tokeniser against the gold verses: `python evaluateTokenise.py [processes] [passage...]`
+    """
+    processes = int(args[1]) if len(args) > 1 else 1
+    passages = args[2:] or None
+    report = evaluate(passages, processes)
+
+    print(f'{"passage":>8} {"precision":>10} {"recall":>8} {"coverage":>9}')
+    for passage, scores in report['passages'].items():
+        print(f'{passage:>8} {scores["precision"]:>10.1%} {scores["recall"]:>8.1%} {scores["coverage"]:>9.1%}')
+    for failure in report['failures']:
+        print(f'failed {failure}')
+
+    latency = report['latency']
+    print(f'\n{report["verses"]} verses, {report["versesPerSecond"]:.1f} verses/s, latency p50 {latency["p50"] * 1000:.1f}ms, p95 {latency["p95"] * 1000:.1f}ms, p99 {latency["p99"] * 1000:.1f}ms')
+    if (report['peakMemory'] is not None):
+        print(f'peak memory {report["peakMemory"] / (1024 * 1024):.1f}MB')
+
+if (__name__ == '__main__'):
+    main(sys.argv)
@@ -0,0 +1,94 @@
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+"""Compatibility of the grammar (POS) tags of scripture tokens and strongs tokens, compiled into bitmasks."""
+import numpy as np
+
+# the Penn Treebank tags that each strongs grammar tag (Hebrew Parsing Tag) can be translated as
+# strongs grammar tags that are not listed (e.g. 'direct object marker', 'third person ...') are compatible with nothing
+GRAMMAR_COMPATIBILITY = {
+    'conjunctive waw': ['CC', 'IN'], # so = and
+    'conjunction': ['CC', 'IN'], # so = and
+    'number': ['CD'],
+    'article': ['DT'],
+    'preposition': ['IN', 'TO'],
+    'adjective': ['JJ', 'JJR', 'JJS'],
+    'noun': [
+        'NN', 'NNS', 'NNP', 'NNPS',
+        'DT', 'IN', 'TO', # as we are dealing with Hebrew, sometimes these are tagged as nouns
+    ], # it is best to ignore both plural and proper tags, as these differ between English and Hebrew
+       # for example, 'God' is a single, proper noun, but 'elohim' is a plural, common noun
+    'pronoun': ['PRP', 'PRP$', 'WP', 'WP$'],
+    'adverb': ['RB', 'RBR', 'RBS', 'EX'],
+    'interjection': ['UH'],
+    'verb': ['VB', 'VBD', 'VBG', 'VBN', 'VBP', 'VBZ', 'MD'],
+    'interrogative': ['WDT', 'WP', 'WP$', 'WRB'],
+}
+
+class GrammarTable:
+    """
+    Penn Treebank tags are interned as bits, and each strongs grammar tag is compiled to the bitmask of the Penn tags it is compatible with,
+    so that testing two tokens for compatible grammars is a single AND of their masks.
+    """
+
+    def __init__(self, compatibility=None):
+        self.bits = {} # { pennTag: bit }
+        self.grammarMasks = {
+            grammarTag: self.getPOSMask(pennTags)
+            for grammarTag, pennTags in (compatibility or GRAMMAR_COMPATIBILITY).items()
+        }
+
+    def getPOSMask(self, pennTags):
+        """
+        Get the bitmask of a set of Penn Treebank tags, interning any that are new.
+        """
+        mask = 0
+        for pennTag in pennTags or []:
+            if ((bit := self.bits.get(pennTag)) is None):
+                bit = 1 << len(self.bits)
+                self.bits[pennTag] = bit
+            mask |= bit
+        return mask
+
+    def getGrammarMask(self, grammarTags):
+        """
+        Get the bitmask of the Penn Treebank tags that any of a strongs token's grammar tags are compatible with.
+        """
+        mask = 0
+        for grammarTag in grammarTags or []:
+            mask |= self.grammarMasks.get(grammarTag, 0)
+        return mask
+
+    def getCompatibility(self, scriptureMasks, strongsMasks):
+        """
+        Get the (scripture x strongs) boolean matrix of which pairs of masks share a bit.
+        """
+        # Python integers are used if there are ever more tags than fit in 64 bits
+        dtype = np.uint64 if (len(self.bits) <= 64) else object
+        scriptureMasks = np.array(scriptureMasks, dtype=dtype).reshape(-1, 1)
+        strongsMasks = np.array(strongsMasks, dtype=dtype).reshape(1, -1)
+        return (scriptureMasks & strongsMasks) != 0
+
+    def hasPOS(self, scripturePOS, pennTags):
+        """
+        Which scripture tokens have any of the given Penn Treebank tags?
+        Takes the POS tags of each scripture token.
+        """
+        scriptureMasks = [self.getPOSMask(tags) for tags in scripturePOS]
+        return self.getCompatibility(scriptureMasks, [self.getPOSMask(pennTags)])[:, 0]
+
+    def getMorphologyMatrix(self, scripturePOS, strongsGrammar):
+        """
+        Which scripture tokens' POS tags are compatible with which strongs tokens' grammar tags?
+        Takes the POS tags of each scripture token, and the grammar tags of each strongs token.
+        """
+        scriptureMasks = [self.getPOSMask(pennTags) for pennTags in scripturePOS]
+        strongsMasks = [self.getGrammarMask(grammarTags) for grammarTags in strongsGrammar]
+        return self.getCompatibility(scriptureMasks, strongsMasks)
+
+    def getBackupMorphologyMatrix(self, scripturePOS, strongsPOS):
+        """
+        Which scripture tokens share a POS tag with the (English, 'backup') POS tags of which strongs tokens?
+        Takes the POS tags of each scripture token, and of each strongs token.
+        """
+        scriptureMasks = [self.getPOSMask(pennTags) for pennTags in scripturePOS]
+        strongsMasks = [self.getPOSMask(pennTags) for pennTags in strongsPOS]
+        return self.getCompatibility(scriptureMasks, strongsMasks)
@@ -0,0 +1,33 @@
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+"""The time taken to import the tokeniser, and the modules it imports (see benchmarkTokenise.benchmarkImports)."""
+import os
+import subprocess
+import sys
+
+# the modules that only some uses of the tokeniser need (POS tagging, optimal assignment, visualisation), which `import tokenise` must not load
+DEFERRED_IMPORTS = ['nltk', 'pygame', 'scipy', 'token_vis']
+# the time (in seconds) that `import tokenise` may take, not including the start-up of the interpreter
+IMPORT_TIME_BUDGET = 0.4
+
+def measureImports(module='tokenise'):
+    """
+    Import a module in a new interpreter, with `-X importtime`.
+    Returns the (name, depth, self time, cumulative time) of the module, and every module it imported, in the order they finished, with times in seconds.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+    )
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if (not line.startswith('import time:') or line.endswith('imported package')): # skip the header
+            continue
+        selfTime, cumulativeTime, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), depth, int(selfTime) / 1e6, int(cumulativeTime) / 1e6))
+        if (depth == 0):
+            if (name.strip() == module):
+                break
+            imports = [] # imported by the start-up of the interpreter
+    return imports
@@ -0,0 +1,197 @@
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+"""Opt-in instrumentation of tokenisation: what each verse, and each phase of its sweeps, did, and how long it took."""
+import csv
+import json
+from collections import deque
+
+# the counters of the lemma and synonym caches, which are recorded as the difference across each verse
+CACHE_COUNTERS = ['lemmaHits', 'lemmaMisses', 'synonymHits', 'synonymMisses']
+VERSE_FIELDS = ['verse', 'words', 'strongs', 'pairsEvaluated', 'pairsExhaustive', 'links', 'reverts', 'time'] + CACHE_COUNTERS
+PHASE_FIELDS = ['calls', 'links', 'reverts', 'pairsEvaluated', 'time']
+# the fields of each record of a ProvenanceTrace
+TRACE_FIELDS = ['verse', 'event', 'phase', 'posStrictness', 'matchTolerance', 'scriptureToken', 'strongsToken', 'scriptureCandidates', 'strongsCandidates']
+
+class Instrumentation:
+    """
+    Records of what tokenisation did, per verse, and per phase of each verse (see TokenisationJob.callPhase).
+    A tokeniser only records these if it is given an Instrumentation, so that there is (almost) no cost otherwise.
+    """
+
+    def __init__(self):
+        self.records = [] # one per verse
+        self.current = None # the record of the verse being tokenised
+        self.cacheCounts = None # the cache counters at the start of the current verse
+
+    def beginVerse(self, verse, cacheCounts):
+        """
+        Begin the record of a verse, given the counters of the lemma and synonym caches (CACHE_COUNTERS).
+        """
+        self.current = { 'verse': verse, 'phases': {} }
+        self.cacheCounts = cacheCounts
+
+    def recordPhase(self, phase, time, links, reverts, pairsEvaluated):
+        """
+        Add a call of a phase to the record of the current verse.
+        """
+        if (self.current is None):
+            return
+        if ((record := self.current['phases'].get(phase)) is None):
+            record = self.current['phases'][phase] = dict.fromkeys(PHASE_FIELDS, 0)
+        record['calls'] += 1
+        record['links'] += links
+        record['reverts'] += reverts
+        record['pairsEvaluated'] += pairsEvaluated
+        record['time'] += time
+
+    def endVerse(self, job, cacheCounts):
+        """
+        Complete the record of the current verse, from its (finished) job, and the counters of the lemma and synonym caches.
+        """
+        if (self.current is None):
+            return
+        self.current.update({
+            'words': len(job.workingTokens),
+            'strongs': len(job.strongs),
+            'pairsEvaluated': job.pairsEvaluated,
+            'pairsExhaustive': job.pairsExhaustive,
+            'links': job.linksMade,
+            'reverts': job.reverts,
+            'time': sum(job.timings.values()),
+            'sections': dict(job.timings),
+        })
+        for counter in CACHE_COUNTERS:
+            self.current[counter] = cacheCounts[counter] - self.cacheCounts[counter]
+
+        self.records.append(self.current)
+        self.current = None
+
+    def drainRecords(self):
+        """
+        Take the records made since the last call, so that they can be merged into another process' instrumentation.
+        """
+        records, self.records = self.records, []
+        return records
+
+    def merge(self, records):
+        """
+        Add records made by another process.
+        """
+        self.records += records
+
+    def summary(self):
+        """
+        Aggregate the records of every verse: the totals of each verse field, and of each phase and section.
+        """
+        summary = { 'verses': len(self.records), 'phases': {}, 'sections': {} }
+        for field in VERSE_FIELDS[1:]:
+            summary[field] = sum(record[field] for record in self.records)
+
+        for record in self.records:
+            for phase, phaseRecord in record['phases'].items():
+                if ((total := summary['phases'].get(phase)) is None):
+                    total = summary['phases'][phase] = dict.fromkeys(PHASE_FIELDS, 0)
+                for field in PHASE_FIELDS:
+                    total[field] += phaseRecord[field]
+            for section, time in record['sections'].items():
+                summary['sections'][section] = summary['sections'].get(section, 0.0) + time
+        return summary
+
+    def toJSON(self, path):
+        """
+        Export the records of every verse, and their summary.
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({ 'summary': self.summary(), 'verses': self.records }, f, indent=2)
+
+    def toCSV(self, path, phases=False):
+        """
+        Export a row per verse (VERSE_FIELDS), or a row per phase of each verse (if phases).
+        """
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            if (phases):
+                writer = csv.writer(f)
+                writer.writerow(['verse', 'phase'] + PHASE_FIELDS)
+                for record in self.records:
+                    for phase, phaseRecord in record['phases'].items():
+                        writer.writerow([record['verse'], phase] + [phaseRecord[field] for field in PHASE_FIELDS])
+            else:
+                writer = csv.DictWriter(f, VERSE_FIELDS, extrasaction='ignore')
+                writer.writeheader()
+                writer.writerows(self.records)
+
+    def export(self, path):
+        """
+        Export to JSON, or CSV (a row per verse), depending on the extension of the path.
+        """
+        if (path.lower().endswith('.csv')):
+            self.toCSV(path)
+        else:
+            self.toJSON(path)
+
+class ProvenanceTrace:
+    """
+    A trace of every link and unlink made by tokenisation (see TokenisationJob.traceEvent): which phase, at which strictness, made it,
+    and the candidates it was chosen from. Records are kept as tuples (TRACE_FIELDS) in a ring buffer of the most recent `capacity`,
+    so that it is cheap enough to leave on for whole-corpus runs, and only converted when they are dumped.
+    """
+
+    def __init__(self, capacity=100000):
+        self.capacity = capacity
+        self.records = deque(maxlen=capacity)
+
+    def record(self, record):
+        """
+        Add a record (a tuple of TRACE_FIELDS), evicting the oldest if the buffer is full.
+        """
+        self.records.append(record)
+
+    def drainRecords(self):
+        """
+        Take the records made since the last call, so that they can be merged into another process' trace.
+        """
+        records = list(self.records)
+        self.records.clear()
+        return records
+
+    def merge(self, records):
+        """
+        Add records made by another process.
+        """
+        self.records.extend(records)
+
+    def verses(self):
+        """
+        Get the verses which have records in the buffer, in the order they were traced.
+        """
+        return list(dict.fromkeys(record[0] for record in self.records))
+
+    def dump(self, verse=None):
+        """
+        Get the records of a verse (or of every verse), as dictionaries.
+        """
+        return [dict(zip(TRACE_FIELDS, record)) for record in self.records if (verse is None or record[0] == verse)]
+
+    def format(self, verse):
+        """
+        Describe the links and unlinks of a verse, one per line, for reading.
+        """
+        lines = []
+        for record in self.dump(verse):
+            (position, word), (strongs, strongsWord) = record['scriptureToken'], record['strongsToken']
+            line = f"{record['event']:>6} {word}#{position} -> {strongsWord}#{strongs} by {record['phase']} ({record['posStrictness']}, {record['matchTolerance']})"
+            for side in ['scriptureCandidates', 'strongsCandidates']:
+                if (record[side] is not None):
+                    line += f"; {side}: " + ', '.join(f'{candidateWord}#{candidate}' for candidate, candidateWord in record[side])
+            lines.append(line)
+        return '\n'.join(lines)
+
+    def toJSONL(self, path, verse=None):
+        """
+        Export the records of a verse (or of every verse), one JSON object per line.
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in self.dump(verse):
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def __len__(self):
+        return len(self.records)
@@ -0,0 +1,141 @@
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+"""Lemmatisation of words, with a bounded cache that persists between runs."""
+import json
+import os
+
+from caching import LRUCache
+from compiledTable import CompiledTable
+
+LEMMA_CACHE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'lemma_cache.json')
+SHARED_LEMMA_CACHE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'lemma_cache.bin')
+
+# the size of the cache of a process attached to a shared table (see LemmaService.attach), which only needs to hold the lemmas in use
+ATTACHED_CACHE_SIZE = 4096
+
+class LemmaService:
+    """
+    Lemmatises words using a single WordNet lemmatiser.
+    Results are cached by (word, WordNet POS tag), and can be saved to disk, so that repeated runs need not touch WordNet.
+    """
+
+    # lemmas that WordNet gets wrong, which apply regardless of POS
+    OVERRIDES = {
+        'spared': frozenset(['spare']),
+        # 'kinds': frozenset(['kind']),
+        # 'kind': frozenset(['kind']),
+    }
+
+    def __init__(self, maxSize=100000, path=LEMMA_CACHE_PATH):
+        self.path = path
+        self.cache = LRUCache(maxSize)
+        self.lemmatiser = None # this is not created until it is needed
+        self.loaded = (path is None)
+        self.newEntries = [] # entries computed since the cache was last saved (or drained)
+        self.wordnetCalls = 0
+        self.table = None # the table shared by another process, if attached (see attach)
+
+    def lemmatise(self, word, posTags):
+        """
+        Get the lemmas of a single (simplified) word, for a set of WordNet POS tags.
+        Only lemmas which differ from the word are returned.
+        """
+        if ((lemmas := self.OVERRIDES.get(word)) is not None):
+            return lemmas
+
+        if (not self.loaded):
+            self.load()
+
+        lemmas = frozenset()
+        for posTag in posTags:
+            if ((lemma := self.cache.get((word, posTag))) is None):
+                if (self.table is None or (lemma := self.table.get(f'{posTag}:{word}')) is None):
+                    lemma = self.lemmatiseWithWordnet(word, posTag)
+                    self.newEntries.append((word, posTag, lemma))
+                self.cache.put((word, posTag), lemma)
+            if (lemma):
+                lemmas |= {lemma}
+        return lemmas
+
+    def lemmatiseWithWordnet(self, word, posTag):
+        """
+        Look up a lemma in WordNet. Returns an empty string if the word is its own lemma.
+        """
+        if (self.lemmatiser is None):
+            from nltk.stem import WordNetLemmatizer # pylint: disable=import-outside-toplevel # NLTK is slow to import
+            self.lemmatiser = WordNetLemmatizer()
+        self.wordnetCalls += 1
+
+        lemma = self.lemmatiser.lemmatize(word, posTag)
+        return lemma if (lemma != word) else ''
+
+    def load(self):
+        """
+        Load the on-disk cache, if there is one (and it can be read; otherwise, the lemmas are computed again).
+        """
+        self.loaded = True
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = [((word, posTag), lemma) for word, posTag, lemma in json.load(f)]
+        except (OSError, ValueError, TypeError): # missing, or corrupt
+            return
+
+        for key, lemma in entries:
+            self.cache.put(key, lemma)
+
+    def save(self):
+        """
+        Save the cache to disk, if anything has been added to it.
+        """
+        if (self.path is None or not self.newEntries):
+            return
+        if (not self.loaded):
+            self.load()
+
+        tempPath = f'{self.path}.{os.getpid()}.tmp'
+        with open(tempPath, 'w', encoding='utf-8') as f:
+            json.dump([[word, posTag, lemma] for (word, posTag), lemma in self.cache.entries.items()], f, ensure_ascii=False)
+        os.replace(tempPath, self.path)
+        self.newEntries = []
+
+    def share(self, path=SHARED_LEMMA_CACHE_PATH):
+        """
+        Compile the cache into a read-only table, which worker processes attach to (see attach), so that they share one memory-mapped copy of it,
+        rather than each loading their own. Returns the path of the table.
+        """
+        if (not self.loaded):
+            self.load()
+        CompiledTable.compile({ f'{posTag}:{word}': lemma for (word, posTag), lemma in self.cache.entries.items() }, path)
+        return path
+
+    def attach(self, path, cacheSize=ATTACHED_CACHE_SIZE):
+        """
+        Look lemmas up in a table compiled by another process (see share), instead of loading the on-disk cache.
+        Only a small cache, of the lemmas most recently used, is kept by this process.
+        """
+        self.table = CompiledTable(path)
+        self.cache = LRUCache(cacheSize)
+        self.loaded = True
+
+    def drainNewEntries(self):
+        """
+        Take the entries computed since the last call, so that they can be merged into another process' cache.
+        """
+        entries, self.newEntries = self.newEntries, []
+        return entries
+
+    def merge(self, entries):
+        """
+        Add entries computed by another process.
+        """
+        if (not self.loaded):
+            self.load()
+        for word, posTag, lemma in entries:
+            if ((word, posTag) not in self.cache):
+                self.cache.put((word, posTag), lemma)
+                self.newEntries.append((word, posTag, lemma))
+
+    def stats(self):
+        """
+        Get the cache statistics, and the number of WordNet lookups made.
+        """
+        return { **self.cache.stats(), 'wordnetCalls': self.wordnetCalls }
@@ -0,0 +1,61 @@
+"""Test caching.py"""
+
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+
+import os
+from caching import LRUCache, ResultCache
+
+def test_LRUCacheEviction():
+    """Test that the least-recently-used entry is evicted"""
+
+    cache = LRUCache(maxSize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1 # 'b' is now the least-recently-used
+    cache.put('c', 3)
+
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert 'c' in cache
+    assert len(cache) == 2
+
+def test_LRUCacheStats():
+    """Test the hit/miss statistics"""
+
+    cache = LRUCache(maxSize=4)
+    loads = []
+
+    def loader():
+        loads.append(None)
+        return None # None should still be cached
+
+    for _ in range(3):
+        assert cache.getOrLoad('key', loader) is None
+
+    assert len(loads) == 1
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (2, 1, 1)
+    assert stats['hitRate'] == 2 / 3
+
+def test_resultCache(tmp_path):
+    """Test that results are keyed by their inputs, persist between instances, and are evicted least-recently-used first"""
+
+    cache = ResultCache(str(tmp_path))
+    key = ResultCache.getKey({ 'verse': [1, 2], 'version': 1 })
+    assert key == ResultCache.getKey({ 'version': 1, 'verse': [1, 2] }) # the order of keys does not matter
+    assert key != ResultCache.getKey({ 'verse': [1, 2], 'version': 2 })
+
+    assert cache.get(key) is None
+    cache.put(key, [{ 'content': 'light', 'token': '3' }])
+    assert ResultCache(str(tmp_path)).get(key) == [{ 'content': 'light', 'token': '3' }]
+    assert cache.get(key) == [{ 'content': 'light', 'token': '3' }]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    other = ResultCache.getKey('other')
+    cache.put(other, 'x' * 100)
+    os.utime(cache.getPath(key), (0, 0)) # key is now the least-recently-used
+
+    cache.maxBytes = 120 # room for only the larger result
+    assert cache.evict() == 1
+    assert not os.path.exists(cache.getPath(key))
+    assert os.path.exists(cache.getPath(other))
@@ -0,0 +1,30 @@
+"""Test counters.py"""
+
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+
+from counters import OccurrenceCounter, SCRIPTURE, STRONGS
+
+def test_occurrenceCounter():
+    """Test that occurrences are counted per side, and that decrements update uniqueness"""
+
+    counter = OccurrenceCounter(['the', 'light', 'the', None], ['light', 'the', 'day'])
+
+    assert counter.get('the') == (2, 1)
+    assert counter['day'] == (0, 1)
+    assert counter.get('night') is None
+    assert None in counter
+    assert counter.count('night', STRONGS) == 0
+
+    assert counter.isUnique('light')
+    assert not counter.isUnique('the')
+    assert counter.allUnique(['light'])
+    assert not counter.allUnique(['light', 'the'])
+    assert not counter.allUnique(['light', 'night'])
+
+    counter.decrement('the', SCRIPTURE)
+    assert counter.isUnique('the')
+    assert counter.allUnique(['light', 'the'])
+
+    counter.decrement('light', STRONGS)
+    assert counter.get('light') == (1, 0)
+    assert not counter.isUnique('light')
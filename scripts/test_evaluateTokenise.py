@@ -0,0 +1,21 @@
+"""Test evaluateTokenise.py"""
+
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+
+from evaluateTokenise import getGoldVerses, scoreVerse
+
+def test_scoreVerse():
+    """Test that links are scored against the expected tokens, including tokens which belong to several strongs tokens"""
+
+    tokens = [{ 'token': '1' }, { 'token': '2' }, {}, { 'token': '4' }, { 'token': '3' }]
+    expectedTokens = [1, 3, None, [4, 5], 3]
+
+    # correct: 1, [4, 5], 3; made: 4 links; expected: 4 links; tokens: 5
+    assert scoreVerse(tokens, expectedTokens) == (3, 4, 4, 5)
+    assert scoreVerse(tokens[:-1], expectedTokens) is None
+
+def test_goldVerses():
+    """Test that only the gold verses which have been checked are evaluated"""
+
+    goldVerses = getGoldVerses(['JHN.1'])
+    assert [verse for _, verse, _, _ in goldVerses] == ['1', '2', '3', '4', '5', '6', '7', '8']
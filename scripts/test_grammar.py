@@ -0,0 +1,52 @@
+"""Test grammar.py"""
+
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+
+from grammar import GrammarTable
+
+SCRIPTURE_TOKENS = [
+    { 'content': 'God', 'pos': ['NNP'] },
+    { 'content': 'created', 'pos': ['VBD'] },
+    { 'content': 'the', 'pos': ['DT'] },
+]
+STRONGS_TOKENS = [
+    { 'eng': 'God', 'pos': ['NNP'], 'grammar': [{ 'pos': 'noun' }] },
+    { 'eng': 'created', 'pos': ['VBN'], 'grammar': [{ 'pos': 'verb' }, { 'pos': 'third person masculine singular' }] },
+    { 'eng': '-', 'pos': ['DT'], 'grammar': [{ 'pos': 'direct object marker' }] },
+]
+
+def test_morphologyMatrix():
+    """Test that strongs grammar tags are compatible with the expected Penn Treebank tags"""
+
+    matrix = GrammarTable().getMorphologyMatrix(
+        [token['pos'] for token in SCRIPTURE_TOKENS],
+        [[tag['pos'] for tag in token['grammar']] for token in STRONGS_TOKENS],
+    )
+
+    assert matrix.shape == (3, 3)
+    assert matrix.tolist() == [
+        [True, False, False],
+        [False, True, False],
+        [True, False, False], # as we are dealing with Hebrew, 'DT' may be tagged as a noun
+    ]
+
+def test_backupMorphologyMatrix():
+    """Test that backup matching compares the Penn Treebank tags of both tokens"""
+
+    matrix = GrammarTable().getBackupMorphologyMatrix([token['pos'] for token in SCRIPTURE_TOKENS], [token['pos'] for token in STRONGS_TOKENS])
+
+    assert matrix.tolist() == [
+        [True, False, False],
+        [False, False, False],
+        [False, False, True],
+    ]
+
+def test_hasPOS():
+    """Test that scripture tokens are flagged by whether they have any of a set of Penn Treebank tags"""
+
+    table = GrammarTable()
+    scripturePOS = [token['pos'] for token in SCRIPTURE_TOKENS]
+
+    assert table.hasPOS(scripturePOS, ['DT', 'IN']).tolist() == [False, False, True]
+    assert table.hasPOS(scripturePOS, ['NN', 'NNS', 'NNP', 'NNPS']).tolist() == [True, False, False]
+    assert table.hasPOS(scripturePOS, ['UH']).tolist() == [False, False, False]
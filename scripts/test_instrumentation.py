@@ -0,0 +1,72 @@
+"""Test instrumentation.py"""
+
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+
+import csv
+import json
+from types import SimpleNamespace
+from instrumentation import Instrumentation, ProvenanceTrace
+
+def recordVerse(instrumentation, verse, links, lemmaHits):
+    """Record a verse with a single phase, as a TokenisationJob would"""
+
+    instrumentation.beginVerse(verse, { 'lemmaHits': 0, 'lemmaMisses': 0, 'synonymHits': 0, 'synonymMisses': 0 })
+    instrumentation.recordPhase('MORPHOLOGY IDENTICAL linkWholeMatches', 0.5, links, 0, 10)
+    job = SimpleNamespace(workingTokens=[None] * 3, strongs=[None] * 2, pairsEvaluated=10, pairsExhaustive=60, linksMade=links, reverts=1, timings={ 'counting': 0.25, 'sweep MORPHOLOGY': 0.5 })
+    instrumentation.endVerse(job, { 'lemmaHits': lemmaHits, 'lemmaMisses': 0, 'synonymHits': 0, 'synonymMisses': 0 })
+
+def test_instrumentationSummary():
+    """Test that the records of each verse are aggregated, including those merged from another process"""
+
+    instrumentation = Instrumentation()
+    recordVerse(instrumentation, 'GEN.1.1', 2, 5)
+
+    worker = Instrumentation()
+    recordVerse(worker, 'GEN.1.2', 3, 1)
+    instrumentation.merge(worker.drainRecords())
+    assert not worker.records
+
+    summary = instrumentation.summary()
+    assert (summary['verses'], summary['links'], summary['reverts'], summary['lemmaHits']) == (2, 5, 2, 6)
+    assert summary['time'] == 1.5
+    assert summary['phases']['MORPHOLOGY IDENTICAL linkWholeMatches'] == { 'calls': 2, 'links': 5, 'reverts': 0, 'pairsEvaluated': 20, 'time': 1.0 }
+    assert summary['sections'] == { 'counting': 0.5, 'sweep MORPHOLOGY': 1.0 }
+
+def test_instrumentationExport(tmp_path):
+    """Test the JSON and CSV exports"""
+
+    instrumentation = Instrumentation()
+    recordVerse(instrumentation, 'GEN.1.1', 2, 5)
+
+    instrumentation.export(str(tmp_path / 'verses.json'))
+    with open(tmp_path / 'verses.json', 'r', encoding='utf-8') as f:
+        assert json.load(f)['verses'][0]['links'] == 2
+
+    instrumentation.export(str(tmp_path / 'verses.csv'))
+    with open(tmp_path / 'verses.csv', 'r', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert (rows[0]['verse'], rows[0]['links'], rows[0]['lemmaHits']) == ('GEN.1.1', '2', '5')
+
+    instrumentation.toCSV(str(tmp_path / 'phases.csv'), phases=True)
+    with open(tmp_path / 'phases.csv', 'r', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert (rows[0]['phase'], rows[0]['calls']) == ('MORPHOLOGY IDENTICAL linkWholeMatches', '1')
+
+def test_provenanceTrace(tmp_path):
+    """Test that the trace keeps only the most recent records, and can be dumped per verse"""
+
+    trace = ProvenanceTrace(capacity=2)
+    trace.record(('GEN.1.1', 'link', 'linkWholeMatches', 'MORPHOLOGY', 'IDENTICAL', (0, 'in'), ('1', 'in'), [(0, 'in')], None))
+    trace.record(('GEN.1.2', 'link', 'linkNonUniqueMatches', 'MORPHOLOGY', 'IDENTICAL', (4, 'and'), ('5', 'and'), None, [('5', 'and'), ('9', 'and')]))
+    trace.record(('GEN.1.2', 'unlink', 'revertAnomalies', 'MORPHOLOGY', 'IDENTICAL', (4, 'and'), ('5', 'and'), None, None))
+
+    assert len(trace) == 2
+    assert trace.verses() == ['GEN.1.2']
+    assert not trace.dump('GEN.1.1')
+    assert [record['event'] for record in trace.dump('GEN.1.2')] == ['link', 'unlink']
+    assert trace.format('GEN.1.2').split('\n')[0] == '  link and#4 -> and#5 by linkNonUniqueMatches (MORPHOLOGY, IDENTICAL); strongsCandidates: and#5, and#9'
+
+    trace.toJSONL(str(tmp_path / 'trace.jsonl'), 'GEN.1.2')
+    with open(tmp_path / 'trace.jsonl', 'r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert records[1]['phase'] == 'revertAnomalies'
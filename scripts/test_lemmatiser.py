@@ -0,0 +1,105 @@
+"""Test lemmatiser.py"""
+
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+
+import os
+import pytest
+from lemmatiser import LemmaService
+
+def fakeWordnet(service, calls, lemmas=None):
+    """Stand in for WordNet, which lemmatises a word by dropping a trailing 's' (unless it is one of the given { (word, POS tag): lemma })"""
+
+    def lemmatiseWithWordnet(word, posTag):
+        calls.append((word, posTag))
+        if ((word, posTag) in (lemmas or {})):
+            return lemmas[(word, posTag)]
+        return word[:-1] if word.endswith('s') else ''
+
+    service.lemmatiseWithWordnet = lemmatiseWithWordnet
+
+def test_sharedLemmas(tmp_path):
+    """Test that a process attached to a shared table looks lemmas up in it, and only computes (and passes back) those missing from it"""
+
+    parent = LemmaService(path=None)
+    fakeWordnet(parent, [])
+    parent.lemmatise('waters', ['n'])
+    parent.lemmatise('light', ['n', 'v'])
+    tablePath = parent.share(os.path.join(tmp_path, 'lemma_cache.bin'))
+
+    calls = []
+    worker = LemmaService(path=None)
+    fakeWordnet(worker, calls)
+    worker.attach(tablePath, cacheSize=2)
+    assert worker.lemmatise('waters', ['n']) == frozenset(['water'])
+    assert worker.lemmatise('light', ['v']) == frozenset()
+    assert worker.lemmatise('lights', ['n']) == frozenset(['light'])
+    assert calls == [('lights', 'n')]
+    assert worker.drainNewEntries() == [('lights', 'n', 'light')]
+    assert len(worker.cache) <= 2
+
+def test_lemmatisePOS():
+    """Test that lemmas are cached by word and POS tag, so that a word's lemmas differ by POS, and that overrides apply to every POS"""
+
+    calls = []
+    service = LemmaService(path=None)
+    fakeWordnet(service, calls, { ('was', 'v'): 'be' })
+    assert service.lemmatise('was', ['v']) == frozenset(['be'])
+    assert service.lemmatise('was', ['n']) == frozenset(['wa'])
+    assert service.lemmatise('was', ['n', 'v']) == frozenset(['be', 'wa'])
+    assert calls == [('was', 'v'), ('was', 'n')]
+
+    assert service.lemmatise('spared', ['v', 'a']) == frozenset(['spare'])
+    assert calls == [('was', 'v'), ('was', 'n')]
+
+def test_lemmaCacheBound():
+    """Test that the cache holds no more than its maximum size, evicting the least recently used lemmas"""
+
+    calls = []
+    service = LemmaService(maxSize=2, path=None)
+    fakeWordnet(service, calls)
+    for word in ['waters', 'lights', 'waters', 'days']: # 'lights' is evicted
+        service.lemmatise(word, ['n'])
+    assert len(service.cache) == 2
+
+    service.lemmatise('waters', ['n'])
+    service.lemmatise('lights', ['n'])
+    assert calls == [('waters', 'n'), ('lights', 'n'), ('days', 'n'), ('lights', 'n')]
+
+def test_saveLemmaCache(tmp_path):
+    """Test that saved lemmas are loaded by the next run, rather than computed again"""
+
+    path = os.path.join(tmp_path, 'lemma_cache.json')
+    service = LemmaService(path=path)
+    fakeWordnet(service, [])
+    service.lemmatise('waters', ['n'])
+    service.lemmatise('light', ['n', 'v'])
+    service.save()
+    assert not service.newEntries
+
+    calls = []
+    service = LemmaService(path=path)
+    fakeWordnet(service, calls)
+    assert service.lemmatise('waters', ['n']) == frozenset(['water'])
+    assert service.lemmatise('light', ['n', 'v']) == frozenset()
+    assert not calls
+
+@pytest.mark.parametrize('contents', [None, '', '{"waters": "water"', '[["waters", "n"]]', '42'])
+def test_unreadableLemmaCache(tmp_path, contents):
+    """Test that a missing, or corrupt, cache file is ignored (the lemmas are computed again), and replaced when the cache is saved"""
+
+    path = os.path.join(tmp_path, 'lemma_cache.json')
+    if (contents is not None):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(contents)
+
+    calls = []
+    service = LemmaService(path=path)
+    fakeWordnet(service, calls)
+    assert service.lemmatise('waters', ['n']) == frozenset(['water'])
+    assert calls == [('waters', 'n')]
+
+    service.save()
+    service = LemmaService(path=path)
+    fakeWordnet(service, calls)
+    assert service.lemmatise('waters', ['n']) == frozenset(['water'])
+    assert calls == [('waters', 'n')]
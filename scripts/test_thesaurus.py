@@ -0,0 +1,66 @@
+"""Test thesaurus.py"""
+
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+
+import json
+import os
+
+from thesaurus import SynonymIndex, Thesaurus
+
+ENTRIES = {
+    'light': { 'n': [['illumination'], ['lamp']], 'a': [['bright']] },
+    'lïght': { 'n': [['unicode']] },
+    'day': { 'n': [['daytime']] },
+    'a': { 'n': [['letter a']] },
+}
+
+def test_compiledThesaurus(tmp_path):
+    """Test that the compiled thesaurus gives the same entries as the JSON"""
+
+    path = os.path.join(tmp_path, 'thesaurus.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(ENTRIES, f)
+
+    thesaurus = Thesaurus(path, os.path.join(tmp_path, 'thesaurus.bin'))
+    assert thesaurus.table is None # nothing is loaded until the first lookup
+
+    assert len(thesaurus) == len(ENTRIES)
+    for word, synonyms in ENTRIES.items():
+        assert thesaurus.get(word) == synonyms
+    assert thesaurus.get('night') is None
+    assert 'night' not in thesaurus
+
+def test_staleThesaurus(tmp_path):
+    """Test that the compiled thesaurus is rebuilt when the JSON changes"""
+
+    path = os.path.join(tmp_path, 'thesaurus.json')
+    compiledPath = os.path.join(tmp_path, 'thesaurus.bin')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(ENTRIES, f)
+    assert Thesaurus(path, compiledPath).get('night') is None
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({ **ENTRIES, 'night': { 'n': [['dark']] } }, f)
+    os.utime(path, (os.path.getmtime(compiledPath) + 1, os.path.getmtime(compiledPath) + 1))
+
+    assert Thesaurus(path, compiledPath).get('night') == { 'n': [['dark']] }
+
+def test_synonymIndex(tmp_path):
+    """Test that synonym expansions are interned, and cached by word and POS"""
+
+    path = os.path.join(tmp_path, 'thesaurus.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({ **ENTRIES, 'lamp': { '_': [['light']] } }, f)
+    synonymIndex = SynonymIndex(Thesaurus(path, os.path.join(tmp_path, 'thesaurus.bin')))
+
+    nounSynonyms = synonymIndex.getSynonymIds('light', {'n'})
+    assert synonymIndex.getWords(nounSynonyms) == {'light', 'illumination', 'lamp'}
+    assert synonymIndex.getWords(synonymIndex.getSynonymIds('light', {'a', 'n'})) == {'light', 'illumination', 'lamp', 'bright'}
+    assert synonymIndex.getSynonymIds('light', ['n']) is nounSynonyms # cached
+
+    # '_' entries apply to every POS
+    assert nounSynonyms & synonymIndex.getSynonymIds('lamp', set())
+    assert not nounSynonyms & synonymIndex.getSynonymIds('day', {'n'})
+
+    stats = synonymIndex.stats()
+    assert (stats['hits'], stats['misses']) == (1, 4)
@@ -0,0 +1,106 @@
+"""Test tokenSinks.py"""
+
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+
+import json
+import os
+import pytest
+from tokenSinks import ChapterSink, JSONLSink, openSink
+
+RESULTS = [
+    ('GEN.1', '1', [{ 'content': 'In', 'token': '0' }]),
+    ('GEN.1', '2', None),
+    ('GEN.2', '1', [{ 'content': 'Thus', 'token': '1' }]),
+    ('GEN.3', '1', [{ 'content': 'Now', 'token': '2' }]),
+]
+
+class Crash(Exception):
+    """An interruption of a run"""
+
+def writeUntil(sink, results, stop=None):
+    """Write results to a sink, crashing before the `stop`th, if given"""
+
+    with sink:
+        for index, (passage, verse, tokens) in enumerate(results):
+            if (index == stop):
+                raise Crash()
+            sink.write(passage, verse, tokens)
+
+def test_JSONLSink(tmp_path):
+    """Test that JSON lines are resumed from the last completed chapter, discarding a chapter in progress"""
+
+    path = os.path.join(tmp_path, 'output', 'tokens.jsonl')
+
+    with pytest.raises(Crash):
+        writeUntil(JSONLSink(path, flushInterval=0), RESULTS, stop=3) # during GEN.2 (which is only completed when GEN.3 begins)
+
+    sink = JSONLSink(path)
+    assert sink.completed == { 'GEN.1' }
+    passages = sink.remaining(['GEN.1', 'GEN.2', 'GEN.3'])
+    assert passages == ['GEN.2', 'GEN.3']
+    writeUntil(sink, [result for result in RESULTS if result[0] in passages])
+
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert lines == [{ 'passage': passage, 'verse': verse, 'tokens': tokens } for passage, verse, tokens in RESULTS]
+    with JSONLSink(path) as sink:
+        assert sink.remaining(['GEN.1', 'GEN.2', 'GEN.3']) == []
+
+def test_ChapterSink(tmp_path):
+    """Test that each chapter is written to its own file when it is complete, and that completed chapters are not rewritten"""
+
+    directory = os.path.join(tmp_path, 'chapters')
+
+    with pytest.raises(Crash):
+        writeUntil(ChapterSink(directory), RESULTS, stop=3) # during GEN.2
+    assert sorted(os.listdir(directory)) == ['GEN.1.json']
+
+    sink = openSink(directory)
+    assert isinstance(sink, ChapterSink)
+    assert sink.remaining(['GEN.1', 'GEN.2', 'GEN.3']) == ['GEN.2', 'GEN.3']
+    writeUntil(sink, RESULTS[2:])
+
+    with open(os.path.join(directory, 'GEN.1.json'), 'r', encoding='utf-8') as f:
+        assert json.load(f) == { '1': RESULTS[0][2], '2': None }
+    assert sorted(os.listdir(directory)) == ['GEN.1.json', 'GEN.2.json', 'GEN.3.json']
+
+def readSink(path):
+    """Read the verses written to a sink, as { passage: { verse: tokens } }"""
+
+    if (path.endswith('.jsonl')):
+        chapters = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                result = json.loads(line)
+                chapters.setdefault(result['passage'], {})[result['verse']] = result['tokens']
+        return chapters
+
+    chapters = {}
+    for name in os.listdir(path):
+        with open(os.path.join(path, name), 'r', encoding='utf-8') as f:
+            chapters[name[:-len('.json')]] = json.load(f)
+    return chapters
+
+@pytest.mark.parametrize('name', ['tokens.jsonl', 'chapters'])
+def test_failedChapter(tmp_path, name):
+    """Test that a chapter with a verse that failed is not completed, or written, and so is retried on resume"""
+
+    path = os.path.join(tmp_path, name)
+    with openSink(path, flushInterval=0) as sink:
+        for index, (passage, verse, tokens) in enumerate(RESULTS):
+            sink.write(passage, verse, tokens)
+            if (index == 2):
+                sink.fail('GEN.2', '2', 'KeyError: 2') # GEN.2 is not completed, although GEN.3 is
+    assert sink.failed == { 'GEN.2' }
+    assert sorted(readSink(path)) == ['GEN.1', 'GEN.3']
+
+    with openSink(path) as sink:
+        assert sink.remaining(['GEN.1', 'GEN.2', 'GEN.3']) == ['GEN.2']
+        sink.write(*RESULTS[2])
+    with openSink(path) as sink:
+        assert sink.remaining(['GEN.1', 'GEN.2', 'GEN.3']) == []
+
+    expected = {}
+    for passage, verse, tokens in RESULTS:
+        expected.setdefault(passage, {})[verse] = tokens
+    assert readSink(path) == expected
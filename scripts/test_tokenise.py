@@ -2,9 +2,19 @@
 
 # pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
 
+import json
 import os
+import re
+from types import SimpleNamespace
+import numpy as np
 import pytest
-from tokenise import Tokeniser
+import tokenise
+from counters import OccurrenceCounter
+from importTimes import DEFERRED_IMPORTS, measureImports
+from tokenise import MatchStrictness, PreparedStrongs, Tokeniser, buildStrongsPOS, contains, equals, estimateVerseCost, expandStrongsPOS, getChapterPath, getPassages, imapWindowed, tagStrongsPOS, tagVersesPOS, transferPOSTags
+from goldAlignments import GENESIS_1, JOHN_1
+from thesaurus import SynonymIndex
+from tokens import ScriptureToken
 
 def checkFilesExist(translation, passage):
     """A before test to check if necessary files for actual test."""
@@ -19,66 +29,532 @@ def checkFilesExist(translation, passage):
         # Skip the test (expected fail) if the required files are missing
         pytest.xfail(f"Missing required files: {', '.join(missingFiles)}")
 
-@pytest.mark.parametrize('verse,translation,expectedTokens', [
-    # GENESIS 1
-    ('1',  'NKJV', [1,1,1, 3, 2, 5,5, 6, 7,7]),
-    ('2',  'NKJV', [1,1, 2, 3,3, 4,4, 5,5, None, 6, 7,7, 8,8,8, 9,9,9, 10,10, 11,11, 12, 13,13, 14,14,14]),
-    ('3',  'NKJV', [1, 2, 1, 3,3,3, 4, 5,5,5, 6]),
-    ('4',  'NKJV', [1, 2, 1, 4,4, 5, None,None, 6, 7, 8, 7, 10,10, 11, 12,12]),
-    ('5',  'NKJV', [2, 1, 3,3, 4, 5,5,5, 6,6, 7, 8, 9,9, 10, 11,11, 10, 13,13, 12]),
-    ('6',  'NKJV', [1, 2, 1, 3,3,3, 4,4, 5,5,5, 6,6,6, 7,7,7, 8, 10,10, 9, 11,11]),
-    ('7',  'NKJV', [1, 2, 1, 4,4, 5,5, 7,7, 8, None, 9, 10,10, 6, 12,12, 13, None, 14, 15,15, 16,16,16, 17]),
-    ('8',  'NKJV', [1, 2, 1, 3,3, 4, 5, 6,6, 7, 8,8, 7, 10,10, 9]),
-    ('9',  'NKJV', [1, 2, 1, 3, 4,4, 5, 6,6, 3,3,3, 7, 9, 8, 10,10, 11,11, None, 10, 12,12, 12, 13]),
-    ('10', 'NKJV', [1, 2, 1, 3,3, None, 4, 5,5,5,5, 6,6,6, 7,7, 8, 9, 10, 9, 11, None,None, 12]),
-    ('11', 'NKJV', [1, 2, 1, 3, 4,4, 3,3, 5, 6,6, None, 7, 8, None, 9, 10, 9, None, 11, 12, 13,13,13,13, 14, 15, None, 16,16, 17, 18,18, 19,19,19, 20]),
-    ('12', 'NKJV', [1, 2,2, 1,1, 3, 4,4, None, 5, 6, 7,7,7,7, 8,8,8, None, 9, 10, 11, 12, None, 13,13, 14,14,14,14, 15, 16, 15, 17, None,None, 18]),
-    ('13', 'NKJV', [1, 2,2, 3, 4,4, 3, 6,6, 5]),
-    ('14', 'NKJV', [1, 2, 1, 3,3,3, 4, 5,5,5, 6,6,6, 7,7, 9,9, 10, 11,11, 12,12,12,12, 13,13, 14,14, 15,15,15, 16,16]),
-    ('15', 'NKJV', [1,1,1,1, 2,2, 3,3,3, 4,4,4, 5,5,5, 6, 7,7, 8,8,8, 9]),
-    ('16', 'NKJV', [1, 2, 1, 4, 6, 5, 8, 9, 8, 10,10, 11,11, 12, 13, 14, 13, 15,15, 16,16, None,None, 18, 18, 17]),
-    ('17', 'NKJV', [3, 1, 2, 4,4,4, 5,5,5, 6,6,6, 7, 8,8]),
-    ('18', 'NKJV', [1,1,1, 2,2,2, 3,3,3,3, 4,4,4, 6,6, 7, 8,8, 9, 10, 9, 11, None,None, 12]),
-    ('19', 'NKJV', [1, 2,2, 3, 4,4, 3, 6,6, 5]),
-    ('20', 'NKJV', [1, 2, 1, 3, 4,4, 3, 5,5,5, 6, 7, 6, 8, 9, 8, 9, 10, 11,11, 12, 13,13, 14,14,14, 15,15,15]),
-    ('21', 'NKJV', [1, 2, 1, 5, 4,4, 6, 7, 9, 8, 10,10, 11,11, 13,13, 12, 14,14,14,14, 15, 16, 19, 18, 20,20,20,20, 21, 22, 21, 23, None,None, 24]),
-    ('22', 'NKJV', [1, 3, 1, 2, 4, 5,5, 6,6, 7,7, 9,9, 10,10,10, 11, 12, 11, 12, 13,13,13]),
-    ('23', 'NKJV', [1, 2,2, 3, 4,4, 3, 6,6, 5]),
-    ('24', 'NKJV', [1, 2, 1, 3, 4,4, 3,3, 5, 6, 5, 7,7,7,7, 8, 9,9,9, 10,10, 11,11,11, None, 12,12,12,12, 13,13,13, 14]),
-    ('25', 'NKJV', [1, 2, 1, 4,4, 5,5,5, 6,6,6,6, 8, 9,9,9,9, 10, 11, 12,12,12, 13,13, 14,14,14,14, 15, 16, 15, 17, None,None, 18]),
-    ('26', 'NKJV', [1, 2, 1, 3,3,3, 4, 5,5,5, 6,6,6,6, 7,7,7,7, 8,8,8, 9,9,9, 10,10,10, 11,11,11, 12,12,12,12, 13,13, 14,14, 15,15,15, 16,16, 17,17, 18, 19, 9]),
-    ('27', 'NKJV', [1, 2, 1, 4, 5,5, None, 5, 6,6,6, 7,7, 8,8, 9, 10, 11,11, 12,12, 13]),
-    ('28', 'NKJV', [1, 3, 1, 2, 4, 6, 4, 5,5, 7,7, 8,8, 9, 11,11, 12,12,12, 13,13, 14,14,14, 15,15,15, 16,16,16, 17,17,17, 18,18,18, 19,19, 20,20, 21, 22,22]),
-    ('29', 'NKJV', [1, 2, 1, 3, 4,4,4, 5, 7, 8, None, 9, 10, 11, None, 12, 13,13, 14,14, 15,15, 16, 17, 18, 19, 21, 23, 24, 25,25, 26,26,26, 27,27]),
-    ('30', 'NKJV', [1,1,1, 2, 3,3,3, 4,4, 5, 6,6,6, 7,7,7, 8,8, 9, 10,10, 12, 11, None,None, 14, None,None,None, 16, 17, 18, 19,19, 20,20,20, 21]),
-    ('31', 'NKJV', [1, 2, 1, 4, 5, 6,6,6, 7,7, None,None, 9, 8, 10, 11,11, 12, 13,13, 12, 15,15, 14]),
-])
+@pytest.mark.parametrize('verse,translation,expectedTokens', GENESIS_1)
 def test_Genesis1(verse, translation, expectedTokens):
     """Test Genesis 1 tokenisation"""
 
     tokenisePassage('GEN.1', verse, translation, expectedTokens)
 
-@pytest.mark.parametrize('verse,translation,expectedTokens', [
-    # JOHN 1
-    ('1',  'NKJV', [1,1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 12, 13, 16, 17, 15, 14]),
-    ('2',  'NKJV', [1, 2, 3,3, 4, 5, 7]),
-    ('3',  'NKJV', [1,1, 4,4, 2, 3, 5, 6, 7, [9,10], 8,8, 11, 12,12]),
-    ('4',  'NKJV', [1, 2, 4, 3, 5, 6, 7, 8, 9, 10, 12,12]),
-    ('5',  'NKJV', [1, 2, 3, 7, 4, 5, 6, 8, 9, 10, 13, 12, 13, 11]),
-    ('6',  'NKJV', [1, 3, 2,2, 3, 4, 5, 7, 6, None, 9]),
-    ('7',  'NKJV', [1,1, 2, 3, 4,4, [5,6],[5,6], 7, 8, 9, 10, 11, 13, 14, 12,12]),
-    ('8',  'NKJV', [3, 2, 1, 4, 5, 6, None,None, [7,8],[7,8], 8, 9, 10, 11]),
-    ('9',  'NKJV', []), # TODO
-    ('10', 'NKJV', []), # TODO
-    ('11', 'NKJV', []), # TODO
-    ('12', 'NKJV', []), # TODO
-    ('13', 'NKJV', []), # TODO
-])
+@pytest.mark.parametrize('verse,translation,expectedTokens', JOHN_1)
 def test_John1(verse, translation, expectedTokens):
     """Test Genesis 1 tokenisation"""
 
     tokenisePassage('JHN.1', verse, translation, expectedTokens)
 
+def test_tokeniseChapter():
+    """Test that tokenising a whole chapter matches tokenising each verse, reading each file once"""
+
+    checkFilesExist('NKJV', 'GEN.1')
+
+    tokeniser = Tokeniser()
+    Tokeniser.DOCUMENT_CACHE.clear()
+    chapter = tokeniser.tokeniseChapter('GEN.1', 'NKJV', includeNotes=False)
+    assert Tokeniser.DOCUMENT_CACHE.stats()['misses'] == 2 # scripture, and strongs
+
+    for verse, tokens in chapter.items():
+        assert tokens == tokeniser.tokenisePassage('GEN.1', verse, 'NKJV', includeNotes=False)
+    assert Tokeniser.DOCUMENT_CACHE.stats()['misses'] == 2
+
+def test_iterTokenise():
+    """Test that streaming the tokenisation of passages yields every verse, in order, as tokenising each chapter does"""
+
+    checkFilesExist('NKJV', 'GEN.1')
+    checkFilesExist('NKJV', 'JHN.1')
+
+    tokeniser = Tokeniser()
+    expected = [
+        (passage, verse, tokens)
+        for passage in ['GEN.1', 'JHN.1']
+        for verse, tokens in tokeniser.tokeniseChapter(passage, 'NKJV').items()
+    ]
+    assert list(tokeniser.iterTokenise('NKJV', ['GEN.1', 'JHN.1'], processes=1)) == expected
+
+def test_tokeniseTranslations():
+    """Test that aligning several translations against the same Strong's matches aligning each translation separately"""
+
+    checkFilesExist('NKJV', 'GEN.1')
+    checkFilesExist('ESV', 'GEN.1')
+
+    tokeniser = Tokeniser()
+    scriptureChapters = { translation: tokeniser.loadChapter(translation, 'GEN.1') for translation in ['NKJV', 'ESV'] }
+    results = tokeniser.tokeniseTranslations('GEN.1', scriptureChapters, tokeniser.loadChapter('strongs', 'GEN.1'), tokeniser.loadStrongsPOS('GEN.1'))
+    for translation in ['NKJV', 'ESV']:
+        assert results[translation] == Tokeniser().tokeniseChapter('GEN.1', translation)
+
+def test_getPassages():
+    """Test that ranges of books and chapters are expanded into passages, in canonical order, and that unknown references are reported"""
+
+    assert len(getPassages('GEN')) == 50
+    assert getPassages('gen.49') == ['GEN.49', 'GEN.50'] # to the end of the start's book
+    assert getPassages('GEN.49', 'EXO.2') == ['GEN.49', 'GEN.50', 'EXO.1', 'EXO.2']
+    assert getPassages('GEN.50', 'EXO') == ['GEN.50'] + [f'EXO.{chapter}' for chapter in range(1, 41)]
+    assert getPassages()[:2] == ['GEN.1', 'GEN.2']
+
+    with pytest.raises(ValueError, match="Unknown chapter 'GEN.51'"):
+        getPassages('GEN.51')
+    with pytest.raises(ValueError, match="Unknown chapter 'EXO.41'"):
+        getPassages('GEN', 'EXO.41')
+    with pytest.raises(ValueError, match="Unknown book 'XYZ'"):
+        getPassages('XYZ')
+
+def test_estimateVerseCost(monkeypatch):
+    """Test that the cost of a verse grows with its words (but not its notes) and its Strong's words, and that the most expensive chapters are tokenised first"""
+
+    scripture = [{ 'type': 'text', 'content': 'In the beginning' }, { 'type': 'note', 'content': 'or When God began' }, { 'content': 'God created' }]
+    strongs = { '1': { 'eng': 'in the beginning' }, '2': { 'eng': 'God' } }
+    assert estimateVerseCost(scripture, strongs) == 5 * 4
+
+    verses = { 'GEN.1': 'in the beginning', 'GEN.2': 'thus the heavens and the earth were finished', 'GEN.3': 'now' }
+    monkeypatch.setattr(tokenise, 'getPassages', lambda start, end: list(verses))
+    monkeypatch.setattr(Tokeniser, 'newChapterJob', lambda self, translations, passage, includeNotes: (
+        estimateVerseCost([{ 'content': verses[passage] }], strongs), passage, { 'NKJV': { '1': [] } }, {}, None, includeNotes,
+    ))
+    order = []
+    monkeypatch.setattr(tokenise, 'tokeniseChapterJob', lambda job: order.append(job[1]) or (job[1], { 'NKJV': { '1': [] } }, {}, [], (0, 0), [], []))
+
+    results = Tokeniser().tokeniseCorpus('NKJV', 'GEN', processes=1, progress=lambda *_: None)
+    assert order == ['GEN.2', 'GEN.1', 'GEN.3'] # longest first
+    assert list(results) == ['GEN.1', 'GEN.2', 'GEN.3'] # in canonical order
+
+class ImmediatePool:
+    """A pool which runs each job as soon as it is submitted, counting the jobs submitted"""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def apply_async(self, function, args):
+        """Run a job"""
+        self.submitted += 1
+        return SimpleNamespace(get=lambda result=function(*args): result)
+
+def test_imapWindowed():
+    """Test that windowed results are yielded in order, with no more than the window of jobs taken ahead of them"""
+
+    for window in [1, 3, 20]:
+        pool = ImmediatePool()
+        results = []
+        for result in imapWindowed(pool, lambda job: job * 2, iter(range(10)), window):
+            assert pool.submitted - len(results) <= window
+            results.append(result)
+        assert results == [job * 2 for job in range(10)]
+    assert not list(imapWindowed(ImmediatePool(), lambda job: job, iter([]), 2))
+
+def useTagger(monkeypatch):
+    """Use NLTK's tokeniser and POS tagger, or, if their data is not installed, a stand-in which tags each word by the word before it (in the same sentence)"""
+
+    import nltk # pylint: disable=import-outside-toplevel # NLTK is slow to import
+    try:
+        nltk.pos_tag_sents([nltk.word_tokenize('In the beginning')])
+        return
+    except LookupError:
+        pass
+
+    def tag(sentence):
+        return [(word, 'NN' if (index > 0 and sentence[index - 1].lower() == 'the') else ('.' if not word.isalnum() else 'VB')) for index, word in enumerate(sentence)]
+
+    monkeypatch.setattr(nltk, 'word_tokenize', lambda text: re.findall(r"\w+|[^\w\s]", text))
+    monkeypatch.setattr(nltk, 'pos_tag_sents', lambda sentences: [tag(sentence) for sentence in sentences])
+
+def test_tagVersesPOS(monkeypatch):
+    """Test that tagging verses in one batch tags each verse as tagging it alone does, without notes, and with empty verses"""
+
+    useTagger(monkeypatch)
+    verses = [
+        [{ 'content': 'In the beginning' }, { 'type': 'note', 'content': 'the first' }, { 'content': 'God created the heavens and the earth.' }],
+        [],
+        [{ 'type': 'note', 'content': 'the heavens' }],
+        [{ 'content': 'Then God said,' }, { 'content': '“Let there be light”;' }],
+    ]
+    batched = tagVersesPOS(verses)
+    assert batched == [tagVersesPOS([verse])[0] for verse in verses]
+    assert [word for word, _ in batched[0]] == ['In', 'the', 'beginning', 'God', 'created', 'the', 'heavens', 'and', 'the', 'earth', '.']
+    assert batched[1] == batched[2] == []
+
+def test_transferPOSTags():
+    """Test that the tags of a tagged verse are mapped back onto its tokens, including punctuation, tokens of several words, and notes"""
+
+    tokens = [
+        { 'content': 'And' }, { 'content': 'God' }, { 'type': 'note', 'content': 'or gods' }, { 'content': 'said,' },
+        { 'content': '“Let' }, { 'content': 'the heavens' }, { 'content': 'be.”' },
+    ]
+    taggedVerse = [('And', 'CC'), ('God', 'NNP'), ('said', 'VBD'), (',', ','), ('“', '``'), ('Let', 'VB'), ('the', 'DT'), ('heavens', 'NNS'), ('be', 'VB'), ('.', '.'), ('”', "''")]
+    assert transferPOSTags(tokens, taggedVerse) is tokens
+    assert [token.get('pos') for token in tokens] == [['CC'], ['NNP'], None, ['VBD', ','], ['``', 'VB'], ['DT', 'NNS'], ['VB', '.', "''"]]
+
+    strongs = [{ 'eng': 'in', 'token': '1' }, { 'eng': 'beginning', 'token': '1' }]
+    assert [token['pos'] for token in transferPOSTags(strongs, [('in', 'IN'), ('beginning', 'NN')], 'eng')] == [['IN'], ['NN']]
+
+    assert not transferPOSTags([], [])
+    with pytest.raises(ValueError):
+        transferPOSTags([{ 'content': 'light' }], [('dark', 'NN')])
+
+def test_strongsPOS(monkeypatch, tmp_path):
+    """Test that the precomputed POS tags of the Strong's data match tagging it inline, and that they are not used once missing, or stale"""
+
+    useTagger(monkeypatch)
+    monkeypatch.setattr(tokenise, 'DATA_DIR', str(tmp_path))
+    strongsChapter = {
+        '1': { '1': { 'eng': 'in the beginning' }, '2': { 'eng': 'God' }, '3': { 'eng': 'created' } },
+        '2': { '1': { 'eng': 'and the earth' }, '2': { 'eng': 'was' }, '3': { 'eng': 'without form,' } },
+        '3': {},
+    }
+    os.makedirs(os.path.join(tmp_path, 'strongs'))
+    with open(getChapterPath('strongs', 'GEN.1'), 'w', encoding='utf-8') as f:
+        json.dump(strongsChapter, f)
+    os.makedirs(os.path.join(tmp_path, 'NKJV', 'NKJV'))
+    with open(getChapterPath('NKJV', 'GEN.1'), 'w', encoding='utf-8') as f:
+        json.dump({ '1': [{ 'content': 'In the beginning God created' }] }, f)
+
+    tokeniser = Tokeniser()
+    Tokeniser.DOCUMENT_CACHE.clear()
+    assert tokeniser.loadStrongsPOS('GEN.1') is None # not built
+
+    assert buildStrongsPOS('GEN.1', 'GEN.1') == 1
+    strongsPOS = tokeniser.loadStrongsPOS('GEN.1')
+    assert set(strongsPOS) == { '1', '2' }
+    for verse, taggedWords in strongsPOS.items():
+        assert expandStrongsPOS(taggedWords) == tagStrongsPOS(strongsChapter[verse])
+    assert tokeniser.newChapterJob(['NKJV'], 'GEN.1')[4] == strongsPOS
+
+    # the Strong's data has changed since it was built, so it is tagged inline again
+    sidecarTime = os.path.getmtime(getChapterPath('strongs.pos', 'GEN.1'))
+    os.utime(getChapterPath('strongs', 'GEN.1'), (sidecarTime + 1, sidecarTime + 1))
+    assert tokeniser.loadStrongsPOS('GEN.1') is None
+    assert tokeniser.newChapterJob(['NKJV'], 'GEN.1')[4] is None
+
+    os.remove(getChapterPath('strongs.pos', 'GEN.1'))
+    assert tokeniser.loadStrongsPOS('GEN.1') is None
+    Tokeniser.DOCUMENT_CACHE.clear()
+
+def test_positionalBand():
+    """Test that banded candidates are limited to similar relative positions, and that the band widens when there are none"""
+
+    index = { 'the': [0, 10, 50, 90], 'light': [95] }
+
+    job = Tokeniser().newJob('NKJV')
+    assert job.lookupBandedCandidates(index, ['the'], 5, 10, 100) == [0, 10, 50, 90] # the whole verse is searched
+
+    job = Tokeniser(positionalBand=0.1).newJob('NKJV')
+    assert job.lookupBandedCandidates(index, ['the'], 5, 10, 100) == [50] # 40 <= position <= 60
+    assert job.lookupBandedCandidates(index, ['the', 'light'], 9, 10, 100) == [90, 95]
+    assert job.lookupBandedCandidates(index, ['light'], 0, 10, 100) == [95] # widened until found
+
+    with pytest.raises(ValueError):
+        Tokeniser(positionalBand=0)
+
+def test_positionalBandLinked():
+    """Test that the band widens when every candidate within it is already linked, as the links change"""
+
+    job = Tokeniser(positionalBand=0.1).newJob('NKJV')
+    job.workingTokens = [None] * 100
+    job.strongs = [SimpleNamespace(word='the')] * 10
+    job.links = np.full(100, -1)
+    job.usesStrongs = np.ones(100, dtype=bool)
+    job.linkChanges, job.strongsUses, job.changedTokens = 0, (-1, None), set()
+    job.pairsEvaluated = job.pairsExhaustive = 0
+    job.candidateCache = {}
+    job.scriptureIndexes = { MatchStrictness.IDENTICAL: { 'the': [50, 95] } }
+    job.strongsIndexes = { MatchStrictness.IDENTICAL: { 'the': [5, 9] } }
+    job.scriptureKeys = { 50: { MatchStrictness.IDENTICAL: ['the'] } }
+
+    assert job.getScriptureCandidates(5, MatchStrictness.IDENTICAL) == [50]
+    assert job.getStrongsCandidates(50, MatchStrictness.IDENTICAL) == [5]
+
+    job.links[50] = 5
+    job.markChanged(50)
+    assert job.getScriptureCandidates(5, MatchStrictness.IDENTICAL) == [50, 95] # widened past the linked token
+    assert job.getStrongsCandidates(50, MatchStrictness.IDENTICAL) == [5, 9]
+
+    job.links[50] = -1
+    job.markChanged(50)
+    assert job.getScriptureCandidates(5, MatchStrictness.IDENTICAL) == [50] # not kept from before
+    assert job.getStrongsCandidates(50, MatchStrictness.IDENTICAL) == [5]
+
+def test_candidateIndexes(monkeypatch):
+    """Test that the indexed candidates of each kind of match, at each tolerance, are exactly the pairs that comparing every token with every other finds"""
+
+    lemmas = { 'gave': 'give', 'given': 'give', 'lamps': 'lamp', 'heavens': 'heaven', 'lands': 'land' }
+    monkeypatch.setattr(tokenise, 'lemmatiseWords', lambda words, posTags: frozenset(lemmas[word] for word in words.split(' ') if word in lemmas))
+    monkeypatch.setattr(tokenise, 'synonymIndex', SynonymIndex({ 'light': { '_': [['lamp']] }, 'lamps': { '_': [['light']] }, 'earth': { '_': [['land', 'ground']] } }))
+
+    scripture = ['In', 'the', 'beginning', 'God', 'created', 'the', 'heavens', 'and', 'the', 'earth,', 'and', 'the', 'lamps', 'gave', 'light.', 'Lands']
+    strongs = ['in the beginning', 'God', 'created', '-', 'the', 'heavens', 'and', 'the earth', 'light', 'lamp', 'given', 'land']
+    job = Tokeniser().newJob('NKJV')
+    job.workingTokens = [ScriptureToken(index, word, ['NN']) for index, word in enumerate(scripture)]
+    job.preparedStrongs = PreparedStrongs(
+        { str(number): {} for number in range(len(strongs)) },
+        [{ 'token': str(number), 'eng': word } for number, word in enumerate(strongs)],
+    )
+    job.strongs = job.preparedStrongs.tokens
+    job.links = np.full(len(scripture), -1)
+    job.pairsEvaluated = job.pairsExhaustive = 0
+    job.buildCandidateIndexes()
+
+    matches = {
+        MatchStrictness.IDENTICAL: (equals, lambda strongsToken, scriptureToken: contains(strongsToken, scriptureToken, mustMatchWholeWord=True), lambda scriptureToken, strongsToken: scriptureToken.word in strongsToken.words),
+        MatchStrictness.LEMMAS: (job.lemonymous, lambda *_: False, job.lemonymous), # there is no incomplete lemma matching
+        MatchStrictness.SYNONYMS: (*[lambda scriptureToken, strongsToken: job.synonymous(scriptureToken, strongsToken, MatchStrictness.SYNONYMS)] * 3,),
+    }
+    for matchTolerance, (isWhole, isIncomplete, isNonUnique) in matches.items():
+        for strongsIndex, strongsToken in enumerate(job.strongs):
+            if (strongsToken.eng == '-'):
+                continue
+            assert job.getScriptureCandidates(strongsIndex, matchTolerance) == [
+                scriptureIndex for scriptureIndex, scriptureToken in enumerate(job.workingTokens) if isWhole(scriptureToken, strongsToken)
+            ], (matchTolerance, strongs[strongsIndex])
+            assert job.getScriptureCandidates(strongsIndex, matchTolerance, incomplete=True) == [
+                scriptureIndex for scriptureIndex, scriptureToken in enumerate(job.workingTokens) if isIncomplete(strongsToken, scriptureToken)
+            ], (matchTolerance, strongs[strongsIndex])
+        for scriptureIndex, scriptureToken in enumerate(job.workingTokens):
+            assert job.getStrongsCandidates(scriptureIndex, matchTolerance) == [
+                strongsIndex for strongsIndex, strongsToken in enumerate(job.strongs) if strongsToken.eng != '-' and isNonUnique(scriptureToken, strongsToken)
+            ], (matchTolerance, scripture[scriptureIndex])
+    assert job.pairsEvaluated < job.pairsExhaustive
+
+def newAssignmentJob(scriptureCount, strongsCount):
+    """Create a job with unlinked scripture and strongs tokens, for assignCandidates"""
+
+    job = Tokeniser().newJob('NKJV')
+    job.workingTokens = [None] * scriptureCount
+    job.strongs = [None] * strongsCount
+    job.links = np.full(scriptureCount, -1)
+    job.usesStrongs = np.ones(scriptureCount, dtype=bool)
+    return job
+
+def greedyAssignment(candidates, scriptureCount, strongsCount):
+    """The closest-first assignment that assignCandidates replaced"""
+
+    pairs = sorted(
+        (abs(scriptureIndex / scriptureCount - strongsIndex / strongsCount), scriptureIndex, strongsIndex)
+        for scriptureIndex, strongsIndexes in candidates.items() for strongsIndex in strongsIndexes
+    )
+    linkedScripture, linkedStrongs, links = set(), set(), []
+    for _, scriptureIndex, strongsIndex in pairs:
+        if (scriptureIndex not in linkedScripture and strongsIndex not in linkedStrongs):
+            linkedScripture.add(scriptureIndex)
+            linkedStrongs.add(strongsIndex)
+            links.append((scriptureIndex, strongsIndex))
+    return sorted(links)
+
+def test_assignCandidates():
+    """Test that non-unique tokens are assigned optimally, once per strongs token, only to their candidates, and deterministically"""
+
+    candidates = { 0: [5], 5: [5, 9] }
+    job = newAssignmentJob(10, 10)
+    assert greedyAssignment(candidates, 10, 10) == [(5, 5)] # the closest pair is taken first, leaving 0 with nothing
+    assert job.assignCandidates(candidates) == [(0, 5), (5, 9)] # the most links, and then the least distance
+
+    # non-candidates are never linked, even when a scripture token is left without a link (0 is not a candidate of 9)
+    assert job.assignCandidates({ 0: [5], 1: [5], 9: [9] }) == [(1, 5), (9, 9)]
+
+    # a strongs token that is already linked has no capacity left...
+    job.links[7] = 5
+    assert job.assignCandidates(candidates) == [(5, 9)]
+    # ...unless its link does not use it up (an implicit article)
+    job.usesStrongs[7] = False
+    assert job.assignCandidates(candidates) == [(0, 5), (5, 9)]
+
+    # ties go to the earlier scripture token, whatever the order of the candidates
+    job = newAssignmentJob(10, 10)
+    assert job.assignCandidates({ 4: [3], 2: [3] }) == job.assignCandidates({ 2: [3], 4: [3] }) == [(2, 3)]
+
+def test_canLink():
+    """Test that a phase is only run when there is an unlinked token that it could link"""
+
+    job = Tokeniser().newJob('NKJV')
+    job.workingTokens = [SimpleNamespace(word=word) for word in ['the', 'light', 'shone', 'without']]
+    job.strongs = [SimpleNamespace(strongs='H216')]
+    job.tokenCounts = OccurrenceCounter(['light'], ['light'])
+    job.links = np.array([-1, -1, 0, 0])
+    job.unlinkedTokens = { 0, 1 }
+    job.isArticle = np.array([True, False, False, False])
+    job.scriptureKeys = [
+        { MatchStrictness.IDENTICAL: ['the'], MatchStrictness.LEMMAS: frozenset(['the']), MatchStrictness.SYNONYMS: frozenset() },
+        { MatchStrictness.IDENTICAL: ['light'], MatchStrictness.LEMMAS: frozenset(['light']), MatchStrictness.SYNONYMS: frozenset([7]) },
+    ]
+    job.preparedStrongs = SimpleNamespace(matchKeys={
+        MatchStrictness.IDENTICAL: { 'light' },
+        MatchStrictness.LEMMAS: {},
+        MatchStrictness.SYNONYMS: { 7: [0] },
+    })
+
+    assert job.canLink(job.linkWholeMatches, MatchStrictness.MORPHOLOGY, MatchStrictness.IDENTICAL)
+    assert not job.canLink(job.linkWholeMatches, MatchStrictness.MORPHOLOGY, MatchStrictness.LEMMAS) # no strongs lemmas
+    assert job.canLink(job.linkNonUniqueMatches, None, MatchStrictness.SYNONYMS)
+    assert not job.canLink(job.linkIncompleteMatches, None, MatchStrictness.LEMMAS) # there is no incomplete lemma matching
+    assert job.canLink(job.linkArticles)
+    assert not job.canLink(job.linkSpecialCases) # 'without' is already linked
+
+    job.links[0] = 0
+    job.unlinkedTokens = { 1 }
+    assert not job.canLink(job.linkArticles)
+
+    job.links[1] = 0
+    job.unlinkedTokens = set()
+    assert not job.canLink(job.linkWholeMatches, MatchStrictness.MORPHOLOGY, MatchStrictness.IDENTICAL)
+
+def revertAnomaliesScalar(job):
+    """The token-by-token implementation of revertAnomalies, which the vectorised one is checked (and timed, see benchmarkTokenise) against"""
+
+    for tokenIndex, scriptureToken in enumerate(job.workingTokens):
+        if (tokenIndex not in job.changedTokens):
+            continue
+        job.changedTokens.discard(tokenIndex)
+
+        token = scriptureToken.token
+        if (token is None):
+            continue
+
+        deltas = []
+        for i in range(1, 3):
+            if (tokenIndex - i > 0):
+                previousToken = job.workingTokens[tokenIndex - i].token
+                if (previousToken is not None):
+                    deltas.append(abs(token - previousToken) - i)
+            if (tokenIndex + i < len(job.workingTokens)):
+                nextToken = job.workingTokens[tokenIndex + i].token
+                if (nextToken is not None):
+                    deltas.append(abs(token - nextToken) - i)
+
+        if (deltas and sum(deltas) / len(deltas) > 7):
+            scriptureToken.token = None
+            job.links[tokenIndex] = -1
+            job.unlinkedTokens.add(tokenIndex)
+            job.markChanged(tokenIndex)
+
+def linkArticlesScalar(job, allowImplicitArticles=False):
+    """The token-by-token implementation of linkArticles, which the vectorised one is checked (and timed, see benchmarkTokenise) against"""
+
+    for scriptureIndex, scriptureToken in enumerate(job.workingTokens):
+        if (len(job.workingTokens) <= scriptureIndex + 1):
+            break
+
+        if (bool(set(scriptureToken.pos) & set(['DT', 'IN'])) and scriptureToken.token is None):
+            offset = 1
+            tokenCandidate = None
+            while (len(job.workingTokens) > scriptureIndex + offset):
+                nextToken = job.workingTokens[scriptureIndex + offset]
+                isNoun = bool(set(nextToken.pos) & set(['NN', 'NNS', 'NNP', 'NNPS']))
+                isAdjective = bool(set(nextToken.pos) & set(['JJ', 'JJR', 'JJS']))
+                if ((not isNoun) and (not isAdjective) or (nextToken.token is None)):
+                    break
+                strongsNounCandidateIndex = nextToken.token
+                offset += 1
+
+                if (strongsNounCandidateIndex):
+                    nounTokenCandidateID = job.strongs[strongsNounCandidateIndex].token
+                    tokenCandidate = job.strongs[strongsNounCandidateIndex - 1]
+
+                    # explicit (rescanning the strongs for the noun's group)
+                    nounGroup = [strongsIndex for strongsIndex, strongsToken in enumerate(job.strongs) if strongsToken.token == nounTokenCandidateID]
+                    for candidateTokenIndex in nounGroup:
+                        if (job.synonymous(job.strongs[candidateTokenIndex], scriptureToken, matchTolerance=MatchStrictness.SYNONYMS)):
+                            job.linkTokens(scriptureIndex, candidateTokenIndex, enforcePOS=False, strongsCandidates=nounGroup)
+                            tokenCandidate = None
+                            break
+                    if (tokenCandidate is None):
+                        break
+
+                    if (isNoun or ('noun' in tokenCandidate.grammar)):
+                        if (job.synonymous(tokenCandidate, scriptureToken, matchTolerance=MatchStrictness.SYNONYMS)):
+                            job.linkTokens(scriptureIndex, strongsNounCandidateIndex - 1, enforcePOS=False)
+                            tokenCandidate = None
+                            break
+
+                    tokenCandidate = job.strongs[strongsNounCandidateIndex]
+
+            # implicit
+            if (allowImplicitArticles and tokenCandidate):
+                if (scriptureToken.word in ['the'] and ('noun' in tokenCandidate.grammar)):
+                    job.linkTokens(scriptureIndex, strongsNounCandidateIndex, enforcePOS=False, updateStrongs=False)
+
+def newSweepJob(scripture, strongs, links):
+    """Create a job over a synthetic verse of (word, POS tags), and Strong's of (strongs number, word, grammar), already linked, for the sweeps"""
+
+    job = Tokeniser().newJob('NKJV')
+    job.workingTokens = [
+        SimpleNamespace(word=word, pos=pos, token=(None if (link < 0) else link), lemmas=[word], synonyms=frozenset([word]))
+        for (word, pos), link in zip(scripture, links)
+    ]
+    job.strongs = [SimpleNamespace(token=number, word=word, grammar=grammar, lemmas=[word], synonyms=frozenset([word])) for number, word, grammar in strongs]
+    job.links = np.array(links)
+    job.usesStrongs = np.ones(len(links), dtype=bool)
+    job.unlinkedTokens = set(np.flatnonzero(job.links < 0).tolist())
+    job.linkChanges, job.strongsUses, job.changedTokens = 0, (-1, None), set(range(len(links)))
+
+    words = [word for word, _ in scripture]
+    strongsWords = [word for _, word, _ in strongs]
+    job.tokenCounts = OccurrenceCounter(words, strongsWords)
+    job.lemmaCounts = OccurrenceCounter(words, strongsWords)
+    job.synonymCounts = OccurrenceCounter(words, strongsWords)
+
+    job.isArticle = np.array([bool(set(pos) & {'DT', 'IN'}) for _, pos in scripture])
+    job.isNoun = np.array([bool(set(pos) & {'NN', 'NNS', 'NNP', 'NNPS'}) for _, pos in scripture])
+    job.isAdjective = np.array([bool(set(pos) & {'JJ', 'JJR', 'JJS'}) for _, pos in scripture])
+    job.strongsGroups = {}
+    for strongsIndex, strongsToken in enumerate(job.strongs):
+        job.strongsGroups.setdefault(strongsToken.token, []).append(strongsIndex)
+    return job
+
+def sweepOutcome(job):
+    """The state that a sweep leaves a job in"""
+
+    return (
+        job.links.tolist(), [token.token for token in job.workingTokens], job.usesStrongs.tolist(),
+        job.unlinkedTokens, job.changedTokens, [counter.counts.tolist() for counter in (job.tokenCounts, job.lemmaCounts, job.synonymCounts)],
+    )
+
+SWEEP_VERSES = [
+    ( # in the beginning God created the heavens and the earth: embedded, explicit, and implicit articles
+        [('in', ['IN']), ('the', ['DT']), ('beginning', ['NN']), ('God', ['NNP']), ('created', ['VBD']), ('the', ['DT']), ('heavens', ['NNS']), ('and', ['CC']), ('the', ['DT']), ('earth', ['NN'])],
+        [(7225, 'in', 'noun'), (7225, 'the', 'noun'), (7225, 'beginning', 'noun'), (430, 'God', 'noun'), (1254, 'created', 'verb'), (853, 'the', 'particle'), (8064, 'heavens', 'noun'), (776, 'earth', 'noun')],
+        [0, -1, 2, 3, 4, -1, 6, -1, -1, 7],
+    ),
+    ( # the light was good: the noun is linked to the first strongs token, so the article has no candidates
+        [('the', ['DT']), ('light', ['NN']), ('was', ['VBD']), ('good', ['JJ'])],
+        [(216, 'light', 'noun'), (2896, 'good', 'adjective')],
+        [-1, 0, -1, 1],
+    ),
+    ( # God saw the light, that it was good, and God divided the light: a repeated noun, and links some distance from their neighbours
+        [('God', ['NNP']), ('saw', ['VBD']), ('the', ['DT']), ('light', ['NN']), ('that', ['IN']), ('it', ['PRP']), ('was', ['VBD']), ('good', ['JJ']), ('and', ['CC']), ('God', ['NNP']), ('divided', ['VBD']), ('the', ['DT']), ('light', ['NN'])],
+        [(430, 'God', 'noun'), (7200, 'saw', 'verb'), (853, 'the', 'particle'), (216, 'light', 'noun'), (3588, 'that', 'conjunction'), (2896, 'good', 'adjective'), (430, 'God', 'noun'), (914, 'divided', 'verb'), (216, 'light', 'noun')],
+        [6, 1, -1, 3, 4, -1, -1, 5, -1, 0, 7, -1, 8],
+    ),
+    ( # no articles, and anomalous links (including the first token, and a revert which its neighbours must see)
+        [(f'word{index}', ['NN']) for index in range(12)],
+        [(index, f'word{index}', 'noun') for index in range(21)],
+        [15, 1, 2, 3, 20, 5, 6, -1, 8, 9, 0, 11],
+    ),
+]
+
+@pytest.mark.parametrize('scripture,strongs,links', SWEEP_VERSES)
+def test_revertAnomalies(scripture, strongs, links):
+    """Test that the vectorised anomaly check reverts the same links as checking token-by-token"""
+
+    scalarJob = newSweepJob(scripture, strongs, links)
+    revertAnomaliesScalar(scalarJob)
+    job = newSweepJob(scripture, strongs, links)
+    job.revertAnomalies()
+    assert sweepOutcome(job) == sweepOutcome(scalarJob)
+
+@pytest.mark.parametrize('scripture,strongs,links', SWEEP_VERSES)
+@pytest.mark.parametrize('allowImplicitArticles', [False, True])
+def test_linkArticles(scripture, strongs, links, allowImplicitArticles):
+    """Test that linking articles from the work-list of unlinked articles links the same articles as checking token-by-token"""
+
+    scalarJob = newSweepJob(scripture, strongs, links)
+    linkArticlesScalar(scalarJob, allowImplicitArticles)
+    job = newSweepJob(scripture, strongs, links)
+    job.linkArticles(allowImplicitArticles)
+    assert sweepOutcome(job) == sweepOutcome(scalarJob)
+
+def test_deferredImports():
+    """Test that importing the tokeniser does not load NLTK, scipy, or pygame, which are loaded when they are first used"""
+
+    imported = {name for name, *_ in measureImports('tokenise')}
+    assert 'tokenise' in imported
+    assert not imported & set(DEFERRED_IMPORTS)
+
 def tokenisePassage(passage, verse, translation, expectedTokens):
     """Test tokenisation"""
 
@@ -0,0 +1,171 @@
+"""Test tokeniseServer.py"""
+
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import tokenise
+import tokeniseServer
+from tokeniseServer import TokeniserService
+from benchmarkTokeniseServer import fetch
+
+def fakeTokeniseVerseJob(calls):
+    """Create a stand-in for tokeniseVerseJob, which records its calls, and takes long enough for requests to overlap"""
+
+    lock = threading.Lock()
+
+    def job(request):
+        with lock:
+            calls.append(request)
+        translation, passage, verse, _ = request
+        if (passage == 'GEN.99'):
+            raise FileNotFoundError(passage)
+        if (verse == '99'):
+            raise tokenise.VerseNotFoundError(f'{translation} {passage}.{verse}')
+        if (verse == '13'):
+            raise KeyError('G1234') # a bug in tokenisation, rather than a missing verse
+        time.sleep(0.05)
+        return ([{ 'content': f'{translation} {passage}.{verse}', 'token': '0' }], [], (0, 0))
+
+    return job
+
+def test_coalescing(monkeypatch):
+    """Test that concurrent requests for the same verse are tokenised once, and all get its result"""
+
+    calls = []
+    monkeypatch.setattr(tokeniseServer, 'tokeniseVerseJob', fakeTokeniseVerseJob(calls))
+    service = TokeniserService(executor=ThreadPoolExecutor(2))
+
+    async def run():
+        return await asyncio.gather(
+            *(service.tokenise('NKJV', 'GEN.1', 1) for _ in range(5)),
+            service.tokenise('NKJV', 'GEN.1', '1', includeNotes=False),
+        )
+
+    results = asyncio.run(run())
+    assert len(calls) == 2
+    assert all(result == results[0] for result in results)
+    assert service.stats() == { 'requests': 6, 'coalesced': 4, 'tokenised': 2, 'errors': 0, 'restarts': 0, 'inProgress': 0 }
+
+    asyncio.run(run()) # requests are only coalesced while in progress
+    assert len(calls) == 4
+
+def test_http(monkeypatch):
+    """Test the HTTP API"""
+
+    monkeypatch.setattr(tokeniseServer, 'tokeniseVerseJob', fakeTokeniseVerseJob([]))
+    service = TokeniserService(executor=ThreadPoolExecutor(1))
+
+    async def run():
+        server = await asyncio.start_server(service.handleConnection, '127.0.0.1', 0)
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        responses = [
+            await fetch(reader, writer, target) # over the same connection
+            for target in [
+                '/tokenise?translation=NKJV&passage=GEN.1&verse=1',
+                '/tokenise?translation=NKJV&passage=GEN.1',
+                '/tokenise?translation=..&passage=GEN.1&verse=1',
+                '/tokenise?translation=NKJV&passage=GEN.99&verse=1',
+                '/tokenise?translation=NKJV&passage=GEN.1&verse=99',
+                '/tokenise?translation=NKJV&passage=GEN.1&verse=13',
+                '/unknown',
+                '/stats',
+            ]
+        ]
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return responses
+
+    responses = asyncio.run(run())
+    assert responses[0] == (200, [{ 'content': 'NKJV GEN.1.1', 'token': '0' }])
+    assert responses[1] == (400, { 'error': 'missing verse' })
+    assert responses[2] == (400, { 'error': 'invalid translation' })
+    assert responses[3][0] == 404
+    assert responses[4] == (404, { 'error': 'NKJV GEN.1.99 not found' })
+    assert responses[5] == (500, { 'error': "KeyError: 'G1234'" })
+    assert responses[6][0] == 404
+    assert responses[7] == (200, { 'requests': 4, 'coalesced': 0, 'tokenised': 1, 'errors': 3, 'restarts': 0, 'inProgress': 0 })
+
+async def send(reader, writer, request):
+    """Send a raw request over an open connection, returning the status, headers, and (JSON) body of the response"""
+
+    writer.write(request)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while ((line := await reader.readline()) not in [b'\r\n', b'\n', b'']):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return status, headers, json.loads(await reader.readexactly(int(headers['content-length'])))
+
+def test_requestBodies(monkeypatch):
+    """Test that the body of a request is read past, so that the next request on the connection is answered, unless it cannot be, when the connection is closed"""
+
+    monkeypatch.setattr(tokeniseServer, 'tokeniseVerseJob', fakeTokeniseVerseJob([]))
+    service = TokeniserService(executor=ThreadPoolExecutor(1))
+
+    async def run():
+        server = await asyncio.start_server(service.handleConnection, '127.0.0.1', 0)
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        body = b'GET /stats HTTP/1.1\r\n\r\n'
+        responses = [
+            await send(reader, writer, b'POST /tokenise HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s' % (len(body), body)),
+            await fetch(reader, writer, '/tokenise?translation=NKJV&passage=GEN.1&verse=1'),
+            await send(reader, writer, b'PUT /tokenise HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n5\r\nhello\r\n0\r\n\r\n'),
+        ]
+        closed = (await reader.read()) == b''
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return responses, closed
+
+    (posted, fetched, put), closed = asyncio.run(run())
+    assert posted == (405, posted[1], { 'error': 'POST is not supported' })
+    assert posted[1]['connection'] == 'keep-alive'
+    assert fetched == (200, [{ 'content': 'NKJV GEN.1.1', 'token': '0' }]) # not the request in the body of the POST
+    assert put[0] == 405 and put[1]['connection'] == 'close'
+    assert closed
+
+def test_restartWorkers(monkeypatch):
+    """Test that a pool broken by a worker dying is replaced once (however many requests it broke), with the same settings, and that its verses are retried once"""
+
+    pools = []
+    def newPool(processes, initializer, initargs):
+        pools.append((initializer, initargs))
+        return ThreadPoolExecutor(processes, thread_name_prefix=f'pool{len(pools)}')
+    monkeypatch.setattr(tokeniseServer, 'ProcessPoolExecutor', newPool)
+
+    calls = []
+    def job(request):
+        calls.append(request)
+        time.sleep(0.05)
+        if (request[1] == 'GEN.2' or threading.current_thread().name.startswith('pool1_')): # a worker died, breaking the pool
+            raise BrokenProcessPool('a worker died')
+        return ([{ 'content': f'{request[1]}.{request[2]}', 'token': '0' }], [], (0, 0))
+    monkeypatch.setattr(tokeniseServer, 'tokeniseVerseJob', job)
+
+    service = TokeniserService(2)
+
+    async def run():
+        return await asyncio.gather(service.tokenise('NKJV', 'GEN.1', 1), service.tokenise('NKJV', 'GEN.1', 2))
+
+    assert asyncio.run(run()) == [
+        [{ 'content': 'GEN.1.1', 'token': '0' }], [{ 'content': 'GEN.1.2', 'token': '0' }],
+    ]
+    assert len(calls) == 4
+    assert len(pools) == 2 and pools[0] == pools[1] == (tokeniseServer.initialiseWorker, service.workerSettings)
+
+    with pytest.raises(BrokenProcessPool): # only retried once
+        asyncio.run(service.tokenise('NKJV', 'GEN.2', 1))
+    assert len(calls) == 6 and len(pools) == 3
+    assert service.stats() == { 'requests': 3, 'coalesced': 0, 'tokenised': 2, 'errors': 1, 'restarts': 2, 'inProgress': 0 }
+    service.executor.shutdown()
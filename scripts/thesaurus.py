@@ -0,0 +1,167 @@
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+"""The thesaurus used for synonyms, stored as a compiled table that is looked up lazily."""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from caching import LRUCache
+from compiledTable import CompiledTable
+
+THESAURUS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'en_thesaurus.json')
+COMPILED_THESAURUS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'en_thesaurus.bin')
+
+class Thesaurus:
+    """
+    A lazily-loaded thesaurus, of { word: { wordnetPOS: [[synonyms]] } }.
+    Nothing is read until the first lookup; the compiled table is (re)built from the JSON if it is missing or stale.
+    """
+
+    def __init__(self, path=THESAURUS_PATH, compiledPath=COMPILED_THESAURUS_PATH):
+        self.path = path
+        self.compiledPath = compiledPath
+        self.table = None
+
+    def open(self):
+        """
+        Open the compiled thesaurus, compiling it first if necessary.
+        """
+        if (self.table is None):
+            if (isStale(self.path, self.compiledPath)):
+                compileThesaurus(self.path, self.compiledPath)
+            self.table = CompiledTable(self.compiledPath)
+        return self.table
+
+    def get(self, word, default=None):
+        """
+        Get the synonyms of a word, by WordNet POS tag.
+        """
+        return self.open().get(word, default)
+
+    def __contains__(self, word):
+        return word in self.open()
+
+    def __len__(self):
+        return len(self.open())
+
+class SynonymIndex:
+    """
+    Memoised synonym expansion.
+    Words are interned as integer ids, and each (word, WordNet POS tags) expansion is cached as a frozen set of ids,
+    so that testing two words for a shared synonym is a cheap intersection of small integer sets.
+    """
+
+    def __init__(self, thesaurus):
+        self.thesaurus = thesaurus
+        self.wordIds = {}
+        self.words = []
+        self.cache = LRUCache(maxSize=None) # the vocabulary of the Bible is small enough to never need evicting
+
+    def intern(self, word):
+        """
+        Get the id of a word, assigning it one if it is new.
+        """
+        if ((wordId := self.wordIds.get(word)) is None):
+            wordId = len(self.words)
+            self.wordIds[word] = wordId
+            self.words.append(word)
+        return wordId
+
+    def getSynonymIds(self, word, posTags):
+        """
+        Get the ids of the synonyms of a word (including the word itself), for the given WordNet POS tags.
+        """
+        key = (word, frozenset(posTags))
+        if ((synonymIds := self.cache.get(key)) is None):
+            synonymIds = frozenset(self.intern(synonym) for synonym in self.expand(word, key[1]))
+            self.cache.put(key, synonymIds)
+        return synonymIds
+
+    def expand(self, word, posTags):
+        """
+        Look up the synonyms of a word in the thesaurus. The '_' entries apply regardless of POS.
+        """
+        synonyms = set([word])
+        if (word is None):
+            return synonyms
+
+        if (synonymPOSes := self.thesaurus.get(word)):
+            for posTag in (posTags | {'_'}):
+                for synonymList in synonymPOSes.get(posTag) or []: # list of synonyms for the word
+                    synonyms.update(synonymList)
+        return synonyms
+
+    def getWords(self, synonymIds):
+        """
+        Convert a set of ids back into words (for debugging, and output).
+        """
+        return set(self.words[synonymId] for synonymId in synonymIds)
+
+    def stats(self):
+        """
+        Get the cache statistics, and the number of interned words.
+        """
+        return { **self.cache.stats(), 'internedWords': len(self.words) }
+
+def isStale(path, compiledPath):
+    """
+    Does the compiled thesaurus need to be rebuilt from the JSON?
+    """
+    if (not os.path.exists(compiledPath)):
+        return True
+    return os.path.exists(path) and (os.path.getmtime(path) > os.path.getmtime(compiledPath))
+
+def compileThesaurus(path=THESAURUS_PATH, compiledPath=COMPILED_THESAURUS_PATH):
+    """
+    Compile the JSON thesaurus into a sorted, memory-mappable table.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        thesaurus = json.load(f)
+    CompiledTable.compile(thesaurus, compiledPath)
+    return len(thesaurus)
+
+def benchmarkStartup(words=('light', 'day', 'god', 'created', 'beginning', 'heavens', 'earth', 'darkness', 'waters', 'good')):
+    """
+    Compare the cost of loading the JSON thesaurus against opening the compiled one, up to the first few lookups.
+    """
+    if (isStale(THESAURUS_PATH, COMPILED_THESAURUS_PATH)):
+        compileThesaurus()
+
+    results = {}
+    for name, load in [
+        ('json', lambda: json.load(open(THESAURUS_PATH, 'r', encoding='utf-8'))), # pylint: disable=consider-using-with
+        ('compiled', lambda: Thesaurus().open()),
+    ]:
+        tracemalloc.start()
+        startTime = time.perf_counter()
+
+        thesaurus = load()
+        loadTime = time.perf_counter() - startTime
+        for word in words:
+            thesaurus.get(word)
+        totalTime = time.perf_counter() - startTime
+
+        _, peakMemory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        del thesaurus # otherwise freeing the JSON thesaurus is counted against the next load
+
+        results[name] = { 'load': loadTime, 'firstLookups': totalTime, 'peakMemory': peakMemory }
+        print(f'{name:>8}: load {loadTime * 1000:8.2f} ms, load + {len(words)} lookups {totalTime * 1000:8.2f} ms, peak heap {peakMemory / 1024 / 1024:7.2f} MB')
+
+    return results
+
+def main(args):
+    """
+    `python thesaurus.py compile` builds the compiled thesaurus; `python thesaurus.py benchmark` compares start-up costs.
+    """
+    if (len(args) < 2 or args[1] not in ['compile', 'benchmark']):
+        print('usage: python thesaurus.py (compile | benchmark)')
+    elif (args[1] == 'compile'):
+        print(f'compiled {compileThesaurus()} entries to {COMPILED_THESAURUS_PATH}')
+    else:
+        benchmarkStartup()
+
+if (__name__ == '__main__'):
+    main(sys.argv)
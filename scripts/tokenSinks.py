@@ -0,0 +1,182 @@
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+"""Streaming sinks for the output of the tokeniser (see Tokeniser.iterTokenise), which can resume a run after a crash."""
+import json
+import os
+import time
+
+class TokenSink:
+    """
+    Writes the tokens of verses as they arrive, a chapter at a time (verses must arrive in chapter order).
+    A chapter is only recorded as completed once every verse of it has been written, and the next chapter (or the end) reached,
+    so that a run which is interrupted can be resumed from the last completed chapter (see remaining).
+    A chapter with a verse that failed (see fail) is discarded, rather than completed, so that it is retried when the run is resumed.
+    This is used as a context manager; if the run fails, the chapter in progress is not completed.
+    """
+
+    def __init__(self):
+        self.completed = set() # the passages which have been completed (by this, or an earlier run)
+        self.failed = set() # the passages which were discarded by this run, as some of their verses failed
+        self.passage = None # the passage in progress
+        self.verses = {} # { verse: tokens } of the passage in progress
+        self.failures = {} # { verse: error } of the passage in progress
+
+    def remaining(self, passages):
+        """
+        Get the passages which have not already been completed.
+        """
+        return [passage for passage in passages if passage not in self.completed]
+
+    def write(self, passage, verse, tokens):
+        """
+        Add the tokens of a verse.
+        """
+        self.beginChapter(passage)
+        self.verses[verse] = tokens
+        self.writeVerse(passage, verse, tokens)
+
+    def fail(self, passage, verse, error):
+        """
+        Record that a verse could not be tokenised, so that its chapter is not completed.
+        """
+        self.beginChapter(passage)
+        self.failures[verse] = error
+
+    def beginChapter(self, passage):
+        """
+        Complete the chapter in progress, if the passage is a new one.
+        """
+        if (passage != self.passage):
+            if (self.passage is not None):
+                self.completeChapter()
+            self.passage = passage
+
+    def completeChapter(self):
+        """
+        Record the chapter in progress as completed, or discard it, if any of its verses failed.
+        """
+        if (self.failures):
+            self.discardChapter(self.passage, self.verses)
+            self.failed.add(self.passage)
+        else:
+            self.commitChapter(self.passage, self.verses)
+            self.completed.add(self.passage)
+        self.passage = None
+        self.verses = {}
+        self.failures = {}
+
+    def writeVerse(self, passage, verse, tokens):
+        """
+        Write a verse as it arrives (if the sink does not wait for whole chapters).
+        """
+
+    def commitChapter(self, passage, verses):
+        """
+        Write a completed chapter (if the sink waits for whole chapters), or record where it ends.
+        """
+
+    def discardChapter(self, passage, verses):
+        """
+        Remove what has been written of a chapter that failed (if the sink does not wait for whole chapters).
+        """
+
+    def close(self, completeChapter=True):
+        """
+        Finish writing, completing the chapter in progress (unless the run failed).
+        """
+        if (completeChapter and self.passage is not None):
+            self.completeChapter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close(completeChapter=excType is None)
+
+class JSONLSink(TokenSink):
+    """
+    Appends each verse to a JSON lines file, as { "passage", "verse", "tokens" }, in chapter order.
+    Lines are flushed (to disk) every `flushInterval` seconds, along with a progress file (`<path>.progress`) of the completed chapters,
+    and the length of the file at the end of the last of them. On resuming, anything after that (a chapter in progress when it stopped) is truncated.
+    A chapter that failed is truncated as soon as it is discarded; it is appended when it is retried, so it is out of canonical order.
+    """
+
+    def __init__(self, path, flushInterval=5.0):
+        super().__init__()
+        self.path = path
+        self.progressPath = f'{path}.progress'
+        self.flushInterval = flushInterval
+
+        offset = 0
+        if (os.path.exists(self.progressPath) and os.path.exists(self.path)):
+            with open(self.progressPath, 'r', encoding='utf-8') as f:
+                progress = json.load(f)
+            self.completed = set(progress['completed'])
+            offset = progress['offset']
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.file = open(self.path, 'a+b') # pylint: disable=consider-using-with # this is closed by close
+        self.file.truncate(offset)
+        self.file.seek(offset)
+        self.offset = offset # the length of the file at the end of the last completed chapter
+        self.lastFlush = time.monotonic()
+
+    def writeVerse(self, passage, verse, tokens):
+        self.file.write((json.dumps({ 'passage': passage, 'verse': verse, 'tokens': tokens }, ensure_ascii=False) + '\n').encode('utf-8'))
+
+    def commitChapter(self, passage, verses):
+        self.offset = self.file.tell()
+
+    def discardChapter(self, passage, verses):
+        self.file.truncate(self.offset)
+        self.file.seek(self.offset)
+
+    def completeChapter(self):
+        super().completeChapter()
+        if (time.monotonic() - self.lastFlush >= self.flushInterval):
+            self.flush()
+
+    def flush(self):
+        """
+        Flush the lines written to disk, and then record the chapters completed.
+        The progress file is written to a temporary path and then moved into place, so that it is never partial.
+        """
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+        tempPath = f'{self.progressPath}.{os.getpid()}.tmp'
+        with open(tempPath, 'w', encoding='utf-8') as f:
+            json.dump({ 'completed': sorted(self.completed), 'offset': self.offset }, f)
+        os.replace(tempPath, self.progressPath)
+        self.lastFlush = time.monotonic()
+
+    def close(self, completeChapter=True):
+        super().close(completeChapter)
+        self.flush()
+        self.file.close()
+
+class ChapterSink(TokenSink):
+    """
+    Writes each chapter to its own file in a directory (`<passage>.json`, of { verse: tokens }), once it is complete.
+    Files are written to a temporary path and then moved into place, so a chapter is completed exactly when its file exists.
+    """
+
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.completed = { name[:-len('.json')] for name in os.listdir(directory) if name.endswith('.json') }
+
+    def commitChapter(self, passage, verses):
+        path = os.path.join(self.directory, f'{passage}.json')
+        tempPath = f'{path}.{os.getpid()}.tmp'
+        with open(tempPath, 'w', encoding='utf-8') as f:
+            json.dump(verses, f, ensure_ascii=False)
+        os.replace(tempPath, path)
+
+def openSink(path, flushInterval=5.0):
+    """
+    Open a JSONLSink, if the path ends with `.jsonl`, or else a ChapterSink of the path as a directory.
+    """
+    if (path.lower().endswith('.jsonl')):
+        return JSONLSink(path, flushInterval)
+    return ChapterSink(path)
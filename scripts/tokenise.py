@@ -1,15 +1,28 @@
 # pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ, annotation-unchecked
 """Creating a mapping between Scripture, and the original Hebrew/Greek words ('tokens')."""
 import json
+import math
 import os
 import re
+import sys
+import time
+from bisect import bisect_left, bisect_right
+from collections import deque
+from contextlib import ExitStack
 from enum import Enum
+from multiprocessing import Pool
 from typing import Any, Callable
 
-from nltk import word_tokenize, pos_tag
-from nltk.stem import WordNetLemmatizer
+import numpy as np
 
-import token_vis
+from caching import LRUCache, ResultCache
+from counters import OccurrenceCounter, SCRIPTURE, STRONGS
+from grammar import GrammarTable
+from instrumentation import Instrumentation, ProvenanceTrace
+from lemmatiser import LemmaService, SHARED_LEMMA_CACHE_PATH
+from thesaurus import SynonymIndex, Thesaurus
+from tokenSinks import openSink
+from tokens import IGNORED_CHARS, ScriptureToken, StrongsToken, getWordnetPOS, simplifyWord
 
 class MatchStrictness(Enum):
     """An enumeration of the strictness of the matching process."""
@@ -19,183 +32,507 @@ class MatchStrictness(Enum):
     MORPHOLOGY = 'A'
     BACKUP_MORPHOLOGY = 'B'
 
-IGNORED_CHARS = ''.join(['.', ',', ';', ':', '?', '!', '“', '”', '‘', '’'])
+class VerseNotFoundError(KeyError):
+    """A verse which is not in its chapter, in a translation, or in the Strong's."""
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+MANIFEST_PATH = os.path.join(os.path.dirname(__file__), '..', 'client', 'public', 'manifest.json')
+
+# the version of the tokenisation algorithm, which is part of the key of every cached result (see Tokeniser.getResultKey)
+# this must be incremented by any change that changes the results of tokenisation, so that they are recomputed
+ALGORITHM_VERSION = 3
 
 class Tokeniser:
     """A class for tokenising a passage of scripture."""
 
-    LEMMA_CACHE = {
-        'spared': set(['spare']),
-        # 'kinds': set(['kind']),
-        # 'kind': set(['kind']),
-    }
+    # parsed chapter files, keyed by (translation, passage); Strong's files use the translation 'strongs'
+    # this is shared by all tokenisers, so that each file is only read once per run
+    DOCUMENT_CACHE = LRUCache(maxSize=32)
 
-    def __init__(self):
-        pass
+    def __init__(self, positionalBand=None, resultCache=None, instrumentation=None, trace=None, sharedResources=False):
+        """
+        positionalBand: if given, each token only considers candidates whose relative position (within the verse) is within this
+        fraction of its own (e.g. 0.1), widening the band when there are none. Alignment is roughly monotone, so this prunes
+        most of the candidates of long verses, at the risk of missing some links. By default, the whole verse is searched.
+        resultCache: if given, the result of each verse is saved to (and reused from) this ResultCache, keyed by its inputs,
+        so that re-runs only recompute the verses whose inputs have changed.
+        instrumentation: if given, what each verse (and each phase of its sweeps) did, and how long it took, is recorded in this Instrumentation.
+        trace: if given, every link and unlink (which phase made it, and the candidates it was chosen from) is recorded in this ProvenanceTrace.
+        Verses reused from the result cache are not tokenised, so are not traced.
+        """
+        if (positionalBand is not None and positionalBand <= 0):
+            raise ValueError('positionalBand must be positive')
+        self.positionalBand = positionalBand
+        self.resultCache = resultCache
+        self.instrumentation = instrumentation
+        self.trace = trace
+        self.sharedResources = sharedResources # whether pools of workers share the lexical resources built by this process (see shareResources)
+
+    def loadChapter(self, translation, passage):
+        """
+        Load a chapter of a translation (or of the Strong's data, if translation is 'strongs'), using the document cache.
+        Cached documents are shared, so must not be modified.
+        """
+        path = getChapterPath(translation, passage)
 
-    def tokenisePassage(self, passage, verse, translation, visualise=False, includeNotes=True):
+        def load():
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+        return self.DOCUMENT_CACHE.getOrLoad((translation, passage), load)
+
+    def loadStrongsPOS(self, passage):
         """
-        Load, and tokenise, a passage of scripture.
+        Load the precomputed words and POS tags of a chapter of the Strong's data (see buildStrongsPOS), using the document cache.
+        Returns None if they have not been built, or are older than the Strong's data.
         """
+        path = getChapterPath('strongs.pos', passage)
+        if (not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(getChapterPath('strongs', passage))):
+            return None
+        return self.loadChapter('strongs.pos', passage)
 
-        with open(os.path.join(os.path.dirname(__file__), 'data', translation, translation, passage), 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        scripture = data[str(verse)]
+    def getResultKey(self, translation, scripture, strongs, strongsPOS=None, includeNotes=True):
+        """
+        Get the key of the result of tokenising a verse, in the result cache.
+        This covers everything that the result depends upon: the verse, its Strong's (and their precomputed POS tags, if any),
+        the thesaurus entries and lemma overrides of its words, the settings, and the version of the algorithm.
+        """
+        words = set()
+        for chunk in scripture:
+            if (chunk.get('type') != 'note'):
+                words.update(simplifyWord(word) for word in chunk['content'].split(' '))
+        for token in strongs.values():
+            words.update(simplifyWord(word) for word in token['eng'].split(' '))
+        words.discard('')
+
+        return ResultCache.getKey({
+            'version': ALGORITHM_VERSION,
+            'translation': translation,
+            'scripture': scripture,
+            'strongs': strongs,
+            'strongsPOS': strongsPOS,
+            'thesaurus': { word: thesaurus.get(word) for word in words },
+            'lemmas': { word: sorted(LemmaService.OVERRIDES[word]) for word in words if word in LemmaService.OVERRIDES },
+            'includeNotes': includeNotes,
+            'positionalBand': self.positionalBand,
+        })
+
+    def newJob(self, translation):
+        """
+        Create a job to tokenise a verse of the given translation.
+        """
+        return self.TokenisationJob(translation, self.lemmatiseWord, self.lemonymous, self.synonymous, positionalBand=self.positionalBand, instrumentation=self.instrumentation, trace=self.trace)
 
-        with open(os.path.join(os.path.dirname(__file__), 'data', 'strongs', f'{passage}.json'), 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        strongs = data[str(verse)]
+    def tokenisePassage(self, passage, verse, translation, visualise=False, includeNotes=True):
+        """
+        Load, and tokenise, a passage of scripture.
+        Raises VerseNotFoundError if the verse is not in the chapter (or FileNotFoundError if the chapter is missing).
+        """
+        scriptureChapter = self.loadChapter(translation, passage)
+        strongsChapter = self.loadChapter('strongs', passage)
+        if (str(verse) not in scriptureChapter):
+            raise VerseNotFoundError(f'{translation} {passage}.{verse}')
+        if (str(verse) not in strongsChapter):
+            raise VerseNotFoundError(f'strongs {passage}.{verse}')
+        scripture = scriptureChapter[str(verse)]
+        strongs = strongsChapter[str(verse)]
 
         if (scripture and strongs):
-            tokenisationJob = self.TokenisationJob(translation, self.lemmatiseWord, self.lemonymous, self.synonymous)
-            return tokenisationJob.tokenise(scripture, strongs, visualise=visualise, includeNotes=includeNotes, usfm=f'{passage}.{verse}')
+            strongsPOS = self.loadStrongsPOS(passage)
+            strongsPOS = strongsPOS[str(verse)] if (strongsPOS is not None) else None
+
+            key = None
+            if (self.resultCache is not None and not visualise):
+                key = self.getResultKey(translation, scripture, strongs, strongsPOS, includeNotes)
+                if ((tokens := self.resultCache.get(key)) is not None):
+                    return tokens
+
+            modifiedStrongs = expandStrongsPOS(strongsPOS) if (strongsPOS is not None) else None
+            tokens = self.newJob(translation).tokenise(scripture, strongs, visualise=visualise, includeNotes=includeNotes, usfm=f'{passage}.{verse}', modifiedStrongs=modifiedStrongs)
+            if (key is not None):
+                self.resultCache.put(key, tokens)
+            return tokens
         return None
 
+    def tokeniseChapter(self, passage, translation, visualise=False, includeNotes=True):
+        """
+        Load, and tokenise, every verse of a chapter of scripture.
+        Returns a dictionary of { verse: tokens }, where verses that cannot be tokenised are None.
+        """
+        scriptureChapter = self.loadChapter(translation, passage)
+        strongsChapter = self.loadChapter('strongs', passage)
+        return self.tokeniseVerses(passage, translation, scriptureChapter, strongsChapter, self.loadStrongsPOS(passage), visualise=visualise, includeNotes=includeNotes)
+
+    def tokeniseVerses(self, passage, translation, scriptureChapter, strongsChapter, strongsPOS=None, visualise=False, includeNotes=True, errors=None):
+        """
+        Tokenise every verse of a loaded chapter.
+        The POS tagging of every verse, and of every verse's Strong's, is done in one batch, rather than once per verse.
+        If the Strong's POS tags have been precomputed (see loadStrongsPOS), they are used instead of tagging the Strong's.
+        Returns a dictionary of { verse: tokens }, where verses that cannot be tokenised are None.
+        If errors is a dictionary, failures are recorded in it (by verse), rather than raised.
+        If there is a result cache, verses whose inputs have not changed are reused from it, rather than tokenised.
+        """
+        translationErrors = {} if (errors is not None) else None
+        results = self.tokeniseTranslations(passage, { translation: scriptureChapter }, strongsChapter, strongsPOS, visualise, includeNotes, translationErrors)
+        if (errors is not None):
+            errors.update(translationErrors.get(translation, {}))
+        return results[translation]
+
+    def tokeniseTranslations(self, passage, scriptureChapters, strongsChapter, strongsPOS=None, visualise=False, includeNotes=True, errors=None):
+        """
+        Tokenise every verse of a loaded chapter, in several translations (given as { translation: scriptureChapter }), against the same Strong's.
+        The Strong's of each verse are tagged, abstracted, and expanded (see PreparedStrongs) once, and shared by every translation,
+        and the POS tagging of every verse of every translation is done in one batch.
+        If the Strong's POS tags have been precomputed (see loadStrongsPOS), they are used instead of tagging the Strong's.
+        Returns a dictionary of { translation: { verse: tokens } }, where verses that cannot be tokenised are None.
+        If errors is a dictionary, failures are recorded in it (as { translation: { verse: error } }), rather than raised.
+        If there is a result cache, verses whose inputs have not changed are reused from it, rather than tokenised.
+        """
+        results = { translation: {} for translation in scriptureChapters }
+        prepared = {} # { (translation, verse): (scripture, tokens) }
+        modifiedStrongs = {} # { verse: POS tagged words of its Strong's }
+        keys = {} # { (translation, verse): result cache key }
+
+        # PRE-PROCESS TOKENS
+        for translation, scriptureChapter in scriptureChapters.items():
+            for verse, scripture in scriptureChapter.items():
+                results[translation][verse] = None
+                strongs = strongsChapter.get(str(verse))
+                if (scripture and strongs):
+                    try:
+                        if (self.resultCache is not None and not visualise):
+                            keys[(translation, verse)] = self.getResultKey(translation, scripture, strongs, strongsPOS[str(verse)] if (strongsPOS is not None) else None, includeNotes)
+                            if ((tokens := self.resultCache.get(keys[(translation, verse)])) is not None):
+                                results[translation][verse] = tokens
+                                continue
+
+                        if (verse not in modifiedStrongs): # the Strong's of a verse are only split once, for every translation
+                            if (strongsPOS is not None):
+                                modifiedStrongs[verse] = expandStrongsPOS(strongsPOS[str(verse)])
+                            else:
+                                modifiedStrongs[verse] = splitStrongs(strongs)
+                        prepared[(translation, verse)] = (scripture, splitScripture(scripture, includeNotes))
+                    except Exception as e: # pylint: disable=broad-exception-caught
+                        if (errors is None):
+                            raise
+                        errors.setdefault(translation, {})[verse] = f'{type(e).__name__}: {e}'
+
+        # GENERATE POS TAGS FOR EVERY VERSE, IN ONE BATCH
+        taggedVerses = tagVersesPOS([tokens for _, tokens in prepared.values()])
+        if (strongsPOS is None):
+            taggedStrongs = dict(zip(modifiedStrongs, tagVersesPOS(list(modifiedStrongs.values()), 'eng')))
+        else:
+            taggedStrongs = {} # already tagged
+
+        # TOKENISE
+        preparedStrongs = {} # { verse: PreparedStrongs }, kept from the job of the first translation of each verse
+        for ((translation, verse), (scripture, tokens)), taggedVerse in zip(prepared.items(), taggedVerses):
+            try:
+                transferPOSTags(tokens, taggedVerse)
+                if (verse not in preparedStrongs and verse in taggedStrongs):
+                    transferPOSTags(modifiedStrongs[verse], taggedStrongs[verse], 'eng')
+                job = self.newJob(translation)
+                results[translation][verse] = job.tokenise(
+                    scripture, strongsChapter[str(verse)], visualise=visualise, includeNotes=includeNotes, usfm=f'{passage}.{verse}',
+                    tokens=tokens, modifiedStrongs=modifiedStrongs[verse], preparedStrongs=preparedStrongs.get(verse),
+                )
+                preparedStrongs[verse] = job.preparedStrongs
+                if ((translation, verse) in keys):
+                    self.resultCache.put(keys[(translation, verse)], results[translation][verse])
+            except Exception as e: # pylint: disable=broad-exception-caught
+                if (errors is None):
+                    raise
+                errors.setdefault(translation, {})[verse] = f'{type(e).__name__}: {e}'
+        return results
+
+    def tokeniseCorpus(self, translation, start=None, end=None, processes=None, includeNotes=True, progress=None):
+        """
+        Tokenise a range of the Bible (see getPassages), spreading the chapters across a pool of processes.
+        Returns a dictionary of { passage: { verse: tokens } }, where verses that cannot be tokenised are None.
+        If there is a result cache, the workers share it, and the numbers of verses reused and recomputed are added to its stats.
+        If there is instrumentation, or a trace, the records of the workers are added to it.
+        """
+
+        # BUILD WORK QUEUE
+        # each job is a chapter, so that its POS tagging can be batched
+        jobs = [job for passage in getPassages(start, end) if (job := self.newChapterJob([translation], passage, includeNotes)) is not None]
+
+        # the sweeps are quadratic in verse length, so chapters with a handful of long verses (EST 8:9, genealogies) dominate the run;
+        # scheduling the most expensive chapters first stops one of them being left to run alone at the end (LPT scheduling)
+        jobs.sort(key=lambda job: job[0], reverse=True)
+        totalVerses = sum(len(scriptureChapter) for job in jobs for scriptureChapter in job[2].values())
+
+        if (progress is None):
+            progress = printProgress
+
+        # RUN
+        results = {}
+        pool = None
+        if (processes == 1):
+            initialiseWorker(*self.getWorkerSettings())
+            completedJobs = map(tokeniseChapterJob, jobs)
+        else:
+            # chunksize=1 means idle workers pull the next chapter from the shared queue as soon as they finish,
+            # so a worker stuck on a long chapter does not hold up a batch of chapters behind it
+            pool = Pool(processes, initializer=initialiseWorker, initargs=self.getWorkerSettings(pooled=True))
+            completedJobs = pool.imap_unordered(tokeniseChapterJob, jobs, chunksize=1)
+
+        try:
+            completed = 0
+            for completedJob in completedJobs:
+                passage, verses, _, attempted = self.mergeChapterJob(completedJob, pool is not None)
+                results[passage] = verses[translation]
+                completed += attempted
+                progress(completed, totalVerses, passage)
+        finally:
+            if (pool is not None):
+                pool.close()
+                pool.join()
+            lemmaService.save()
+            if (self.resultCache is not None):
+                self.resultCache.evict()
+
+        # restore canonical order
+        return { passage: results[passage] for passage in getPassages(start, end) if passage in results }
+
+    def iterTokenise(self, translation, passages, processes=None, includeNotes=True, window=None, errors=None):
+        """
+        Tokenise passages (e.g. from getPassages), lazily yielding (passage, verse, tokens) for each verse, in order, as its chapter is completed.
+        Verses that cannot be tokenised have tokens of None, and verses that fail are reported, and skipped;
+        if errors is a dictionary, they are also recorded in it (as { passage: { verse: error } }), before the verses of their chapter are yielded.
+        Unlike tokeniseCorpus, chapters are only loaded as they are needed, and no more than `window` (by default, twice the number of processes)
+        are loaded, or being tokenised, at once, so that memory is bounded however long the range is.
+        """
+        translationErrors = {} if (errors is not None) else None
+        translationResults = self.iterTokeniseTranslations([translation], passages, processes, includeNotes, window, translationErrors)
+        try:
+            for _, passage, verse, tokens in translationResults:
+                if (errors is not None):
+                    errors.update(translationErrors.pop(translation, {}))
+                yield passage, verse, tokens
+        finally:
+            translationResults.close() # so that the pool is stopped as soon as the caller stops
+            if (errors is not None):
+                errors.update(translationErrors.pop(translation, {}))
+
+    def iterTokeniseTranslations(self, translations, passages, processes=None, includeNotes=True, window=None, errors=None):
+        """
+        Tokenise passages in several translations, against the same Strong's (see tokeniseTranslations), lazily yielding (translation, passage, verse, tokens)
+        for each verse, in order, as its chapter is completed (every translation of a chapter is completed together).
+        A translation missing a chapter is skipped for that chapter. Otherwise, this is as iterTokenise,
+        except that errors are recorded as { translation: { passage: { verse: error } } }.
+        """
+        jobs = (job for passage in passages if (job := self.newChapterJob(translations, passage, includeNotes)) is not None)
+
+        pool = None
+        if (processes == 1):
+            initialiseWorker(*self.getWorkerSettings())
+            completedJobs = map(tokeniseChapterJob, jobs)
+        else:
+            pool = Pool(processes, initializer=initialiseWorker, initargs=self.getWorkerSettings(pooled=True))
+            completedJobs = imapWindowed(pool, tokeniseChapterJob, jobs, window or 2 * (processes or os.cpu_count() or 1))
+
+        try:
+            for completedJob in completedJobs:
+                passage, translationVerses, translationErrors, _ = self.mergeChapterJob(completedJob, pool is not None)
+                if (errors is not None):
+                    for translation, chapterErrors in translationErrors.items():
+                        errors.setdefault(translation, {})[passage] = chapterErrors
+                for translation in translations:
+                    for verse, tokens in translationVerses.get(translation, {}).items():
+                        yield translation, passage, verse, tokens
+        finally:
+            # every result has been received (unless the caller stopped early), so the workers are not waited for
+            if (pool is not None):
+                pool.terminate()
+                pool.join()
+            lemmaService.save()
+            if (self.resultCache is not None):
+                self.resultCache.evict()
+
+    def newChapterJob(self, translations, passage, includeNotes=True):
+        """
+        Load a chapter, in each of the translations, as a job for a worker (see tokeniseChapterJob), with its estimated cost.
+        A translation missing the chapter is skipped; returns None if every translation, or the Strong's data, is missing it.
+        """
+        try:
+            strongsChapter = self.loadChapter('strongs', passage)
+        except FileNotFoundError as e:
+            print(f'skipping {passage}: {e.filename} not found', file=sys.stderr)
+            return None
+
+        scriptureChapters = {}
+        for translation in translations:
+            try:
+                scriptureChapters[translation] = self.loadChapter(translation, passage)
+            except FileNotFoundError as e:
+                print(f'skipping {passage}: {e.filename} not found', file=sys.stderr)
+        if (not scriptureChapters):
+            return None
+
+        cost = 0
+        for scriptureChapter in scriptureChapters.values():
+            for verse, scripture in scriptureChapter.items():
+                strongs = strongsChapter.get(str(verse))
+                if (scripture and strongs):
+                    cost += estimateVerseCost(scripture, strongs)
+        return (cost, passage, scriptureChapters, strongsChapter, self.loadStrongsPOS(passage), includeNotes)
+
+    def getWorkerSettings(self, pooled=False):
+        """
+        Get the arguments of initialiseWorker, to create workers with the same settings as this tokeniser.
+        If the workers are a pool of other processes, and resources are shared, they are built first (see shareResources).
+        """
+        resultCachePath = self.resultCache.path if (self.resultCache is not None) else None
+        traceCapacity = self.trace.capacity if (self.trace is not None) else None
+        lemmaTablePath = self.shareResources() if (pooled and self.sharedResources) else None
+        return (self.positionalBand, resultCachePath, self.instrumentation is not None, traceCapacity, lemmaTablePath)
+
+    def shareResources(self, lemmaTablePath=SHARED_LEMMA_CACHE_PATH):
+        """
+        Build the lexical resources once, in this process, as read-only, memory-mapped files, which the workers attach to.
+        The thesaurus is compiled (if it is stale), rather than by every worker at once, and the lemma cache is compiled into a table,
+        rather than every worker loading its own copy (see LemmaService.share). The Strong's POS tags are already loaded here, and sent with each chapter.
+        Returns the path of the lemma table.
+        """
+        thesaurus.open()
+        return lemmaService.share(lemmaTablePath)
+
+    def mergeChapterJob(self, completedJob, fromPool):
+        """
+        Merge what a worker found while tokenising a chapter (its new lemmas, result cache counts, and instrumentation and trace records)
+        into this process, reporting the verses that failed.
+        Returns the passage, its tokenised verses in each translation (as { translation: { verse: tokens } }), the verses that failed
+        (as { translation: { verse: error } }), and the number of verses attempted.
+        """
+        passage, translationVerses, errors, lemmaEntries, resultCounts, records, traceRecords = completedJob
+        if (fromPool):
+            lemmaService.merge(lemmaEntries)
+        if (self.resultCache is not None):
+            self.resultCache.merge(resultCounts)
+        if (self.instrumentation is not None):
+            self.instrumentation.merge(records)
+        if (self.trace is not None):
+            self.trace.merge(traceRecords)
+        for translation, translationErrors in errors.items():
+            for verse, error in translationErrors.items():
+                print(f'{translation} {passage}.{verse} failed: {error}', file=sys.stderr)
+
+        return passage, {
+            translation: { verse: tokens for verse, tokens in verses.items() if verse not in errors.get(translation, {}) }
+            for translation, verses in translationVerses.items()
+        }, errors, sum(len(verses) for verses in translationVerses.values())
+
     class TokenisationJob:
         """An individual job to tokenise a passage of scripture. This is declared as a subclass, to allow for functions to share data easily."""
 
-        def __init__(self, translation, lemmatiseWord: Callable[[Any, Any, bool], (set | Any)], lemonymous, synonymous):
+        def __init__(self, translation, lemmatiseWord: Callable[[Any, Any, bool], (set | Any)], lemonymous, synonymous, positionalBand=None, instrumentation=None, trace=None):
             self.lemmatiseWord = lemmatiseWord
             self.lemonymous = lemonymous
             self.synonymous = synonymous
 
             self.workingTokens: list = []
-            self.strongs: dict = {}
+            self.strongs: list = []
+            self.preparedStrongs = None # the strongs tokens, with their counted terms and indexes (see PreparedStrongs)
 
             # SETTINGS
             # Reverent Capitalisation
             # in some translations, we can be strict with the capitalisation of some words: He != he (excluding begininng of sentences, wrth gwrs!)
             self.useReverentCapitalisation = (translation.upper() in ['NKJV'])
-
-        def tokenise(self, scripture, strongs, visualise=False, includeNotes=True, usfm=None):
+            # Positional Band
+            # the fraction of the verse, either side of a token's relative position, that its candidates are searched within (None for all of it)
+            self.positionalBand = positionalBand
+
+            # TIMINGS
+            # the time spent in each section of tokenisation (see beginTiming): { section: seconds }
+            self.timings = {}
+            self.timingSection = None
+            self.timingStart = None
+
+            # INSTRUMENTATION
+            # if given, the record of each phase is added to this Instrumentation (see callPhase)
+            self.instrumentation = instrumentation
+            self.linksMade = 0
+            self.reverts = 0
+            # if given, every link and unlink is recorded in this ProvenanceTrace (see traceEvent)
+            self.trace = trace
+            self.usfm = None
+            self.currentPhase = None
+
+        def tokenise(self, scripture, strongs, visualise=False, includeNotes=True, usfm=None, tokens=None, modifiedStrongs=None, preparedStrongs=None):
             """
             Tokenise a passage of scripture, using a strongs dictionary.
+            The POS-tagged tokens of the scripture (splitScripture) and strongs (splitStrongs) can be given, if they have already been tagged in a batch.
+            The prepared strongs (PreparedStrongs) can be given, if they have already been prepared for another translation;
+            either way, they are kept (as preparedStrongs), so that they can be given to the job of the next translation.
             """
 
-            tokens = []
+            self.usfm = usfm
+            if (self.instrumentation is not None):
+                self.instrumentation.beginVerse(usfm, getCacheCounts())
 
             # 1. PRE-PROCESS TOKENS
             # A. FIRST, BREAK DOWN THE SCRIPTURE INTO INDIVIDUAL TOKENS
-            for chunk in scripture:
-
-                if (chunk.get('type') == 'note'):
-                    if (includeNotes):
-                        tokens.append(chunk) # notes don't need tokenising, but are left in the array to preserve the order
-                    continue
-
-                if (chunk.get('content') == ' '): # ignore whitespace
-                    pass
-
-                tokenCandidates = chunk['content'].split(' ') # TODO: also split using '-' (in other splittings, too)
-                for candidateTokenIndex, candidateToken in enumerate(tokenCandidates):
-                    if (candidateToken.strip() == ''):
-                        continue
-
-                    token = {}
-
-                    # reconstruct
-                    if (chunk.get('header') and candidateTokenIndex == 0): # this assumes there will never be a heading mid-verse
-                        token['header'] = chunk['header']
-
-                    if (chunk.get('type')):
-                        token['type'] = chunk['type'] # TODO: cannot split paragraphs into multiple (?)
-
-                    token['content'] = candidateToken
-
-                    tokens.append(token)
-                pass
-            pass
+            self.beginTiming('tagging')
+            if (tokens is None):
+                tokens = tagVersePOS(splitScripture(scripture, includeNotes))
 
             # TODO: for some translations, the [x] words (it) in strongs should be de-bracketed (perhaps in the strip function?)
 
             # B. GENERATE POS TAGS FOR EACH TOKEN
-            tokens = tagVersePOS(tokens)
-            modifiedStrongs = tagStrongsPOS(strongs) # add 'backup' POS tags to strongs
-
-            # C. COUNT NUMBER OF OCCURRENCES OF EACH TOKEN
-            self.tokenCounts = {} # { token: (scriptureCount, strongsCount) }
-            self.lemmaCounts = {}
-            self.synonymCounts = {}
-
-            for scriptureToken in tokens:
-                # skip notes
-                if (scriptureToken.get('type') == 'note'):
-                    continue
-
-                tokenContent = simplifyToken(scriptureToken)
-
-                # genuine content
-                if (exisitngCount := self.tokenCounts.get(tokenContent)):
-                    self.tokenCounts[tokenContent] = (exisitngCount[0] + 1, exisitngCount[1])
-                else:
-                    self.tokenCounts[tokenContent] = (1, 0)
-
-                # lemmas
-                for lemma in self.lemmatiseWord(tokenContent, scriptureToken.get('pos')):
-                    if (exisitngCount := self.lemmaCounts.get(lemma)):
-                        self.lemmaCounts[lemma] = (exisitngCount[0] + 1, exisitngCount[1])
-                    else:
-                        self.lemmaCounts[lemma] = (1, 0)
-
-                # synonyms
-                for synonym in getSynonyms(scriptureToken):
-                    if (exisitngCount := self.synonymCounts.get(synonym)):
-                        self.synonymCounts[synonym] = (exisitngCount[0] + 1, exisitngCount[1])
-                    else:
-                        self.synonymCounts[synonym] = (1, 0)
-
-            for strongsToken in modifiedStrongs:
-                # TODO: probably unify this with above code
-
-                if (strongsToken.get('eng') == '-'):
-                    continue
-
-                tokenContent = simplifyToken(strongsToken)
-
-                # genuine content
-                if (exisitngCount := self.tokenCounts.get(tokenContent)):
-                    self.tokenCounts[tokenContent] = (exisitngCount[0], exisitngCount[1] + 1)
-                else:
-                    self.tokenCounts[tokenContent] = (0, 1)
-
-                # lemmas
-                for lemma in self.lemmatiseWord(tokenContent, strongsToken.get('grammar'), True):
-                    if (exisitngCount := self.lemmaCounts.get(lemma)):
-                        self.lemmaCounts[lemma] = (exisitngCount[0], exisitngCount[1] + 1)
-                    else:
-                        self.lemmaCounts[lemma] = (0, 1)
-
-                # synonyms
-                for synonym in getSynonyms(strongsToken):
-                    if (exisitngCount := self.synonymCounts.get(synonym)):
-                        self.synonymCounts[synonym] = (exisitngCount[0], exisitngCount[1] + 1)
-                    else:
-                        self.synonymCounts[synonym] = (0, 1)
+            if (modifiedStrongs is None and preparedStrongs is None):
+                modifiedStrongs = tagStrongsPOS(strongs) # add 'backup' POS tags to strongs
+
+            # C. ABSTRACT THE TOKENS
+            self.beginTiming('abstraction')
+            # we create new objects that are easier to work with, by removing some elements (notes, etc.)
+            # these are slotted, and cache their normalised forms; the dict forms are only used for input and output
+            scriptureTokens = [ScriptureToken.fromDict(token, tokenIndex) for tokenIndex, token in enumerate(tokens) if token.get('type') != 'note']
+            if (preparedStrongs is None):
+                preparedStrongs = PreparedStrongs(strongs, modifiedStrongs)
+            strongsTokens = preparedStrongs.tokens
+
+            # D. COUNT NUMBER OF OCCURRENCES OF EACH TOKEN
+            self.beginTiming('counting')
+            # terms are gathered first, so that each kind of term can be counted in one go
+            scriptureWords, scriptureLemmas, scriptureSynonyms = [], [], []
+            for scriptureToken in scriptureTokens:
+                scriptureWords.append(scriptureToken.word) # genuine content
+                scriptureLemmas += getLemmas(scriptureToken)
+                scriptureSynonyms += getSynonyms(scriptureToken)
+
+            self.tokenCounts = OccurrenceCounter(scriptureWords, preparedStrongs.words) # { token: (scriptureCount, strongsCount) }
+            self.lemmaCounts = OccurrenceCounter(scriptureLemmas, preparedStrongs.lemmas)
+            self.synonymCounts = OccurrenceCounter(scriptureSynonyms, preparedStrongs.synonyms)
             pass
 
-            # D. ABSTRACT THE TOKENS
-            # we create a new object that is easier to work with, by removing some elements (notes, etc.)
-            # and is also now mutable
+            # E. TOKENISE
             # note: the actual tokenisation occurs within this method
-            ABSTRACT_TOKENS = self.tokeniseAbstract(tokens, modifiedStrongs)
+            ABSTRACT_TOKENS = self.tokeniseAbstract(scriptureTokens, preparedStrongs)
+            self.beginTiming('reconstruction')
             # apply result of tokenisation to the original tokens
             for abstractToken in ABSTRACT_TOKENS:
-                if ((tokenIndex := abstractToken.get('token', None)) is not None):
-                    tokens[abstractToken['index']]['token'] = modifiedStrongs[int(tokenIndex)]['token']
+                if ((tokenIndex := abstractToken.token) is not None):
+                    tokens[abstractToken.index]['token'] = strongsTokens[tokenIndex].token
 
             # CHECK STATUS
-            for token in tokens:
+            for token in ABSTRACT_TOKENS:
                 if (tokenIsDirty(token)):
                     continue
                 pass # FAILURE
-                print(token.get('content'))
+                print(token.content)
 
+            self.beginTiming(None)
             if (visualise):
+                import token_vis # pylint: disable=import-outside-toplevel # pygame is only loaded if it is needed
                 window = token_vis.Window()
                 window.draw(strongs, tokens, title=usfm) # this is blocking
 
             if (not includeNotes):
+                if (self.instrumentation is not None):
+                    self.instrumentation.endVerse(self, getCacheCounts())
                 return tokens
+            self.beginTiming('reconstruction')
 
             # RECONSTRUCT TOKENS
             # we originally tokenised the scripture into individual words, whereas the target tokens may be larger chunks,
@@ -222,108 +559,75 @@ class Tokeniser:
                 finalTokens.append(newToken)
             pass
 
+            self.beginTiming(None)
+            if (self.instrumentation is not None):
+                self.instrumentation.endVerse(self, getCacheCounts())
             return finalTokens
 
-        def tokeniseAbstract(self, TRUE_TOKENS, strongs):
+        def beginTiming(self, section):
+            """
+            End the current timed section of tokenisation, adding its time to self.timings, and begin another (unless section is None).
+            """
+            now = time.perf_counter()
+            if (self.timingSection is not None):
+                self.timings[self.timingSection] = self.timings.get(self.timingSection, 0.0) + (now - self.timingStart)
+            self.timingSection = section
+            self.timingStart = now
+
+        def tokeniseAbstract(self, TRUE_TOKENS, preparedStrongs):
             """
             Tokenise a passage of scripture, using a strongs dictionary.
             This function uses an 'abstracted' version of the tokens, which is more suitable for matching.
             """
-            self.workingTokens = []
-            self.strongs = strongs.copy()
-
-            # abstract tokens
-            for tokenIndex, token in enumerate(TRUE_TOKENS):
-                if (not tokenIsDirty(token)):
-                    new_token = token.copy()
-                    new_token['index'] = tokenIndex
-                    self.workingTokens.append(new_token)
+            self.beginTiming('indexing')
+            self.workingTokens = [token for token in TRUE_TOKENS if not tokenIsDirty(token)]
+            self.strongs = preparedStrongs.tokens
+            self.preparedStrongs = preparedStrongs
+
+            # index the tokens by their forms, lemmas, and synonyms, so that only pairs that could match are compared
+            self.buildCandidateIndexes()
+            # which pairs of tokens have compatible grammars, at each POS strictness
+            scripturePOS = [token.pos for token in self.workingTokens]
+            self.grammarMatrices = {
+                MatchStrictness.MORPHOLOGY: grammarTable.getMorphologyMatrix(scripturePOS, [token.grammar for token in self.strongs]),
+                MatchStrictness.BACKUP_MORPHOLOGY: grammarTable.getBackupMorphologyMatrix(scripturePOS, [token.pos for token in self.strongs]),
+            }
+            # the POS classes of the scripture tokens, and the strongs tokens of each strongs group, for linking articles
+            self.isArticle = grammarTable.hasPOS(scripturePOS, ['DT', 'IN']) # the, of
+            self.isNoun = grammarTable.hasPOS(scripturePOS, ['NN', 'NNS', 'NNP', 'NNPS'])
+            self.isAdjective = grammarTable.hasPOS(scripturePOS, ['JJ', 'JJR', 'JJS'])
+            self.strongsGroups = {} # { strongs token number: [strongsIndex] }
+            for strongsIndex, strongsToken in enumerate(self.strongs):
+                self.strongsGroups.setdefault(strongsToken.token, []).append(strongsIndex)
+
+            self.pairsEvaluated = 0 # pairs of tokens compared
+            self.pairsExhaustive = 0 # pairs of tokens that comparing every token against every other token would have compared
+
+            # the work-lists of the scheduler: phases are skipped when there is nothing left that they could link (see canLink),
+            # and tokenisation stops as soon as every token is linked, and every link has been checked for anomalies
+            self.unlinkedTokens = set(range(len(self.workingTokens))) # tokens which are yet to be linked
+            self.links = np.full(len(self.workingTokens), -1) # the strongs index that each token is linked to (or -1)
+            self.usesStrongs = np.ones(len(self.workingTokens), dtype=bool) # whether each token's link uses up its strongs token (see assignCandidates)
+            self.linkChanges = 0 # the number of links made, or reverted, so far (see markChanged)
+            self.strongsUses = (-1, None) # the uses of each strongs token (see countStrongsUses), and the linkChanges they were counted at
+            self.changedTokens = set(range(len(self.workingTokens))) # tokens whose neighbourhoods have changed since they were last checked for anomalies
+            self.phasesRun = 0
+            self.phasesSkipped = 0
+            self.sweep = (None, None) # the (posStrictness, matchTolerance) of the current phase
 
             # DO TWO SWEEPS: FIRST ENOFORCING POS MATCHING, THEN RELAXING IT
             for posStrictness in [MatchStrictness.MORPHOLOGY, MatchStrictness.BACKUP_MORPHOLOGY, None]:
+                self.beginTiming(f'sweep {posStrictness.name if (posStrictness is not None) else "NONE"}')
 
                 # DO THREE SWEEPS: FIRST USING LITERAL COMPARISON, THEN EXPANDING ACCEPTANCE CRITERIA TO INCLUDE LEMMAS, AND THEN SYNONYMS
                 for matchTolerance in [MatchStrictness.IDENTICAL, MatchStrictness.LEMMAS, MatchStrictness.SYNONYMS]:
-                    pass
+                    self.sweep = (posStrictness, matchTolerance)
 
                     # LINK ANY WHOLE, EXACT, UNIQUE MATCHES
-                    for strongsIndex, strongsToken in enumerate(strongs):
-
-                        if (strongsToken.get('eng') == '-'):
-                            continue
-                        pass
-
-                        for scriptureIndex, scriptureToken in enumerate(self.workingTokens):
-
-                            if (tokenIsDirty(scriptureToken)):
-                                continue
-                            if (not areTokenGrammarsEquivalent(scriptureToken, strongsToken, posStrictness)):
-                                continue
-
-                            if (matchTolerance == MatchStrictness.IDENTICAL):
-                                if (self.tokenCounts.get(simplifyToken(scriptureToken)) == (1, 1)): # UNIQUE
-                                    if (equals(scriptureToken, strongsToken)): # WHOLE, EXACT
-                                        # update data to be tokenised
-                                        self.linkTokens(scriptureIndex, strongsIndex, posStrictness)
-                                        continue
-
-                            else:
-                                if (self.tokenCounts.get(simplifyToken(strongsToken))): # WHOLE
-                                    synonym = self.synonymous(scriptureToken, strongsToken, matchTolerance) # EXACT
-                                    if (synonym):
-
-                                        if (matchTolerance == MatchStrictness.LEMMAS): # TODO: this is kinda bad
-                                            if (len(synonym) > 1):
-                                                pass # will this ever occur? # YES: was -> wa, be
-                                            for lemma in synonym:
-                                                if (self.lemmaCounts[lemma] == (1, 1)): # UNIQUE
-                                                    # update data to be tokenised
-                                                    self.linkTokens(scriptureIndex, strongsIndex, posStrictness)
-                                                    continue
-
-                                        elif (matchTolerance == MatchStrictness.SYNONYMS):
-                                            if (self.synonymCounts[simplifyToken(scriptureToken)][0] == 1 and self.synonymCounts[simplifyToken(strongsToken)][1] == 1): # UNIQUE
-                                                # update data to be tokenised
-                                                self.linkTokens(scriptureIndex, strongsIndex, posStrictness)
-                                                continue
-                    pass
+                    self.runPhase(self.linkWholeMatches, posStrictness, matchTolerance)
 
                     # LINK UNIQUE, INCOMPLETE MATCHES
-                    for strongsIndex, strongsToken in enumerate(strongs):
-
-                        if (strongsToken.get('eng') == '-'):
-                            continue
-                        pass
-
-                        for scriptureIndex, scriptureToken in enumerate(self.workingTokens):
-
-                            if (tokenIsDirty(scriptureToken)):
-                                continue
-                            if (not areTokenGrammarsEquivalent(scriptureToken, strongsToken, posStrictness)):
-                                continue
-
-                            if (matchTolerance == MatchStrictness.IDENTICAL):
-                                if (self.tokenCounts.get(simplifyToken(scriptureToken)) == (1, 1)): # UNIQUE
-                                    if (contains(strongsToken, scriptureToken, mustMatchWholeWord=True)):
-                                        # update data to be tokenised
-                                        self.linkTokens(scriptureIndex, strongsIndex, posStrictness)
-                                        continue
-
-                            elif (matchTolerance == MatchStrictness.LEMMAS):
-                                pass # TODO: GEN.21
-
-                            elif (matchTolerance == MatchStrictness.SYNONYMS):
-                                scriptureWord = simplifyToken(scriptureToken)
-                                scriptureCount = self.synonymCounts.get(scriptureWord, (0, 0))[0]
-                                strongCount = self.synonymCounts.get(simplifyToken(strongsToken), (0, 0))[1]
-
-                                if (scriptureCount == 1 and strongCount == 1): # UNIQUE
-                                    synonym = self.synonymous(scriptureToken, strongsToken, matchTolerance)
-                                    if (synonym):
-                                        # update data to be tokenised
-                                        self.linkTokens(scriptureIndex, strongsIndex, posStrictness)
-                                        break
-                    pass
+                    self.runPhase(self.linkIncompleteMatches, posStrictness, matchTolerance)
 
                     # # BRIDGE GAPS # note: this is problematic
                     # currentToken = None
@@ -348,201 +652,536 @@ class Tokeniser:
                     # pass
 
                     # LINK ARTICLES
-                    self.linkArticles()
-                    pass
+                    self.runPhase(self.linkArticles)
 
                     # REVERT ANOMALIES
-                    self.revertAnomalies()
-                    pass
-                pass
+                    self.callPhase(self.revertAnomalies)
+                    if (self.isAligned()):
+                        return self.workingTokens
 
                 # HANDLE NON-UNIQUE TOKENS
                 # if a token is not unique, it may be possible to infer its true token from its positioning
                 for matchTolerance in [MatchStrictness.IDENTICAL, MatchStrictness.LEMMAS, MatchStrictness.SYNONYMS]:
+                    self.sweep = (posStrictness, matchTolerance)
+                    self.runPhase(self.linkNonUniqueMatches, posStrictness, matchTolerance)
 
-                    # get matches
-                    candidates = {}
-                    for tokenIndex, scriptureToken in enumerate(self.workingTokens):
-                        if (tokenIsDirty(scriptureToken)):
-                            continue
-                        if ((posStrictness is not None) and ('DT' in scriptureToken['pos'])): # skip articles
-                            continue
-
-                        # TODO: could we do a uniqueness check initally to prevent re-treading all the time?
-                        tempCandidates = []
-
-                        for strongsIndex, strongsToken in enumerate(strongs):
-                            if (strongsToken.get('eng') == '-'):
-                                continue
-                            if (not areTokenGrammarsEquivalent(scriptureToken, strongsToken, posStrictness)):
-                                continue
-                            pass
+                    # REVERT AGAIN
+                    self.callPhase(self.revertAnomalies)
+                    if (self.isAligned()):
+                        return self.workingTokens
 
-                            for word in strongsToken['eng'].split(' '):
-                                # if scriptureToken matches strongsToken, mark it as a candidate
-                                if (matchTolerance == MatchStrictness.IDENTICAL):
-                                    if (equals(scriptureToken, word)):
-                                        tempCandidates.append(int(strongsIndex))
-                                        break
+                # LINK ARTICLES
+                self.sweep = (posStrictness, None)
+                self.runPhase(self.linkArticles, allowImplicitArticles=True)
 
-                                elif (matchTolerance == MatchStrictness.LEMMAS):
-                                    if (self.lemonymous(scriptureToken, strongsToken)):
-                                        tempCandidates.append(int(strongsIndex))
-                                        break
+                # ABSORB LOOSE TOKENS # TODO
 
-                                elif (matchTolerance == MatchStrictness.SYNONYMS):
-                                    synonyms = self.synonymous(scriptureToken, strongsToken, matchTolerance, exhaustive=True)
-                                    if (synonyms):
-                                        tempCandidates.append(int(strongsIndex))
-                                        break
+                # SPECIAL CASES
+                self.runPhase(self.linkSpecialCases)
 
-                        if (tempCandidates):
-                            scriptureTokenPos = tokenIndex / len(self.workingTokens)
+                # only allow the process to repeat (with relaxed rules) if there are still tokens to be tokenised
+                if (not self.unlinkedTokens):
+                    break
+            pass
 
-                            for candidateToken in tempCandidates:
-                                # evaluate candidates, using distance metric
-                                candidateTokenPos = int(candidateToken) / len(strongs)
-                                delta = str(abs(scriptureTokenPos - candidateTokenPos))
+            return self.workingTokens
 
-                                if (not candidates.get(delta)):
-                                    candidates[delta] = { tokenIndex: [] }
-                                elif (not candidates[delta].get(tokenIndex)):
-                                    candidates[delta][tokenIndex] = []
+        def runPhase(self, phase, *args, **kwargs):
+            """
+            Run a phase of the tokenisation, unless it cannot link anything (see canLink).
+            """
+            if (not self.canLink(phase, *args, **kwargs)):
+                self.phasesSkipped += 1
+                return
+            self.phasesRun += 1
+            self.callPhase(phase, *args, **kwargs)
 
-                                candidates[delta][tokenIndex].append(candidateToken)
-                    pass
+        def canLink(self, phase, *args, **kwargs): # pylint: disable=unused-argument
+            """
+            Could a phase link anything? This is a cheap check, over the work-lists, of what the phase needs to make any link:
+            an unlinked token; for linkArticles, an unlinked article (other than the last token); for linkSpecialCases, one of the phrases it knows;
+            and for the matching phases, an unlinked token with a form, lemma, or synonym (at the tolerance of the phase) of one of the strongs tokens.
+            """
+            if (not self.unlinkedTokens):
+                return False
+            if (phase.__name__ == 'linkArticles'):
+                return bool((self.isArticle[:-1] & (self.links[:-1] < 0)).any())
+            if (phase.__name__ == 'linkSpecialCases'):
+                return self.hasSpecialCases()
+
+            _, matchTolerance = args # (posStrictness, matchTolerance)
+            if (phase.__name__ == 'linkIncompleteMatches' and matchTolerance == MatchStrictness.LEMMAS):
+                return False # there is no incomplete lemma matching (yet)
+            strongsKeys = self.preparedStrongs.matchKeys[matchTolerance]
+            return any(key in strongsKeys for scriptureIndex in self.unlinkedTokens for key in self.scriptureKeys[scriptureIndex][matchTolerance])
+
+        def hasSpecialCases(self):
+            """
+            Could linkSpecialCases link anything? ('truly truly' in the strongs, or an unlinked 'x-less', or 'without x')
+            """
+            if (self.tokenCounts.count('truly', STRONGS) >= 2 and any(strongsToken.strongs == 'G281' for strongsToken in self.strongs)):
+                return True
+            return any(
+                re.match(r'(\w+)less', self.workingTokens[scriptureIndex].word) or equals(self.workingTokens[scriptureIndex], 'without')
+                for scriptureIndex in self.unlinkedTokens
+            )
+
+        def callPhase(self, phase, *args, **kwargs):
+            """
+            Call a phase of the tokenisation, recording what it did if there is instrumentation.
+            """
+            self.currentPhase = phase
+            if (self.instrumentation is None):
+                phase(*args, **kwargs)
+                return
+
+            links, reverts, pairsEvaluated = self.linksMade, self.reverts, self.pairsEvaluated
+            startTime = time.perf_counter()
+            phase(*args, **kwargs)
+            duration = time.perf_counter() - startTime
+
+            # phases are named by their sweep, e.g. 'MORPHOLOGY IDENTICAL linkWholeMatches', 'NONE - linkArticles allowImplicitArticles'
+            posStrictness, matchTolerance = self.sweep
+            name = ' '.join(
+                [posStrictness.name if (posStrictness is not None) else 'NONE', matchTolerance.name if (matchTolerance is not None) else '-', phase.__name__]
+                + [key for key, value in kwargs.items() if value]
+            )
+            self.instrumentation.recordPhase(name, duration, self.linksMade - links, self.reverts - reverts, self.pairsEvaluated - pairsEvaluated)
+
+        def isAligned(self):
+            """
+            Is every token linked, with no links left to be checked for anomalies? (Nothing more can change.)
+            """
+            return (not self.unlinkedTokens) and (not self.changedTokens)
 
-                    # LINK CLOSEST MATCHES
-                    # bipartite matching problem (greedy) # TODO: (BIBLE-124) Hungarian algorithm
-                    exhaustedTokens = set()
-                    for delta, tokenMaps in sorted(candidates.items()):
-
-                        for scriptureIndex, strongIndexes in tokenMaps.items():
-                            if (scriptureIndex not in exhaustedTokens): # this Scripture token has not been tokenised
-                                for strongIndex in strongIndexes:
-                                    strongsCandidate = strongs[strongIndex]
-                                    workingTokensMatchingThisCandidate = [token for token in self.workingTokens if token.get('token') == strongIndex]
-                                    if (len(workingTokensMatchingThisCandidate) < len(strongsCandidate['eng'].split(' '))): # this Strongs token is already in use
-                                        self.linkTokens(scriptureIndex, strongIndex, enforcePOS=False)
-                                        exhaustedTokens.add(scriptureIndex)
-                                        break
-                    pass
+        def markChanged(self, tokenIndex):
+            """
+            Record that a token has been linked, or unlinked, so that it (and the neighbours which compare against it) are checked for anomalies again.
+            """
+            self.changedTokens.update(range(max(tokenIndex - 2, 0), min(tokenIndex + 3, len(self.workingTokens))))
+            self.linkChanges += 1
 
-                    # REVERT AGAIN
-                    self.revertAnomalies()
-                    pass
+        def linkWholeMatches(self, posStrictness, matchTolerance):
+            """
+            Link any whole, exact, unique matches.
+            """
+            for strongsIndex, strongsToken in enumerate(self.strongs):
 
-                # LINK ARTICLES
-                self.linkArticles(allowImplicitArticles=True)
+                if (strongsToken.eng == '-'):
+                    continue
                 pass
 
-                # ABSORB LOOSE TOKENS # TODO
+                for scriptureIndex in (scriptureCandidates := self.getScriptureCandidates(strongsIndex, matchTolerance)):
+                    scriptureToken = self.workingTokens[scriptureIndex]
 
-                # SPECIAL CASES
-                # truly|truly --> 'most assuredly',
-                if (self.tokenCounts.get('truly', (0, 0))[1] >= 2): # 'truly truly' is viable in strongs
+                    if (tokenIsDirty(scriptureToken)):
+                        continue
+                    if (not self.areGrammarsEquivalent(scriptureIndex, strongsIndex, posStrictness)):
+                        continue
 
-                    for strongsIndex, strongsToken in enumerate(strongs):
+                    if (matchTolerance == MatchStrictness.IDENTICAL):
+                        if (self.tokenCounts.isUnique(scriptureToken.word)): # UNIQUE
+                            if (equals(scriptureToken, strongsToken)): # WHOLE, EXACT
+                                # update data to be tokenised
+                                self.linkTokens(scriptureIndex, strongsIndex, posStrictness, scriptureCandidates=scriptureCandidates)
+                                continue
 
-                        if (strongsToken['strongs']['data'] == 'G281'): # [Greek 281]: 'truly' # TODO: this is fragile to changes in the strongs dictionary
-                            nextStrongsIndex = strongsIndex + 1
-                            if (strongs[nextStrongsIndex]['strongs']['data'] == 'G281'):
-                                # truly|truly is present
+                    else:
+                        if (strongsToken.word in self.tokenCounts): # WHOLE
+                            synonym = self.synonymous(scriptureToken, strongsToken, matchTolerance) # EXACT
+                            if (synonym):
+
+                                if (matchTolerance == MatchStrictness.LEMMAS): # TODO: this is kinda bad
+                                    if (len(synonym) > 1):
+                                        pass # will this ever occur? # YES: was -> wa, be
+                                    for lemma in synonym:
+                                        if (self.lemmaCounts.isUnique(lemma)): # UNIQUE
+                                            # update data to be tokenised
+                                            self.linkTokens(scriptureIndex, strongsIndex, posStrictness, scriptureCandidates=scriptureCandidates)
+                                            continue
 
-                                for scriptureIndex, scriptureToken in enumerate(self.workingTokens):
-                                    if (tokenIsDirty(scriptureToken)):
+                                elif (matchTolerance == MatchStrictness.SYNONYMS):
+                                    if (self.synonymCounts.count(getWordId(scriptureToken), SCRIPTURE) == 1 and self.synonymCounts.count(getWordId(strongsToken), STRONGS) == 1): # UNIQUE
+                                        # update data to be tokenised
+                                        self.linkTokens(scriptureIndex, strongsIndex, posStrictness, scriptureCandidates=scriptureCandidates)
                                         continue
 
-                                    if (scriptureIndex < len(self.workingTokens) - 1):
+        def linkIncompleteMatches(self, posStrictness, matchTolerance):
+            """
+            Link unique matches, where the scripture token is one of the words of the strongs token.
+            """
+            for strongsIndex, strongsToken in enumerate(self.strongs):
 
-                                        for translation in [('most', 'assuredly'), ('verily', 'verily'), ('amen', 'amen')]:
-                                            if (equals(scriptureToken, translation[0])):
-                                                if (equals(self.workingTokens[scriptureIndex + 1], translation[1])):
-                                                    self.linkTokens(scriptureIndex, strongsIndex, enforcePOS=False)
-                                                    self.linkTokens(scriptureIndex + 1, nextStrongsIndex, enforcePOS=False)
-                                                    break
+                if (strongsToken.eng == '-'):
+                    continue
                 pass
 
-                # (GREEK) 'the' --> 'he'/'his' # TODO: (she/hers? they/theirs?)
-                # TODO
+                for scriptureIndex in (scriptureCandidates := self.getScriptureCandidates(strongsIndex, matchTolerance, incomplete=True)):
+                    scriptureToken = self.workingTokens[scriptureIndex]
 
-                # x-less <--> without x
-                for scriptureIndex, scriptureToken in enumerate(self.workingTokens):
                     if (tokenIsDirty(scriptureToken)):
                         continue
+                    if (not self.areGrammarsEquivalent(scriptureIndex, strongsIndex, posStrictness)):
+                        continue
+
+                    if (matchTolerance == MatchStrictness.IDENTICAL):
+                        if (self.tokenCounts.isUnique(scriptureToken.word)): # UNIQUE
+                            if (contains(strongsToken, scriptureToken, mustMatchWholeWord=True)):
+                                # update data to be tokenised
+                                self.linkTokens(scriptureIndex, strongsIndex, posStrictness, scriptureCandidates=scriptureCandidates)
+                                continue
 
-                    # x-less
-                    match = re.match(r'(\w+)less', simplifyToken(scriptureToken))
-                    if (match):
-                        x = match.group(1)
+                    elif (matchTolerance == MatchStrictness.LEMMAS):
+                        pass # TODO: GEN.21
 
-                        for strongsIndex, strongsToken in enumerate(strongs):
-                            if (contains(strongsToken, x, mustMatchWholeWord=True)): # TODO: mustMatchWholeWord?
-                                self.linkTokens(scriptureIndex, strongsIndex, enforcePOS=False)
+                    elif (matchTolerance == MatchStrictness.SYNONYMS):
+                        scriptureCount = self.synonymCounts.count(getWordId(scriptureToken), SCRIPTURE)
+                        strongCount = self.synonymCounts.count(getWordId(strongsToken), STRONGS)
+
+                        if (scriptureCount == 1 and strongCount == 1): # UNIQUE
+                            synonym = self.synonymous(scriptureToken, strongsToken, matchTolerance)
+                            if (synonym):
+                                # update data to be tokenised
+                                self.linkTokens(scriptureIndex, strongsIndex, posStrictness, scriptureCandidates=scriptureCandidates)
                                 break
 
-                    # without x
-                    elif (scriptureIndex < len(self.workingTokens) - 1):
-                        if (equals(scriptureToken, 'without')):
-                            x = simplifyToken(self.workingTokens[scriptureIndex + 1])
+        def linkNonUniqueMatches(self, posStrictness, matchTolerance):
+            """
+            Link tokens which are not unique, inferring their true tokens from their positioning.
+            """
+            # get matches
+            candidates = {} # { scriptureIndex: [strongsIndex] }
+            for tokenIndex, scriptureToken in enumerate(self.workingTokens):
+                if (tokenIsDirty(scriptureToken)):
+                    continue
+                if ((posStrictness is not None) and ('DT' in scriptureToken.pos)): # skip articles
+                    continue
 
-                            for strongsIndex, strongsToken in enumerate(strongs):
-                                if (contains(strongsToken, f'{x}less', mustMatchWholeWord=True)):
-                                    # match
-                                    self.linkTokens(scriptureIndex, strongsIndex, enforcePOS=False)
-                                    self.linkTokens(scriptureIndex + 1, strongsIndex, enforcePOS=False)
-                pass
+                # TODO: could we do a uniqueness check initally to prevent re-treading all the time?
+                tempCandidates = []
 
-                # only allow the process to repeat (with relaxed rules) if there are still tokens to be tokenised
-                if (not any(token.get('token') is None for token in self.workingTokens)):
-                    break
+                for strongsIndex in self.getStrongsCandidates(tokenIndex, matchTolerance):
+                    strongsToken = self.strongs[strongsIndex]
+                    if (strongsToken.eng == '-'):
+                        continue
+                    if (not self.areGrammarsEquivalent(tokenIndex, strongsIndex, posStrictness)):
+                        continue
+                    pass
+
+                    for word in strongsToken.words:
+                        # if scriptureToken matches strongsToken, mark it as a candidate
+                        if (matchTolerance == MatchStrictness.IDENTICAL):
+                            if (scriptureToken.word == word):
+                                tempCandidates.append(int(strongsIndex))
+                                break
+
+                        elif (matchTolerance == MatchStrictness.LEMMAS):
+                            if (self.lemonymous(scriptureToken, strongsToken)):
+                                tempCandidates.append(int(strongsIndex))
+                                break
+
+                        elif (matchTolerance == MatchStrictness.SYNONYMS):
+                            synonyms = self.synonymous(scriptureToken, strongsToken, matchTolerance, exhaustive=True)
+                            if (synonyms):
+                                tempCandidates.append(int(strongsIndex))
+                                break
+
+                if (tempCandidates):
+                    candidates[tokenIndex] = tempCandidates
             pass
 
-            return self.workingTokens
+            # LINK CLOSEST MATCHES
+            # bipartite matching problem (BIBLE-124), solved optimally, rather than greedily
+            for scriptureIndex, strongsIndex in self.assignCandidates(candidates):
+                self.linkTokens(scriptureIndex, strongsIndex, enforcePOS=False, strongsCandidates=candidates[scriptureIndex])
+
+        def linkSpecialCases(self):
+            """
+            Link known phrases which cannot be matched word-by-word.
+            """
+            # truly|truly --> 'most assuredly',
+            if (self.tokenCounts.count('truly', STRONGS) >= 2): # 'truly truly' is viable in strongs
+
+                for strongsIndex, strongsToken in enumerate(self.strongs):
+
+                    if (strongsToken.strongs == 'G281'): # [Greek 281]: 'truly' # TODO: this is fragile to changes in the strongs dictionary
+                        nextStrongsIndex = strongsIndex + 1
+                        if (nextStrongsIndex < len(self.strongs) and self.strongs[nextStrongsIndex].strongs == 'G281'):
+                            # truly|truly is present
+
+                            for scriptureIndex, scriptureToken in enumerate(self.workingTokens):
+                                if (tokenIsDirty(scriptureToken)):
+                                    continue
+
+                                if (scriptureIndex < len(self.workingTokens) - 1):
+
+                                    for translation in [('most', 'assuredly'), ('verily', 'verily'), ('amen', 'amen')]:
+                                        if (equals(scriptureToken, translation[0])):
+                                            if (equals(self.workingTokens[scriptureIndex + 1], translation[1])):
+                                                self.linkTokens(scriptureIndex, strongsIndex, enforcePOS=False)
+                                                self.linkTokens(scriptureIndex + 1, nextStrongsIndex, enforcePOS=False)
+                                                break
+            pass
+
+            # (GREEK) 'the' --> 'he'/'his' # TODO: (she/hers? they/theirs?)
+            # TODO
+
+            # x-less <--> without x
+            for scriptureIndex, scriptureToken in enumerate(self.workingTokens):
+                if (tokenIsDirty(scriptureToken)):
+                    continue
+
+                # x-less
+                match = re.match(r'(\w+)less', scriptureToken.word)
+                if (match):
+                    x = match.group(1)
+
+                    for strongsIndex, strongsToken in enumerate(self.strongs):
+                        if (contains(strongsToken, x, mustMatchWholeWord=True)): # TODO: mustMatchWholeWord?
+                            self.linkTokens(scriptureIndex, strongsIndex, enforcePOS=False)
+                            break
+
+                # without x
+                elif (scriptureIndex < len(self.workingTokens) - 1):
+                    if (equals(scriptureToken, 'without')):
+                        x = self.workingTokens[scriptureIndex + 1].word
+
+                        for strongsIndex, strongsToken in enumerate(self.strongs):
+                            if (contains(strongsToken, f'{x}less', mustMatchWholeWord=True)):
+                                # match
+                                self.linkTokens(scriptureIndex, strongsIndex, enforcePOS=False)
+                                self.linkTokens(scriptureIndex + 1, strongsIndex, enforcePOS=False)
+
+        def buildCandidateIndexes(self):
+            """
+            Build inverted indexes, from the forms, lemmas, and synonyms of the tokens of this verse, to the positions of the tokens.
+            The indexes of the strongs tokens are built once, by PreparedStrongs.
+            """
+            self.scriptureIndexes = { MatchStrictness.IDENTICAL: {}, MatchStrictness.LEMMAS: {}, MatchStrictness.SYNONYMS: {} }
+            self.strongsIndexes = self.preparedStrongs.indexes
+            self.scriptureKeys = []
+            self.strongsKeys = self.preparedStrongs.keys
+            self.candidateCache = {}
+
+            for scriptureIndex, scriptureToken in enumerate(self.workingTokens):
+                keys = {
+                    MatchStrictness.IDENTICAL: [scriptureToken.word],
+                    MatchStrictness.LEMMAS: getLemmas(scriptureToken),
+                    MatchStrictness.SYNONYMS: getSynonyms(scriptureToken),
+                }
+                self.scriptureKeys.append(keys)
+                for matchTolerance, values in keys.items():
+                    for value in values:
+                        self.scriptureIndexes[matchTolerance].setdefault(value, []).append(scriptureIndex)
+
+        def getScriptureCandidates(self, strongsIndex, matchTolerance, incomplete=False):
+            """
+            Get the (sorted) indices of the scripture tokens which could match a strongs token, with the given tolerance.
+            An incomplete match need only match one of the words of the strongs token.
+            """
+            self.pairsExhaustive += len(self.workingTokens)
+
+            cacheKey = ('scripture', strongsIndex, matchTolerance, incomplete)
+            if ((candidates := self.candidateCache.get(cacheKey)) is None):
+                if (matchTolerance == MatchStrictness.IDENTICAL):
+                    if ((strongsWord := self.strongs[strongsIndex].word) is None):
+                        keys = []
+                    else:
+                        keys = strongsWord.split(' ') if incomplete else [strongsWord]
+                elif (incomplete and matchTolerance == MatchStrictness.LEMMAS):
+                    keys = [] # there is no incomplete lemma matching (yet)
+                else:
+                    keys = self.strongsKeys[strongsIndex][matchTolerance]
+                candidates = self.lookupBandedCandidates(
+                    self.scriptureIndexes[matchTolerance], keys, strongsIndex, len(self.strongs), len(self.workingTokens),
+                    isAvailable=lambda scriptureIndex: self.links[scriptureIndex] < 0,
+                )
+                if (self.positionalBand is None): # banded candidates depend on which tokens are linked, so are not kept
+                    self.candidateCache[cacheKey] = candidates
+
+            self.pairsEvaluated += len(candidates)
+            return candidates
+
+        def getStrongsCandidates(self, scriptureIndex, matchTolerance):
+            """
+            Get the (sorted) indices of the strongs tokens which could match a scripture token, with the given tolerance.
+            """
+            self.pairsExhaustive += len(self.strongs)
+
+            cacheKey = ('strongs', scriptureIndex, matchTolerance)
+            if ((candidates := self.candidateCache.get(cacheKey)) is None):
+                candidates = self.lookupBandedCandidates(
+                    self.strongsIndexes[matchTolerance], self.scriptureKeys[scriptureIndex][matchTolerance], scriptureIndex, len(self.workingTokens), len(self.strongs),
+                    isAvailable=self.isStrongsAvailable,
+                )
+                if (self.positionalBand is None): # banded candidates depend on which tokens are linked, so are not kept
+                    self.candidateCache[cacheKey] = candidates
+
+            self.pairsEvaluated += len(candidates)
+            return candidates
+
+        def lookupBandedCandidates(self, index, keys, position, length, candidateLength, isAvailable=None):
+            """
+            Get the candidates of a token (see lookupCandidates), at the given position of a sequence of the given length.
+            If there is a positional band, only candidates with a similar relative position are included;
+            the band is doubled until there is a candidate which is still available (not yet linked, if isAvailable is given), or it covers the whole verse.
+            """
+            band = self.positionalBand
+            if (band is not None):
+                centre = (position / length) * candidateLength
+                while (band < 1):
+                    window = (math.floor(centre - (band * candidateLength)), math.ceil(centre + (band * candidateLength)))
+                    candidates = self.lookupCandidates(index, keys, window)
+                    if (any(isAvailable(candidate) for candidate in candidates) if (isAvailable is not None) else candidates):
+                        return candidates
+                    band *= 2
+            return self.lookupCandidates(index, keys)
+
+        def isStrongsAvailable(self, strongsIndex):
+            """
+            Is a strongs token not yet used up by a link? (The uses are counted again only when the links have changed.)
+            """
+            if (self.strongsUses[0] != self.linkChanges):
+                self.strongsUses = (self.linkChanges, self.countStrongsUses())
+            return self.strongsUses[1][strongsIndex] == 0
+
+        def countStrongsUses(self):
+            """
+            Count the links which use up each strongs token (implicit articles do not, see linkArticles).
+            """
+            return np.bincount(self.links[(self.links >= 0) & self.usesStrongs], minlength=len(self.strongs))
 
-        def linkTokens(self, scriptureTokenIndex, strongsTokenIndex, enforcePOS, updateStrongs=True):
+        @staticmethod
+        def lookupCandidates(index, keys, window=None):
+            """
+            Get the union of the positions of several keys, in order.
+            If a (first, last) window is given, only the positions within it are included.
+            """
+            candidates = set()
+            for key in keys:
+                positions = index.get(key, ())
+                if (window is not None):
+                    # the positions are sorted, so the window can be sliced out
+                    positions = positions[bisect_left(positions, window[0]):bisect_right(positions, window[1])]
+                candidates.update(positions)
+            return sorted(candidates)
+
+        def assignCandidates(self, candidates):
+            """
+            Choose which of the candidate links of each scripture token to make, minimising the total distance between the relative
+            positions of the linked tokens (Hungarian algorithm).
+            Each strongs token is one word of its gloss (see splitStrongs), so it can take one link, if it does not already have one,
+            and so the gloss of a strongs number can take as many links as it has words.
+            Links which do not use up their strongs token (implicit articles, see linkArticles) do not count against it.
+            Returns a list of (scriptureIndex, strongsIndex), in scripture order; ties are broken in favour of the earlier scripture tokens.
+            """
+            if (not candidates):
+                return []
+
+            strongsCount = len(self.strongs)
+            used = self.countStrongsUses()
+            columnIndices = sorted(set(strongsIndex for strongsIndexes in candidates.values() for strongsIndex in strongsIndexes))
+            slots = np.array([strongsIndex for strongsIndex in columnIndices if used[strongsIndex] == 0], dtype=int) # the strongs tokens still free
+            if (len(slots) == 0):
+                return []
+
+            # rows are in scripture order, so that the solution does not depend on the order of the candidates
+            rows = np.array(sorted(candidates))
+            isCandidate = np.zeros((len(rows), strongsCount), dtype=bool)
+            for row, scriptureIndex in enumerate(rows.tolist()):
+                isCandidate[row, candidates[scriptureIndex]] = True
+            isCandidate = isCandidate[:, slots]
+
+            # cost of a link is the distance between the relative positions of the tokens;
+            # non-candidates cost more than every real link put together, so the most links possible are made first
+            distances = np.abs((rows / len(self.workingTokens))[:, None] - (slots / strongsCount)[None, :])
+            nonCandidateCost = len(rows) + len(slots) + 1
+            costs = np.where(isCandidate, distances, nonCandidateCost)
+
+            from scipy.optimize import linear_sum_assignment # pylint: disable=import-outside-toplevel # scipy is slow to import
+            assignedRows, assignedColumns = linear_sum_assignment(costs)
+            return [
+                (int(rows[row]), int(slots[column]))
+                for row, column in sorted(zip(assignedRows, assignedColumns), key=lambda pair: rows[pair[0]])
+                if isCandidate[row, column]
+            ]
+
+        def areGrammarsEquivalent(self, scriptureIndex, strongsIndex, strictness):
+            """
+            Determine if the grammar tags of a scripture token and a strongs token are equivalent, at a POS strictness.
+            """
+            if (strictness is None):
+                return True
+            return self.grammarMatrices[strictness][scriptureIndex, strongsIndex]
+
+        def linkTokens(self, scriptureTokenIndex, strongsTokenIndex, enforcePOS, updateStrongs=True, scriptureCandidates=None, strongsCandidates=None):
             """
             Link a scripture token to a strongs token.
+            The candidates that the link was chosen from (the scripture tokens that could match the strongs token, or vice versa) are recorded in the trace.
             """
             scriptureToken = self.workingTokens[scriptureTokenIndex]
             strongsToken = self.strongs[strongsTokenIndex]
             # VALIDATION
             # enforce that the POS tags match, if specified
             if (enforcePOS):
-                if (not areTokenGrammarsEquivalent(scriptureToken, strongsToken, enforcePOS)):
+                if (not self.areGrammarsEquivalent(scriptureTokenIndex, strongsTokenIndex, enforcePOS)):
                     return False
 
             # TODO: enforce that a boundary is not crossed
 
             # LINK
-            scriptureToken['token'] = str(strongsTokenIndex)
-            self.workingTokens[scriptureTokenIndex] = scriptureToken
+            self.linksMade += 1
+            scriptureToken.token = strongsTokenIndex
+            self.links[scriptureTokenIndex] = strongsTokenIndex
+            self.usesStrongs[scriptureTokenIndex] = updateStrongs
+            self.unlinkedTokens.discard(scriptureTokenIndex)
+            self.markChanged(scriptureTokenIndex)
+            if (self.trace is not None):
+                self.traceEvent('link', scriptureTokenIndex, strongsTokenIndex, scriptureCandidates, strongsCandidates)
 
             # UPDATE BELIEFS
             # SCRIPTURE
             # word
-            scriptureWord = simplifyToken(scriptureToken)
-            self.tokenCounts[scriptureWord] = (self.tokenCounts[scriptureWord][0] - 1, self.tokenCounts[scriptureWord][1])
+            self.tokenCounts.decrement(scriptureToken.word, SCRIPTURE)
             # lemma
-            for lemma in self.lemmatiseWord(scriptureWord, scriptureToken.get('pos')):
-                self.lemmaCounts[lemma] = (self.lemmaCounts[lemma][0] - 1, self.lemmaCounts[lemma][1])
+            for lemma in getLemmas(scriptureToken):
+                self.lemmaCounts.decrement(lemma, SCRIPTURE)
             # synonyms
             for synonym in getSynonyms(scriptureToken):
-                self.synonymCounts[synonym] = (self.synonymCounts[synonym][0] - 1, self.synonymCounts[synonym][1])
+                self.synonymCounts.decrement(synonym, SCRIPTURE)
 
             # STRONGS
             if (updateStrongs):
                 # there are some cases where it would be bad to update our beliefs of the Strongs words' counts
                 # for example, in the case of implicit articles, we would not want to decrement the count of the noun
-                strongWord = simplifyToken(strongsToken)
                 # word
-                self.tokenCounts[strongWord] = (self.tokenCounts[strongWord][0], self.tokenCounts[strongWord][1] - 1)
+                self.tokenCounts.decrement(strongsToken.word, STRONGS)
                 # lemma
-                for lemma in self.lemmatiseWord(strongWord, strongsToken.get('grammar'), True):
-                    self.lemmaCounts[lemma] = (self.lemmaCounts[lemma][0], self.lemmaCounts[lemma][1] - 1)
+                for lemma in getLemmas(strongsToken):
+                    self.lemmaCounts.decrement(lemma, STRONGS)
                 # synonyms
                 for synonym in getSynonyms(strongsToken):
-                    self.synonymCounts[synonym] = (self.synonymCounts[synonym][0], self.synonymCounts[synonym][1] - 1)
+                    self.synonymCounts.decrement(synonym, STRONGS)
+
+        def traceEvent(self, event, scriptureIndex, strongsIndex, scriptureCandidates=None, strongsCandidates=None):
+            """
+            Record a link (or unlink) in the provenance trace, with the phase that made it, and the candidates it was chosen from.
+            Tokens are recorded as (position in the verse, word) for scripture tokens, and (strongs token number, word) for strongs tokens.
+            """
+            posStrictness, matchTolerance = self.sweep
+            scriptureToken = self.workingTokens[scriptureIndex]
+            strongsToken = self.strongs[strongsIndex]
+            self.trace.record((
+                self.usfm,
+                event,
+                self.currentPhase.__name__ if (self.currentPhase is not None) else None,
+                posStrictness.name if (posStrictness is not None) else None,
+                matchTolerance.name if (matchTolerance is not None) else None,
+                (scriptureToken.index, scriptureToken.word),
+                (strongsToken.token, strongsToken.word),
+                [(self.workingTokens[index].index, self.workingTokens[index].word) for index in scriptureCandidates] if (scriptureCandidates is not None) else None,
+                [(self.strongs[index].token, self.strongs[index].word) for index in strongsCandidates] if (strongsCandidates is not None) else None,
+            ))
 
         # LINK ARTICLES
         def linkArticles(self, allowImplicitArticles=False):
@@ -550,152 +1189,133 @@ class Tokeniser:
             Map articles based off of existing mappings of their respective nouns.
             Accepts both embedded and non-embedded articles.
             """
-            for scriptureIndex, scriptureToken in enumerate(self.workingTokens):
-
-                if (tokenIsDirty(scriptureToken)):
-                    continue
-                if (len(self.workingTokens) <= scriptureIndex + 1):
-                    break
+            # only unlinked articles can be linked (and not the last token, which has no noun after it)
+            # each iteration only links its own article, so these can all be found up front
+            for scriptureIndex in np.flatnonzero(self.isArticle[:-1] & (self.links[:-1] < 0)).tolist():
+                scriptureToken = self.workingTokens[scriptureIndex]
 
                 # TODO: since BIBLE-123, this has become quite a mess...
-                if (bool(set(scriptureToken['pos']) & set(['DT', 'IN']))): # the, of
-                    # TODO: using all articles is not ideal, as it may lead to false positives
-
-                    offset = 1
-                    tokenCandidate = None
-                    while (len(self.workingTokens) > scriptureIndex + offset): # this should always be true, really
-                        # iterate through the noun-chain (sequence of nouns and adjectives)
-                        nextToken = self.workingTokens[scriptureIndex + offset]
-                        isNoun = bool(set(nextToken['pos']) & set(['NN', 'NNS', 'NNP', 'NNPS']))
-                        isAdjective = bool(set(nextToken['pos']) & set(['JJ', 'JJR', 'JJS']))
-                        if ((not isNoun) and (not isAdjective) or (not nextToken.get('token'))):
+                # TODO: using all articles is not ideal, as it may lead to false positives
+
+                offset = 1
+                tokenCandidate = None
+                while (len(self.workingTokens) > scriptureIndex + offset): # this should always be true, really
+                    # iterate through the noun-chain (sequence of nouns and adjectives)
+                    nextToken = self.workingTokens[scriptureIndex + offset]
+                    isNoun = self.isNoun[scriptureIndex + offset]
+                    isAdjective = self.isAdjective[scriptureIndex + offset]
+                    if ((not isNoun) and (not isAdjective) or (nextToken.token is None)):
+                        break
+                    strongsNounCandidateIndex = nextToken.token
+                    offset += 1
+
+                    if (strongsNounCandidateIndex): # scripture token is mapped
+                        nounTokenCandidateID = self.strongs[strongsNounCandidateIndex].token # this is the group of strongs tokens that the noun is mapped to
+
+                        tokenCandidate = self.strongs[strongsNounCandidateIndex - 1] # this is the article candidate (may be the noun itself)
+
+                        # explicit
+                        for candidateTokenIndex in self.strongsGroups[nounTokenCandidateID]:
+                            candidateToken = self.strongs[candidateTokenIndex]
+                            if (self.synonymous(candidateToken, scriptureToken, matchTolerance=MatchStrictness.SYNONYMS)): # is capitalisation an issue here?
+                                # embedded article
+                                # (both the article and the noun are within the same Strongs token)
+                                # | the world |
+                                self.linkTokens(scriptureIndex, candidateTokenIndex, enforcePOS=False, strongsCandidates=self.strongsGroups[nounTokenCandidateID])
+                                tokenCandidate = None
+                                break
+                        if (tokenCandidate is None):
+                            # we have linked this token, so can bypass the remaining explicit and implicit checks
                             break
-                        strongsNounCandidateIndex = nextToken['token']
-                        if (strongsNounCandidateIndex):
-                            strongsNounCandidateIndex = int(strongsNounCandidateIndex)
-                        offset += 1
-
-                        if (strongsNounCandidateIndex): # scripture token is mapped
-                            nounTokenCandidateID = self.strongs[strongsNounCandidateIndex]['token'] # this is the group of strongs tokens that the noun is mapped to
 
-                            tokenCandidate = self.strongs[strongsNounCandidateIndex - 1] # this is the article candidate (may be the noun itself)
-
-                            # explicit
-                            for candidateTokenIndex, candidateToken in enumerate(self.strongs):
-                                if (candidateToken['token'] != nounTokenCandidateID):
-                                    continue
-                                if (self.synonymous(candidateToken, scriptureToken, matchTolerance=MatchStrictness.SYNONYMS)): # is capitalisation an issue here?
-                                    # embedded article
-                                    # (both the article and the noun are within the same Strongs token)
-                                    # | the world |
-                                    self.linkTokens(scriptureIndex, candidateTokenIndex, enforcePOS=False)
-                                    tokenCandidate = None
-                                    break
-                            if (tokenCandidate is None):
-                                # we have linked this token, so can bypass the remaining explicit and implicit checks
+                        if (isNoun or ('noun' in tokenCandidate.grammar)):
+                            if (self.synonymous(tokenCandidate, scriptureToken, matchTolerance=MatchStrictness.SYNONYMS)):
+                                # explicit article
+                                # | the | world |
+                                self.linkTokens(scriptureIndex, strongsNounCandidateIndex - 1, enforcePOS=False)
+                                tokenCandidate = None
                                 break
 
-                            if (isNoun or any([tag['pos'] == 'noun' for tag in tokenCandidate['grammar']])):
-                                if (self.synonymous(tokenCandidate, scriptureToken, matchTolerance=MatchStrictness.SYNONYMS)):
-                                    # explicit article
-                                    # | the | world |
-                                    self.linkTokens(scriptureIndex, int(strongsNounCandidateIndex) - 1, enforcePOS=False)
-                                    tokenCandidate = None
-                                    break
-
-                            # the word before the noun did not match, let's keep the noun as the article candidate, for the implicit check
-                            tokenCandidate = self.strongs[strongsNounCandidateIndex]
-
-                    # implicit
-                    if (allowImplicitArticles and tokenCandidate):
-                        if ( # we are very particular about what we allow to be an implicit article
-                            simplifyToken(scriptureToken) in ['the']
-                            and any([tag['pos'] == 'noun' for tag in tokenCandidate['grammar']])
-                        ):
-                            # implicit article
-                            # | world |
-                            self.linkTokens(scriptureIndex, strongsNounCandidateIndex, enforcePOS=False, updateStrongs=False)
-                            continue
+                        # the word before the noun did not match, let's keep the noun as the article candidate, for the implicit check
+                        tokenCandidate = self.strongs[strongsNounCandidateIndex]
+
+                # implicit
+                if (allowImplicitArticles and tokenCandidate):
+                    if ( # we are very particular about what we allow to be an implicit article
+                        scriptureToken.word in ['the']
+                        and ('noun' in tokenCandidate.grammar)
+                    ):
+                        # implicit article
+                        # | world |
+                        self.linkTokens(scriptureIndex, strongsNounCandidateIndex, enforcePOS=False, updateStrongs=False)
+                        continue
 
         # REVERT ANOMALIES
         def revertAnomalies(self):
             """
             Compare tokens with their neighbours, if one is drastically different, revert it.
+            Only tokens whose neighbourhoods have changed since they were last compared are compared again (see markChanged).
             """
-            for tokenIndex, scriptureToken in enumerate(self.workingTokens):
-
-                token = scriptureToken.get('token')
-                if (not token):
-                    continue
-
-                deltas = []
-
-                for i in range(1, 3):
-                    # check previous tokens
-                    if (tokenIndex - i > 0):
-                        previousToken = self.workingTokens[tokenIndex - i].get('token')
-                        if (previousToken):
-                            deltas.append(abs(int(token) - int(previousToken)) - i)
-
-                    # check next tokens
-                    if (tokenIndex + i < len(self.workingTokens)):
-                        nextToken = self.workingTokens[tokenIndex + i].get('token')
-                        if (nextToken):
-                            deltas.append(abs(int(token) - int(nextToken)) - i)
-
-                if (deltas):
-                    delta = sum(deltas) / len(deltas) # TODO: is this a good metric?
-                    if (delta > 7): # TODO: is this a good threshold?
-                        self.workingTokens[tokenIndex]['token'] = None
-            pass
+            toCheck = np.zeros(len(self.workingTokens), dtype=bool)
+            toCheck[list(self.changedTokens)] = True
+
+            # tokens are compared in order, so a revert is seen by the tokens after it
+            position = 0
+            while (len(anomalies := np.flatnonzero(self.findAnomalies()[position:] & toCheck[position:])) > 0):
+                tokenIndex = position + int(anomalies[0])
+                self.changedTokens.difference_update(range(position, tokenIndex + 1))
+
+                self.reverts += 1
+                if (self.trace is not None):
+                    self.traceEvent('unlink', tokenIndex, int(self.links[tokenIndex]))
+                self.workingTokens[tokenIndex].token = None
+                self.links[tokenIndex] = -1
+                self.unlinkedTokens.add(tokenIndex)
+                self.markChanged(tokenIndex)
+
+                toCheck[tokenIndex + 1:tokenIndex + 3] = True # neighbours of a revert are compared again
+                position = tokenIndex + 1
+            self.changedTokens.difference_update(range(position, len(self.workingTokens)))
+
+        def findAnomalies(self):
+            """
+            Which linked tokens are drastically different from their (linked) neighbours?
+            The mean distance between a token's link and its neighbours' links, less their distance apart in the scripture, must not exceed 7.
+            """
+            tokenCount = len(self.workingTokens)
+            totals = np.zeros(tokenCount, dtype=np.int64)
+            counts = np.zeros(tokenCount, dtype=np.int64)
+
+            for i in range(1, 3):
+                neighbourhoods = [
+                    (slice(i + 1, tokenCount), slice(1, tokenCount - i)), # previous tokens (but never the first token)
+                    (slice(0, tokenCount - i), slice(i, tokenCount)), # next tokens
+                ]
+                for tokens, neighbours in neighbourhoods:
+                    isLinked = self.links[neighbours] >= 0
+                    totals[tokens] += np.where(isLinked, np.abs(self.links[tokens] - self.links[neighbours]) - i, 0)
+                    counts[tokens] += isLinked
+
+            # TODO: is the mean a good metric? is 7 a good threshold?
+            return (self.links >= 0) & (counts > 0) & (totals > 7 * counts)
 
     def lemmatiseWord(self, words, posTags, isStrongsTag=False):
         """
         Get the lemmas of a word.
         """
-        lemmas = set()
-        if (posTags := getWordnetPOS(posTags, isStrongsTag)):
-
-            words = words.split(' ')
-            for word in words:
-                word = word.lower().strip(IGNORED_CHARS)
-
-                if ((lemma := self.LEMMA_CACHE.get(word, None)) is not None): # check cache
-                    lemmas |= lemma
-                    continue
-
-                lemmatizer = WordNetLemmatizer()
-                tempLemmas = set()
-
-                if (isinstance(posTags, str)):
-                    posTags = [posTags]
-
-                for posTag in posTags:
-                    if (lemma := lemmatizer.lemmatize(word, posTag)) != word:
-                        tempLemmas.add(lemma)
-
-                if (tempLemmas):
-                    self.LEMMA_CACHE[word] = tempLemmas
-                    lemmas |= tempLemmas
-                    continue
-
-                self.LEMMA_CACHE[word] = None
-        return lemmas
+        return lemmatiseWords(words, getWordnetPOS(posTags, isStrongsTag))
 
     def lemonymous(self, scriptureToken, strongsToken):
         """
         Do the two tokens share a lemma?
         If so, return the shared lemmas.
         """
-        return (
-            self.lemmatiseWord(simplifyToken(scriptureToken), scriptureToken.get('pos'))
-            & self.lemmatiseWord(simplifyToken(strongsToken), strongsToken.get('grammar', []), True)
-        )
+        return getLemmas(scriptureToken) & getLemmas(strongsToken)
 
     def synonymous(self, scriptureToken, strongsToken, matchTolerance, exhaustive=False):
         """
         Are the contents of the two tokensself.synonymous?
-        If so, return the shared synonym.
+        If so, return the shared lemmas, or the ids of the shared synonyms (see SynonymIndex.getWords).
         """
         if (not scriptureToken or not strongsToken):
             return False
@@ -710,6 +1330,19 @@ class Tokeniser:
 
         return False
 
+    def cacheStats(self):
+        """
+        Get the hit/miss statistics of the tokeniser's caches.
+        """
+        stats = {
+            'documents': self.DOCUMENT_CACHE.stats(),
+            'lemmas': lemmaService.stats(),
+            'synonyms': synonymIndex.stats(),
+        }
+        if (self.resultCache is not None):
+            stats['results'] = self.resultCache.stats()
+        return stats
+
 # TODO: possible improvements
 # - make use of some markers (wj tags, for instance) ?
 # - make use of capitalisation ('Him' != 'him' see Matthew 9:9)
@@ -720,29 +1353,92 @@ class Tokeniser:
 
 # NEED TO LEMMATISE SYNONYMS!
 
+def lemmatiseWords(words, posTags):
+    """
+    Get the lemmas of some (space-separated) words, for a set of WordNet POS tags.
+    """
+    lemmas = set()
+    if (posTags):
+        for word in words.split(' '):
+            lemmas |= lemmaService.lemmatise(word.lower().strip(IGNORED_CHARS), posTags)
+    return frozenset(lemmas)
+
+def getLemmas(token):
+    """
+    Get the lemmas of a token. These are cached on the token.
+    """
+    if (token.lemmas is None):
+        token.lemmas = lemmatiseWords(token.word, token.wordnetPOS)
+    return token.lemmas
+
 def getSynonyms(token):
     """
-    Get the synonyms of a word.
+    Get the synonyms of a token, as a frozen set of interned word ids (see SynonymIndex). These are cached on the token.
     """
-    word = simplifyToken(token)
-    isStrongsTag = (token.get('strongs') is not None)
-    posTags = list(
-        set('_')
-        | set(getWordnetPOS(token.get('grammar' if isStrongsTag else 'pos'), isStrongsTag))
-    )
+    if (token.synonyms is None):
+        token.synonyms = synonymIndex.getSynonymIds(token.word, token.wordnetPOS)
+    return token.synonyms
 
-    synonyms = set([word])
+class PreparedStrongs:
+    """
+    The Strong's of a verse, abstracted (as StrongsTokens), with the terms that are counted, and the inverted indexes used to find candidates.
+    These depend only on the Strong's, so they are prepared once, and shared by every translation aligned against them (see Tokeniser.tokeniseTranslations);
+    they are not modified by tokenisation.
+    """
+    __slots__ = ('tokens', 'words', 'lemmas', 'synonyms', 'keys', 'indexes', 'matchKeys')
+
+    def __init__(self, strongs, modifiedStrongs):
+        self.tokens = [StrongsToken(word['token'], word['eng'], word.get('pos'), strongs[word['token']]) for word in modifiedStrongs]
+        self.words, self.lemmas, self.synonyms = [], [], [] # the terms counted (see OccurrenceCounter)
+        self.keys = [] # the forms, lemmas, and synonyms of each token (or None, if it has no content)
+        self.indexes = { MatchStrictness.IDENTICAL: {}, MatchStrictness.LEMMAS: {}, MatchStrictness.SYNONYMS: {} } # { strictness: { value: [index] } }
+        forms = set() # the whole forms, and their parts, which the whole and incomplete matches look up (the indexes hold the individual words)
+
+        for strongsIndex, strongsToken in enumerate(self.tokens):
+            if (strongsToken.eng == '-'):
+                self.keys.append(None)
+                continue
+
+            self.words.append(strongsToken.word) # genuine content
+            if (strongsToken.word is not None):
+                forms.add(strongsToken.word)
+                forms.update(strongsToken.word.split(' '))
+            self.lemmas += getLemmas(strongsToken)
+            self.synonyms += getSynonyms(strongsToken)
+
+            keys = {
+                MatchStrictness.IDENTICAL: set(strongsToken.words),
+                MatchStrictness.LEMMAS: getLemmas(strongsToken),
+                MatchStrictness.SYNONYMS: getSynonyms(strongsToken),
+            }
+            self.keys.append(keys)
+            for matchTolerance, values in keys.items():
+                for value in values:
+                    self.indexes[matchTolerance].setdefault(value, []).append(strongsIndex)
+
+        # every key, at each tolerance, that a scripture token could be matched by (see TokenisationJob.canLink)
+        self.matchKeys = {
+            MatchStrictness.IDENTICAL: forms | self.indexes[MatchStrictness.IDENTICAL].keys(),
+            MatchStrictness.LEMMAS: self.indexes[MatchStrictness.LEMMAS],
+            MatchStrictness.SYNONYMS: self.indexes[MatchStrictness.SYNONYMS],
+        }
 
-    if (posTags):
-        synonymPOSes = thesaurus.get(word)
-        if (synonymPOSes):
-            for posTag in posTags:
-                synonymCandidates = synonymPOSes.get(posTag)
-                if (synonymCandidates):
-                    for synonymList in synonymCandidates: # list of synonyms for the strongs word
-                        for synonym in synonymList:
-                            synonyms.add(synonym)
-    return synonyms
+def getCacheCounts():
+    """
+    Get the hit/miss counters of the lemma and synonym caches (see Instrumentation).
+    """
+    return {
+        'lemmaHits': lemmaService.cache.hits,
+        'lemmaMisses': lemmaService.cache.misses,
+        'synonymHits': synonymIndex.cache.hits,
+        'synonymMisses': synonymIndex.cache.misses,
+    }
+
+def getWordId(token):
+    """
+    Get the interned id of a token's content, as used in the synonym counts.
+    """
+    return synonymIndex.intern(token.word)
 
 def equals(scriptureToken, strongsToken):
     """
@@ -767,32 +1463,73 @@ def simplifyToken(token):
     Get the stripped content of a token.
     """
     if isinstance(token, str):
-        return token.lower().strip(IGNORED_CHARS)
-
-    if (token.get('content')): # scripture
-        return token['content'].lower().strip(IGNORED_CHARS)
-
-    if (token.get('eng')): # strongs
-        return token['eng'].lower().strip(IGNORED_CHARS)
-
-    return None
+        return simplifyWord(token)
+    return token.word
 
 def tokenIsDirty(token):
     """
     Is the token of an exception type, or already tokenised?
     """
-    return (token.get('type') in ['note', 'it']) or (token.get('token') is not None)
+    return (token.type in ['note', 'it']) or (token.token is not None)
+
+def splitScripture(scripture, includeNotes=True):
+    """
+    Break down a verse of scripture into individual tokens (words).
+    """
+    tokens = []
+    for chunk in scripture:
+
+        if (chunk.get('type') == 'note'):
+            if (includeNotes):
+                tokens.append(chunk.copy()) # notes don't need tokenising, but are left in the array to preserve the order (copied, as the chapter may be cached)
+            continue
+
+        if (chunk.get('content') == ' '): # ignore whitespace
+            pass
+
+        tokenCandidates = chunk['content'].split(' ') # TODO: also split using '-' (in other splittings, too)
+        for candidateTokenIndex, candidateToken in enumerate(tokenCandidates):
+            if (candidateToken.strip() == ''):
+                continue
+
+            token = {}
+
+            # reconstruct
+            if (chunk.get('header') and candidateTokenIndex == 0): # this assumes there will never be a heading mid-verse
+                token['header'] = chunk['header']
+
+            if (chunk.get('type')):
+                token['type'] = chunk['type'] # TODO: cannot split paragraphs into multiple (?)
+
+            token['content'] = candidateToken
+
+            tokens.append(token)
+
+    return tokens
 
 def tagVersePOS(tokens, englishTag='content'):
     """
     Tag the part-of-speech of each token.
     """
-    # tag POS using whole verse context
-    verse = ' '.join([token[englishTag] for token in tokens if token.get('type') != 'note'])
+    return transferPOSTags(tokens, tagVersesPOS([tokens], englishTag)[0], englishTag)
 
-    taggedVerse = pos_tag(word_tokenize(verse)) # Penn Treebank POS tags
+def tagVersesPOS(verses, englishTag='content'):
+    """
+    Tag the part-of-speech of the words of several verses, in one batch.
+    Returns the tagged words of each verse, which can be applied to its tokens using transferPOSTags.
+    """
+    from nltk import word_tokenize, pos_tag_sents # pylint: disable=import-outside-toplevel # NLTK is slow to import
+    # tag POS using whole verse context
+    sentences = [
+        word_tokenize(' '.join([token[englishTag] for token in tokens if token.get('type') != 'note']))
+        for tokens in verses
+    ]
+    return pos_tag_sents(sentences) # Penn Treebank POS tags
 
-    # transfer POS tags to tokens
+def transferPOSTags(tokens, taggedVerse, englishTag='content'):
+    """
+    Transfer the POS tags of a tagged verse onto its tokens.
+    """
     taggedWords = iter(taggedVerse)
     currentTaggedWord = next(taggedWords, None)
 
@@ -824,58 +1561,65 @@ def tagStrongsPOS(tokens):
     """
     Tag the part-of-speech of each token.
     """
-    # split tokens into inidivual words
+    return tagVersePOS(splitStrongs(tokens), 'eng')
+
+def splitStrongs(tokens):
+    """
+    Split strongs tokens into individual words, each of which refers back to its original token.
+    """
     tokenArray = []
     for tokenNumber, token in tokens.items():
         # TODO: it would be even more accurate if we can split the POS tags corectly
         words = token['eng'].split(' ')
         for word in words:
-            tempToken = token.copy()
-            tempToken['eng'] = word
-            tempToken['token'] = tokenNumber
-            tokenArray.append(tempToken)
+            tokenArray.append({ 'eng': word, 'token': tokenNumber })
+
+    return tokenArray
 
-    return tagVersePOS(tokenArray, 'eng')
+def expandStrongsPOS(taggedWords):
+    """
+    Rebuild the POS-tagged words of a verse of strongs tokens (as tagStrongsPOS would), from their precomputed tags.
+    """
+    return [{ 'eng': word, 'token': tokenNumber, 'pos': list(pos) } for tokenNumber, word, pos in taggedWords]
 
-def getWordnetPOS(inputTag, isStrongsTag=False):
+def buildStrongsPOS(start=None, end=None):
     """
-    Convert either a Penn Treebank POS tag, or a Strongs morphology tag, to a WordNet POS tag.
+    Precompute the words, and POS tags, of the Strong's data (see getPassages), saving them alongside each chapter.
+    The Strong's data does not change between translations, so this saves every tokenisation from tagging it again.
     """
-    if (inputTag is None):
-        return set()
+    built = 0
+    for passage in getPassages(start, end):
+        path = getChapterPath('strongs', passage)
+        if (not os.path.exists(path)):
+            continue
 
-    outputTags = set()
+        with open(path, 'r', encoding='utf-8') as f:
+            chapter = json.load(f)
 
-    if (isStrongsTag):
-        switcher = {
-            'adjective': 'a',  # adjective
-            'verb': 'v',  # verb
-            'noun': 'n', 'pronoun': 'n', # noun
-            'adverb': 'r',  # adverb
-        }
-        for tag in inputTag:
-            if (posTag := switcher.get(tag['pos'], None)):
-                outputTags.add(posTag)
-        return outputTags if (len(outputTags) > 0) else set()
-    else:
-        switcher = {
-            'J': 'a',  # adjective
-            'V': 'v',  # verb
-            'N': 'n',  # noun
-            'R': 'r',  # adverb
-        }
-        for tag in inputTag:
-            if (posTag := switcher.get(tag[0], None)):
-                outputTags.add(posTag)
-        return outputTags if (len(outputTags) > 0) else set()
+        verses = { verse: splitStrongs(strongs) for verse, strongs in chapter.items() if strongs }
+        for tokens, taggedVerse in zip(verses.values(), tagVersesPOS(list(verses.values()), 'eng')):
+            transferPOSTags(tokens, taggedVerse, 'eng')
+
+        sidecarPath = getChapterPath('strongs.pos', passage)
+        tempPath = f'{sidecarPath}.{os.getpid()}.tmp'
+        with open(tempPath, 'w', encoding='utf-8') as f:
+            json.dump({
+                verse: [[token['token'], token['eng'], token['pos']] for token in tokens]
+                for verse, tokens in verses.items()
+            }, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tempPath, sidecarPath)
+        built += 1
+
+    return built
 
 def areTokenGrammarsEquivalent(scriptureToken, strongsToken, strictness):
     """
     Determine if the grammar tags of the two tokens are equivalent.
+    (Within a job, the precomputed matrices of TokenisationJob.areGrammarsEquivalent should be used instead.)
 
     Args:
-    scriptureToken (dict): Token with Penn Treebank POS tags.
-    strongsToken (dict): Token with Hebrew Parsing Tag system tags.
+    scriptureToken (ScriptureToken): Token with Penn Treebank POS tags.
+    strongsToken (StrongsToken): Token with Hebrew Parsing Tag system tags.
 
     Returns:
     bool: True if any Hebrew tag matches the Penn Treebank tag for the token, False otherwise.
@@ -883,86 +1627,217 @@ def areTokenGrammarsEquivalent(scriptureToken, strongsToken, strictness):
     if (strictness is None):
         return True
     if (strictness == MatchStrictness.BACKUP_MORPHOLOGY):
-        return bool(set(scriptureToken['pos']) & set(strongsToken['pos']))
-
+        return bool(grammarTable.getPOSMask(scriptureToken.pos) & grammarTable.getPOSMask(strongsToken.pos))
     # a strongs token may have multiple grammar tags
-    for scriptureTokenPOS in scriptureToken.get('pos', []):
-        for strongTokenTags in strongsToken.get('grammar', []):
-            strongTokenPOS = strongTokenTags['pos'] # (Hebrew Parsing Tag)
-            match strongTokenPOS:
-                case 'conjunctive waw':
-                    if (scriptureTokenPOS in [
-                        'CC',
-                        'IN', # so = and
-                    ]):
-                        return True
-                case 'conjunction':
-                    if (scriptureTokenPOS in [
-                        'CC',
-                        'IN', # so = and
-                    ]):
-                        return True
-                case 'number':
-                    if (scriptureTokenPOS == 'CD'):
-                        return True
-                case 'article':
-                    if (scriptureTokenPOS == 'DT'):
-                        return True
-                case 'preposition':
-                    if (scriptureTokenPOS in ['IN', 'TO']):
-                        return True
-                case 'adjective':
-                    if (scriptureTokenPOS in ['JJ', 'JJR', 'JJS']):
-                        return True
-                case 'noun':
-                    if (scriptureTokenPOS in [
-                            'NN', 'NNS', 'NNP', 'NNPS',
-                            'DT', 'IN', 'TO', # as we are dealing with Hebrew, sometimes these are tagged as nouns
-                        ]):
-                        # it is best to ignore both plural and proper tags, as these differ between English and Hebrew
-                        # for example, 'God' is a single, proper noun, but 'elohim' is a plural, common noun
-                        return True
-                case 'pronoun':
-                    if (scriptureTokenPOS in ['PRP', 'PRP$', 'WP', 'WP$']):
-                        return True
-                case 'adverb':
-                    if (scriptureTokenPOS in ['RB', 'RBR', 'RBS', 'EX']):
-                        return True
-                case 'interjection':
-                    if (scriptureTokenPOS == 'UH'):
-                        return True
-                case 'verb':
-                    if (scriptureTokenPOS in ['VB', 'VBD', 'VBG', 'VBN', 'VBP', 'VBZ', 'MD']):
-                        return True
-                case 'interrogative':
-                    if (scriptureTokenPOS in ['WDT', 'WP', 'WP$', 'WRB']):
-                        return True
-                case _:
-                    if (strongTokenPOS not in ['direct object marker']
-                        and not strongTokenPOS.startswith('third person')
-                        and not strongTokenPOS.startswith('first person')
-                        and not strongTokenPOS.startswith('second person')
-                    ): # we ignore these
-                        pass
-    return False
-
-# load thesaurus used for synonyms
-with open(os.path.join(os.path.dirname(__file__), 'data', 'en_thesaurus.json'), 'r', encoding='utf-8') as thesaurusFile:
-    thesaurus = json.load(thesaurusFile)
+    return bool(grammarTable.getPOSMask(scriptureToken.pos) & grammarTable.getGrammarMask(strongsToken.grammar))
+
+def getChapterPath(translation, passage):
+    """
+    Get the path of a chapter of a translation.
+    The Strong's data is treated as the translation 'strongs', and its precomputed POS tags as 'strongs.pos'.
+    """
+    if (translation == 'strongs'):
+        return os.path.join(DATA_DIR, 'strongs', f'{passage}.json')
+    if (translation == 'strongs.pos'):
+        return os.path.join(DATA_DIR, 'strongs', f'{passage}.pos.json')
+    return os.path.join(DATA_DIR, translation, translation, passage)
+
+def getPassages(start=None, end=None):
+    """
+    Get the passages (e.g. 'GEN.1') between two references, inclusive, in canonical order.
+    References may be a book ('GEN') or a chapter ('GEN.1'). If no end is given, the range ends with the start's book.
+    """
+    with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    passages = [f'{book["usfm"]}.{chapter}' for book in manifest for chapter in range(1, len(book['chapters']) + 1)]
+    if (start is None):
+        return passages
+
+    def locate(reference, last=False):
+        book, _, chapter = reference.upper().partition('.')
+        if (chapter):
+            if ((passage := f'{book}.{chapter}') not in passages):
+                raise ValueError(f"Unknown chapter '{passage}'")
+            return passages.index(passage)
+        indices = [index for index, passage in enumerate(passages) if passage.split('.')[0] == book]
+        if (not indices):
+            raise ValueError(f"Unknown book '{book}'")
+        return indices[-1] if last else indices[0]
+
+    startIndex = locate(start)
+    endIndex = locate(end if end is not None else start.split('.')[0], last=True)
+    return passages[startIndex:endIndex + 1]
+
+def estimateVerseCost(scripture, strongs):
+    """
+    Estimate the relative cost of tokenising a verse.
+    The matching sweeps compare every Scripture word with every Strong's word, so the cost grows with their product.
+    """
+    scriptureWords = sum(len(chunk['content'].split()) for chunk in scripture if chunk.get('type') != 'note')
+    strongsWords = sum(len(token['eng'].split(' ')) for token in strongs.values())
+    return scriptureWords * strongsWords
+
+def printProgress(completed, total, passage):
+    """
+    Default progress reporter for tokeniseCorpus.
+    """
+    print(f'\r[{completed}/{total}] {passage}'.ljust(40), end='\n' if (completed == total) else '', file=sys.stderr, flush=True)
+
+# POOL WORKERS
+# these must be module-level, so that they can be pickled into the worker processes
+workerTokeniser = None
+
+def initialiseWorker(positionalBand=None, resultCachePath=None, instrument=False, traceCapacity=None, lemmaTablePath=None):
+    """
+    Create the tokeniser used by this worker process, attaching to the lemma table built by the parent, if there is one (see Tokeniser.shareResources).
+    """
+    if (lemmaTablePath is not None):
+        lemmaService.attach(lemmaTablePath)
+    global workerTokeniser # pylint: disable=global-statement
+    workerTokeniser = Tokeniser(
+        positionalBand,
+        ResultCache(resultCachePath) if (resultCachePath is not None) else None,
+        Instrumentation() if instrument else None,
+        ProvenanceTrace(traceCapacity) if (traceCapacity is not None) else None,
+    )
+
+def imapWindowed(pool, function, jobs, window):
+    """
+    Like Pool.imap, but only taking up to `window` jobs ahead of the result being waited for
+    (Pool.imap takes every job from the iterator at once, so they would all be held in memory).
+    """
+    pending = deque()
+    for job in jobs:
+        pending.append(pool.apply_async(function, (job,)))
+        if (len(pending) >= window):
+            yield pending.popleft().get()
+    while (pending):
+        yield pending.popleft().get()
+
+def tokeniseChapterJob(job):
+    """
+    Tokenise a chapter of a tokeniseCorpus job, in each of its translations.
+    """
+    _, passage, scriptureChapters, strongsChapter, strongsPOS, includeNotes = job
+    errors = {}
+    verses = workerTokeniser.tokeniseTranslations(passage, scriptureChapters, strongsChapter, strongsPOS, includeNotes=includeNotes, errors=errors)
+    # new lemmas are passed back to the parent, so that they can be saved, as are the numbers of results reused and recomputed,
+    # and the records of the instrumentation and trace
+    resultCounts = workerTokeniser.resultCache.drainStats() if (workerTokeniser.resultCache is not None) else (0, 0)
+    records = workerTokeniser.instrumentation.drainRecords() if (workerTokeniser.instrumentation is not None) else []
+    traceRecords = workerTokeniser.trace.drainRecords() if (workerTokeniser.trace is not None) else []
+    return (passage, verses, errors, lemmaService.drainNewEntries(), resultCounts, records, traceRecords)
+
+# thesaurus used for synonyms (this is not read until the first lookup)
+grammarTable = GrammarTable()
+thesaurus = Thesaurus()
+synonymIndex = SynonymIndex(thesaurus)
+
+# lemmas, shared by all tokenisers (and persisted between runs by tokeniseCorpus)
+lemmaService = LemmaService()
+
+def main(args):
+    """
+    Tokenise a range of the Bible: `python tokenise.py <translation> [start] [end] [processes] [--band=<fraction>] [--cache[=<dir>]] [--instrument=<path>] [--trace=<path>] [--output=<path>] [--shared]`
+    or precompute the POS tags of the Strong's data: `python tokenise.py strongs [start] [end]`
+    Several translations can be aligned in the same pass, sharing the Strong's (e.g. `NKJV,ESV,WEBBE`); their output path must contain `{translation}`.
+    """
+    positionalBand = None
+    for arg in [arg for arg in args if arg.startswith('--band=')]:
+        positionalBand = float(arg.split('=', 1)[1])
+        args.remove(arg)
+    resultCache = None
+    for arg in [arg for arg in args if arg == '--cache' or arg.startswith('--cache=')]:
+        resultCache = ResultCache(arg.split('=', 1)[1]) if ('=' in arg) else ResultCache()
+        args.remove(arg)
+    instrumentationPath = None
+    for arg in [arg for arg in args if arg.startswith('--instrument=')]:
+        instrumentationPath = arg.split('=', 1)[1]
+        args.remove(arg)
+    tracePath = None
+    for arg in [arg for arg in args if arg.startswith('--trace=')]:
+        tracePath = arg.split('=', 1)[1]
+        args.remove(arg)
+    outputPath = None
+    for arg in [arg for arg in args if arg.startswith('--output=')]:
+        outputPath = arg.split('=', 1)[1]
+        args.remove(arg)
+    sharedResources = ('--shared' in args)
+    if (sharedResources):
+        args.remove('--shared')
+
+    if (len(args) < 2):
+        print('error: insufficient arguments')
+        return
+
+    translation = args[1]
+    translations = translation.split(',')
+    start = args[2] if len(args) > 2 else None
+    end = args[3] if len(args) > 3 else None
+    processes = int(args[4]) if len(args) > 4 else None
+
+    if (translation == 'strongs'):
+        print(f'tagged {buildStrongsPOS(start, end)} chapters of the Strong\'s data')
+        return
+
+    tokeniser = Tokeniser(
+        positionalBand,
+        resultCache,
+        Instrumentation() if (instrumentationPath is not None) else None,
+        ProvenanceTrace() if (tracePath is not None) else None,
+        sharedResources,
+    )
+    if (outputPath is not None):
+        if (len(translations) > 1 and '{translation}' not in outputPath):
+            print('error: the output path must contain {translation}, when there are several translations')
+            return
+
+        # stream the results to the output (of each translation), resuming from the last chapter completed by an earlier run
+        with ExitStack() as stack:
+            sinks = { translation: stack.enter_context(openSink(outputPath.replace('{translation}', translation))) for translation in translations }
+            # a chapter completed in only some of the translations is tokenised in all of them (they share its Strong's), but only written to the rest
+            passages = [passage for passage in getPassages(start, end) if any(passage not in sink.completed for sink in sinks.values())]
+            if (skipped := sum(len(sink.completed) for sink in sinks.values())):
+                print(f'resuming: {skipped} passages already completed')
+            tokenised = 0
+            currentPassage = None
+            errors = {} # { translation: { passage: { verse: error } } }
+            for translation, passage, verse, tokens in tokeniser.iterTokeniseTranslations(translations, passages, processes, errors=errors):
+                if (passage != currentPassage):
+                    printProgress(passages.index(passage) + 1, len(passages), passage)
+                    currentPassage = passage
+                sink = sinks[translation]
+                chapterErrors = errors.get(translation, {}).pop(passage, {}) # (only for the first verse of the chapter)
+                if (passage in sink.completed):
+                    continue
+                for failedVerse, error in chapterErrors.items():
+                    sink.fail(passage, failedVerse, error) # so that the chapter is not completed, and is retried when the run is resumed
+                sink.write(passage, verse, tokens)
+                tokenised += tokens is not None
+        print(f'tokenised {tokenised} verses, saved to {outputPath}')
+        # (chapters in which every verse failed were never written, so are not completed either)
+        failed = sum(len(sink.failed) for sink in sinks.values())
+        failed += sum(passage not in sinks[translation].completed for translation, passageErrors in errors.items() for passage in passageErrors)
+        if (failed):
+            print(f'{failed} passages had verses that failed, so were not completed; run again to retry them')
+    elif (len(translations) > 1):
+        tokenised = dict.fromkeys(translations, 0)
+        for translation, _, _, tokens in tokeniser.iterTokeniseTranslations(translations, getPassages(start, end), processes):
+            tokenised[translation] += tokens is not None
+        print(f'tokenised {", ".join(f"{count} {translation}" for translation, count in tokenised.items())} verses')
+    else:
+        results = tokeniser.tokeniseCorpus(translation, start, end, processes=processes)
+        print(f'tokenised {sum(tokens is not None for verses in results.values() for tokens in verses.values())} verses across {len(results)} passages')
+    if (resultCache is not None):
+        stats = resultCache.stats()
+        print(f'reused {stats["hits"]} verses from the cache, recomputed {stats["misses"]} (evicted {stats["evicted"]})')
+    if (instrumentationPath is not None):
+        tokeniser.instrumentation.export(instrumentationPath)
+        print(f'instrumentation saved to {instrumentationPath}')
+    if (tracePath is not None):
+        tokeniser.trace.toJSONL(tracePath)
+        print(f'trace of the last {len(tokeniser.trace)} links saved to {tracePath}')
 
 if (__name__ == "__main__"):
-    tokeniser = Tokeniser()
-    # tokeniser.tokenisePassage('GEN.1', 1, 'NKJV', visualise=True)
-    # tokeniser.tokenisePassage('GEN.1', 1, 'ESV', visualise=True)
-    # tokeniser.tokenisePassage('EST.8', 9, 'NKJV', visualise=True)
-    # tokeniser.tokenisePassage('JHN.3', 16, 'NKJV', visualise=True)
-
-    for temp in range(1, 32):
-        tokeniser.tokenisePassage('GEN.1', temp, 'NKJV', visualise=True)
-        # TODO
-
-        # 14 'and' (incorrect assignment)
-        # 15, 17 (broad synonym) 'give light'
-        # 21 'kinds' (incomplete lemma),
-        # 28 'and' (BIBLE-118?)
-        # 31
+    main(sys.argv)
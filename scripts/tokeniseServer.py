@@ -0,0 +1,306 @@
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+"""A long-running tokeniser service, which keeps its models and caches warm, answering requests for the tokens of verses over local HTTP."""
+import asyncio
+import json
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import parse_qs, urlsplit
+
+import tokenise
+from caching import ResultCache
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# the size of the reads of the bodies of requests, which are discarded (see discardBody)
+BODY_CHUNK_SIZE = 65536
+
+# the forms of the fields of a request, which are checked before they are used in the paths of chapters
+REQUEST_FIELDS = { 'translation': re.compile(r'[A-Za-z0-9]+'), 'passage': re.compile(r'[A-Z0-9]{3}\.[0-9]+'), 'verse': re.compile(r'[0-9]+') }
+
+HTTP_REASONS = { 200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error' }
+
+def initialiseWorker(*settings):
+    """
+    Create the tokeniser used by this worker process (see tokenise.initialiseWorker), and warm it up.
+    """
+    tokenise.initialiseWorker(*settings)
+    warmUp()
+
+def warmUp():
+    """
+    Load everything that tokenisation otherwise loads on first use (NLTK's tokeniser and tagger, WordNet, and the thesaurus),
+    so that the first request does not pay for it.
+    """
+    try:
+        tokenise.tagVersesPOS([[{ 'content': 'In the beginning God created the heavens and the earth.' }]])
+        tokenise.lemmaService.lemmatiseWithWordnet('created', 'v')
+        tokenise.thesaurus.open()
+    except (LookupError, OSError) as e: # missing NLTK data, or thesaurus; requests will fail (and report it) instead
+        print(f'warm-up failed: {e}', file=sys.stderr)
+
+def tokeniseVerseJob(request):
+    """
+    Tokenise the verse of a request, in a worker process.
+    Returns its tokens (None if there are no tokens), the new lemmas (so that they can be saved by the server),
+    and the numbers of results reused from, and added to, the result cache.
+    """
+    translation, passage, verse, includeNotes = request
+    tokens = tokenise.workerTokeniser.tokenisePassage(passage, verse, translation, includeNotes=includeNotes)
+    resultCounts = tokenise.workerTokeniser.resultCache.drainStats() if (tokenise.workerTokeniser.resultCache is not None) else (0, 0)
+    return (tokens, tokenise.lemmaService.drainNewEntries(), resultCounts)
+
+def ping():
+    """
+    Do nothing, in a worker process (see TokeniserService.start).
+    """
+
+class TokeniserService:
+    """
+    Tokenises verses on request, in a pool of worker processes that are warmed up once, and then kept between requests.
+    Concurrent requests for the same verse are coalesced, so that it is only tokenised once, and every request gets the same result.
+    If a worker dies, the pool is replaced (see restartWorkers).
+    """
+
+    def __init__(self, processes=1, positionalBand=None, resultCache=None, executor=None, sharedResources=False):
+        self.processes = processes
+        self.resultCache = resultCache
+        self.executor = executor
+        self.mergeLemmas = executor is None # lemmas made by another process must be merged into this one's, to be saved
+        self.workerSettings = None # the arguments of initialiseWorker, if the pool is this service's own (so can be replaced)
+        if (self.executor is None):
+            self.workerSettings = tokenise.Tokeniser(positionalBand, resultCache, sharedResources=sharedResources).getWorkerSettings(pooled=True)
+            self.executor = ProcessPoolExecutor(processes, initializer=initialiseWorker, initargs=self.workerSettings)
+
+        self.pending = {} # { request: future } of the requests being tokenised
+        self.counts = dict.fromkeys(['requests', 'coalesced', 'tokenised', 'errors', 'restarts'], 0)
+
+    async def start(self):
+        """
+        Start (and so warm up) every worker, rather than leaving them to be started by the first requests.
+        """
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, ping) for _ in range(self.processes)))
+
+    def close(self):
+        """
+        Stop the workers, and save the lemmas they found.
+        """
+        self.executor.shutdown(cancel_futures=True)
+        tokenise.lemmaService.save()
+        if (self.resultCache is not None):
+            self.resultCache.evict()
+
+    async def tokenise(self, translation, passage, verse, includeNotes=True):
+        """
+        Get the tokens of a verse, joining the request for it that is already in progress, if there is one.
+        """
+        request = (translation, passage, str(verse), includeNotes)
+        self.counts['requests'] += 1
+
+        if ((future := self.pending.get(request)) is not None):
+            self.counts['coalesced'] += 1
+        else:
+            future = asyncio.ensure_future(self.run(request))
+            self.pending[request] = future
+            future.add_done_callback(lambda _: self.finish(request))
+        # shielded, so that a client that disconnects does not cancel the work for the others waiting on it
+        return await asyncio.shield(future)
+
+    def finish(self, request):
+        """
+        Remove a request that has been tokenised (or failed) from those in progress.
+        """
+        future = self.pending.pop(request)
+        if (not future.cancelled()):
+            future.exception() # retrieved, as the requests waiting on it may have all been cancelled
+
+    async def run(self, request):
+        """
+        Tokenise the verse of a request, using a worker.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            try:
+                tokens, lemmaEntries, resultCounts = await loop.run_in_executor(executor, tokeniseVerseJob, request)
+            except BrokenProcessPool:
+                # a worker died (e.g. it was killed, or ran out of memory), which breaks the whole pool, so the verse is retried (once) in a new one
+                self.restartWorkers(executor)
+                tokens, lemmaEntries, resultCounts = await loop.run_in_executor(self.executor, tokeniseVerseJob, request)
+        except Exception:
+            self.counts['errors'] += 1
+            raise
+
+        self.counts['tokenised'] += 1
+        if (self.mergeLemmas):
+            tokenise.lemmaService.merge(lemmaEntries)
+        if (self.resultCache is not None):
+            self.resultCache.merge(resultCounts)
+        return tokens
+
+    def restartWorkers(self, brokenExecutor):
+        """
+        Replace a broken pool of workers with a new one (whose workers are warmed up again), unless it has already been replaced
+        (by another of the requests that it broke), or is not this service's own.
+        """
+        if (self.executor is not brokenExecutor or self.workerSettings is None):
+            return
+        brokenExecutor.shutdown(wait=False, cancel_futures=True)
+        self.executor = ProcessPoolExecutor(self.processes, initializer=initialiseWorker, initargs=self.workerSettings)
+        self.counts['restarts'] += 1
+        print('a worker died, so the workers were restarted', file=sys.stderr)
+
+    def stats(self):
+        """
+        Get the numbers of requests made, coalesced, tokenised, and failed, of times the workers were restarted, and of requests in progress.
+        """
+        stats = { **self.counts, 'inProgress': len(self.pending) }
+        if (self.resultCache is not None):
+            stats['results'] = self.resultCache.stats()
+        return stats
+
+    async def respond(self, method, target):
+        """
+        Answer an HTTP request, returning its status and (JSON) body:
+        `GET /tokenise?translation=<translation>&passage=<passage>&verse=<verse>[&notes=0]` gets the tokens of a verse,
+        and `GET /stats` gets the statistics of the service.
+        """
+        if (method != 'GET'):
+            return 405, { 'error': f'{method} is not supported' }
+
+        url = urlsplit(target)
+        if (url.path == '/stats'):
+            return 200, self.stats()
+        if (url.path != '/tokenise'):
+            return 404, { 'error': f'{url.path} not found' }
+
+        query = { name: values[-1] for name, values in parse_qs(url.query).items() }
+        if (missing := [name for name in REQUEST_FIELDS if name not in query]):
+            return 400, { 'error': f'missing {", ".join(missing)}' }
+        if (invalid := [name for name, pattern in REQUEST_FIELDS.items() if not pattern.fullmatch(query[name])]):
+            return 400, { 'error': f'invalid {", ".join(invalid)}' }
+        includeNotes = query.get('notes', '1').lower() not in ['0', 'false']
+
+        try:
+            return 200, await self.tokenise(query['translation'], query['passage'], query['verse'], includeNotes)
+        except (FileNotFoundError, tokenise.VerseNotFoundError):
+            return 404, { 'error': f'{query["translation"]} {query["passage"]}.{query["verse"]} not found' }
+        except Exception as e: # pylint: disable=broad-exception-caught
+            return 500, { 'error': f'{type(e).__name__}: {e}' }
+
+    async def handleConnection(self, reader, writer):
+        """
+        Answer the HTTP requests of a connection, until the client closes it (or asks for it to be closed).
+        """
+        try:
+            while (requestLine := await reader.readline()):
+                headers = {}
+                while ((line := await reader.readline()) not in [b'\r\n', b'\n', b'']):
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                # no request has a body, but it must be read past before replying, so that the next request on the connection can be read
+                bodyDiscarded = await discardBody(reader, headers)
+
+                try:
+                    method, target, version = requestLine.decode('latin-1').split()
+                except ValueError:
+                    method, target, version = None, None, 'HTTP/1.0'
+                    status, body = 400, { 'error': 'malformed request' }
+                else:
+                    status, body = await self.respond(method, target)
+
+                keepAlive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close' and bodyDiscarded)
+                content = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                writer.write((
+                    f'HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n'
+                    'Content-Type: application/json; charset=utf-8\r\n'
+                    f'Content-Length: {len(content)}\r\n'
+                    'Access-Control-Allow-Origin: *\r\n' # the client is served from another (local) origin
+                    f'Connection: {"keep-alive" if keepAlive else "close"}\r\n'
+                    '\r\n'
+                ).encode('latin-1') + content)
+                await writer.drain()
+                if (not keepAlive):
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+async def discardBody(reader, headers):
+    """
+    Read, and discard, the body of a request (of Content-Length bytes).
+    Returns False if it could not be (a chunked, or malformed, body, or the client closed the connection), in which case the connection must be closed.
+    """
+    if ('transfer-encoding' in headers):
+        return False
+    try:
+        remaining = int(headers.get('content-length', '0'))
+    except ValueError:
+        return False
+    if (remaining < 0):
+        return False
+
+    while (remaining > 0):
+        if (not (chunk := await reader.read(min(remaining, BODY_CHUNK_SIZE)))):
+            return False
+        remaining -= len(chunk)
+    return True
+
+async def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socketPath=None):
+    """
+    Serve a tokeniser service, on a TCP port, or a Unix socket (if socketPath is given), until cancelled.
+    """
+    await service.start()
+    if (socketPath is not None):
+        server = await asyncio.start_unix_server(service.handleConnection, socketPath)
+        print(f'serving on {socketPath}')
+    else:
+        server = await asyncio.start_server(service.handleConnection, host, port)
+        print(f'serving on http://{host}:{port}')
+
+    async with server:
+        await server.serve_forever()
+
+def main(args):
+    """
+    Run the tokeniser service: `python tokeniseServer.py [processes] [--port=<port>] [--socket=<path>] [--band=<fraction>] [--cache[=<dir>]] [--shared]`
+    """
+    port = DEFAULT_PORT
+    for arg in [arg for arg in args if arg.startswith('--port=')]:
+        port = int(arg.split('=', 1)[1])
+        args.remove(arg)
+    socketPath = None
+    for arg in [arg for arg in args if arg.startswith('--socket=')]:
+        socketPath = arg.split('=', 1)[1]
+        args.remove(arg)
+    positionalBand = None
+    for arg in [arg for arg in args if arg.startswith('--band=')]:
+        positionalBand = float(arg.split('=', 1)[1])
+        args.remove(arg)
+    resultCache = None
+    for arg in [arg for arg in args if arg == '--cache' or arg.startswith('--cache=')]:
+        resultCache = ResultCache(arg.split('=', 1)[1]) if ('=' in arg) else ResultCache()
+        args.remove(arg)
+
+    sharedResources = ('--shared' in args)
+    if (sharedResources):
+        args.remove('--shared')
+
+    processes = int(args[1]) if len(args) > 1 else 1
+
+    service = TokeniserService(processes, positionalBand, resultCache, sharedResources=sharedResources)
+    try:
+        asyncio.run(serve(service, port=port, socketPath=socketPath))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        print(f'stopped after {service.counts["requests"]} requests ({service.counts["coalesced"]} coalesced)')
+
+if (__name__ == '__main__'):
+    main(sys.argv)
@@ -0,0 +1,88 @@
+# pylint: disable=fixme, line-too-long, invalid-name, superfluous-parens, trailing-whitespace, arguments-differ
+"""The tokens that are matched during tokenisation, with their normalised forms computed once, when they are created."""
+
+IGNORED_CHARS = ''.join(['.', ',', ';', ':', '?', '!', '“', '”', '‘', '’'])
+
+class ScriptureToken:
+    """
+    A word of scripture.
+    `token` is the index of the strongs token (within the job) that it is linked to, if any.
+    """
+    __slots__ = ('index', 'content', 'type', 'pos', 'token', 'word', 'wordnetPOS', 'lemmas', 'synonyms')
+
+    def __init__(self, index, content, pos, tokenType=None, token=None):
+        self.index = index # position within the verse's (dict) tokens
+        self.content = content
+        self.type = tokenType
+        self.pos = tuple(pos or ()) # Penn Treebank POS tags
+        self.token = token
+
+        self.word = simplifyWord(content) if content else None
+        self.wordnetPOS = frozenset(getWordnetPOS(self.pos))
+        self.lemmas = None # these are looked up as they are needed
+        self.synonyms = None
+
+    @classmethod
+    def fromDict(cls, token, index):
+        """
+        Create a scripture token from its dict form (see splitScripture).
+        """
+        return cls(index, token.get('content'), token.get('pos'), token.get('type'), token.get('token'))
+
+class StrongsToken:
+    """
+    A word of the English gloss of a strongs token.
+    `token` is the number of the strongs token that the word belongs to, as in the Strong's data.
+    """
+    __slots__ = ('token', 'eng', 'pos', 'grammar', 'strongs', 'word', 'words', 'wordnetPOS', 'lemmas', 'synonyms')
+
+    def __init__(self, token, eng, pos, strongsToken):
+        self.token = token
+        self.eng = eng
+        self.pos = tuple(pos or ()) # Penn Treebank POS tags, of the English ('backup')
+        self.grammar = tuple(tag['pos'] for tag in strongsToken.get('grammar') or []) # grammar tags (Hebrew Parsing Tag)
+        self.strongs = (strongsToken.get('strongs') or {}).get('data') # Strongs number
+
+        self.word = simplifyWord(eng) if eng else None
+        self.words = tuple(simplifyWord(word) for word in eng.split(' '))
+        self.wordnetPOS = frozenset(getWordnetPOS(self.grammar, True))
+        self.lemmas = None # these are looked up as they are needed
+        self.synonyms = None
+
+def simplifyWord(text):
+    """
+    Get the normalised form of some text.
+    """
+    return text.lower().strip(IGNORED_CHARS)
+
+def getWordnetPOS(inputTag, isStrongsTag=False):
+    """
+    Convert either Penn Treebank POS tags, or Strongs grammar tags, to WordNet POS tags.
+    """
+    if (inputTag is None):
+        return set()
+
+    outputTags = set()
+
+    if (isStrongsTag):
+        switcher = {
+            'adjective': 'a',  # adjective
+            'verb': 'v',  # verb
+            'noun': 'n', 'pronoun': 'n', # noun
+            'adverb': 'r',  # adverb
+        }
+        for tag in inputTag:
+            if (posTag := switcher.get(tag['pos'] if isinstance(tag, dict) else tag, None)):
+                outputTags.add(posTag)
+        return outputTags if (len(outputTags) > 0) else set()
+    else:
+        switcher = {
+            'J': 'a',  # adjective
+            'V': 'v',  # verb
+            'N': 'n',  # noun
+            'R': 'r',  # adverb
+        }
+        for tag in inputTag:
+            if (posTag := switcher.get(tag[0], None)):
+                outputTags.add(posTag)
+        return outputTags if (len(outputTags) > 0) else set()